@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class AlertupdloadrestConfig(AppConfig):
     name = 'alertuploadREST'
+
+    def ready(self):
+        # Invalidación de la caché de identidades de token
+        from . import signals  # noqa: F401
@@ -0,0 +1,108 @@
+"""
+Ingesta asíncrona de alertas para el modo ASGI (gunicorn + UvicornWorker,
+ver `gunicorn_config.py`).
+
+`postAlertAsync` acepta el mismo formulario que `postAlert`. La validación,
+la subida a S3 (django-storages/boto3 no tienen API async) y el INSERT se
+hacen en el hilo síncrono de Django (`thread_sensitive`, como todo acceso
+al ORM: las conexiones a la BD son por hilo); las notificaciones se entregan
+después en el event loop con clientes HTTP asíncronos (aiohttp hacia Brevo y
+los servicios push), de modo que un solo proceso mantiene cientos de subidas y entregas en
+curso sin un hilo del sistema por cada una.
+
+Bajo WSGI la vista sigue funcionando, pero la entrega vuelve al despachador
+de hilos: el event loop de `async_to_sync` termina con la petición.
+"""
+import asyncio
+import logging
+import math
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import JsonResponse
+
+from alertuploadREST.serializers import UploadAlertSerializer
+from alertuploadREST.throttling import check_admission
+from alertuploadREST.views import alert_channels, extract_alert_data, create_text_email, create_html_email
+from detection.derivatives import schedule_derivatives
+from detection.email_sender import asend_email
+from detection.outbox import enqueue_alert_notifications, aprocess_entries
+
+logger = logging.getLogger(__name__)
+
+# Referencias a las tareas en segundo plano (evita que el GC las cancele).
+_background_tasks = set()
+
+
+def _save_alert(request, inline):
+    serializer = UploadAlertSerializer(data={**request.POST.dict(), **request.FILES.dict()})
+    if not serializer.is_valid():
+        return None, serializer.errors, []
+
+    # La alerta y sus notificaciones (outbox) se guardan en la misma transacción
+    with transaction.atomic():
+        serializer.save()
+        entries = enqueue_alert_notifications(
+            serializer.instance, alert_channels(serializer.instance), inline=inline
+        )
+        schedule_derivatives([serializer.instance])
+    return serializer.data, None, entries
+
+
+# POST de una alerta (async). Misma entrada y salida que `postAlert`.
+async def postAlertAsync(request):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+    # Límite por token y admisión por cola (los mismos que las vistas DRF)
+    rejected = check_admission(request)
+    if rejected:
+        response = JsonResponse({'error': str(rejected.detail)}, status=rejected.status_code)
+        if getattr(rejected, 'wait', None) is not None:
+            response['Retry-After'] = str(math.ceil(rejected.wait))
+        return response
+
+    is_asgi = isinstance(request, ASGIRequest)
+    data, errors, entries = await sync_to_async(_save_alert)(
+        request, inline=not is_asgi
+    )
+    if errors is not None:
+        logger.warning("⚠️ La validación del serializador falló: %s", errors)
+        return JsonResponse({'error': '¡No se pudieron procesar los datos!'}, status=400)
+
+    logger.info("✅ Alerta guardada exitosamente (async). Datos: %s", data)
+
+    if is_asgi and entries:
+        task = asyncio.create_task(aprocess_entries(
+            [entry.pk for entry in entries],
+            preloaded={entry.alert_id: entry.alert for entry in entries},
+        ))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    return JsonResponse(request.META.get('HTTP_AUTHORIZATION'), safe=False)
+
+# Las vistas async no pueden usar @csrf_exempt en Django 4.2 (envuelve en una
+# función síncrona); se marca el atributo directamente.
+postAlertAsync.csrf_exempt = True
+
+
+# Entrega asíncrona del canal 'email' del outbox. Devuelve True si Brevo aceptó el correo.
+async def adeliver_alert_email(alert_instance):
+    alert_data = extract_alert_data(alert_instance)
+    try:
+        html_content = create_html_email(alert_data)
+        subject = "🚨 ALERTA DE SEGURIDAD - Arma Detectada"
+    except Exception as e:
+        # Respaldo al correo simple (solo texto)
+        logger.error("❌ Error al generar correo mejorado: %s", e)
+        html_content = None
+        subject = '🚨 Alerta de Seguridad - Arma Detectada'
+
+    return await asend_email(
+        subject=subject,
+        text_content=create_text_email(alert_data),
+        to_email=alert_data['receiver'],
+        html_content=html_content,
+    )
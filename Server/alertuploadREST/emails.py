@@ -0,0 +1,109 @@
+"""
+Cuerpos de los correos de alerta (plantillas Django).
+
+Antes `create_html_email` construía ~7KB de HTML (con su bloque <style>) con
+un f-string por alerta y sin escapar los campos. Ahora:
+
+  - Las plantillas de `templates/alertuploadREST/` se renderizan UNA vez por
+    proceso con marcadores en lugar de los campos y se "congelan" en sus
+    trozos estáticos (`FrozenTemplate`). Por alerta solo se unen esos trozos
+    con los campos: sin recorrer el árbol de nodos de Django en cada correo.
+  - Los campos se escapan para HTML (`html.escape`, igual que Django); las versiones de
+    texto plano usan `{% autoescape off %}` y van sin escapar.
+  - `ALERT_EMAIL_INLINE_CSS` elige la variante con estilos ya en línea
+    (`alert_email_inline.html`) para clientes que ignoran <style>.
+
+Medición: `python manage.py benchmark_alert_emails`.
+"""
+from functools import lru_cache
+from html import escape
+
+from django.conf import settings
+from django.template.loader import get_template
+
+ALERT_HTML_TEMPLATE = 'alertuploadREST/alert_email.html'
+ALERT_INLINE_HTML_TEMPLATE = 'alertuploadREST/alert_email_inline.html'
+ALERT_TEXT_TEMPLATE = 'alertuploadREST/alert_email.txt'
+BATCH_HTML_TEMPLATE = 'alertuploadREST/alert_batch_email.html'
+BATCH_TEXT_TEMPLATE = 'alertuploadREST/alert_batch_email.txt'
+
+DETECTED_AT_FORMAT = '%d/%m/%Y a las %H:%M:%S'
+BATCH_DETECTED_AT_FORMAT = '%d/%m/%Y %H:%M:%S'
+
+
+# Campos que las plantillas de una alerta sustituyen (siempre como `{{ campo }}`, sin filtros).
+ALERT_FIELDS = ('alert_id', 'detected_at', 'location', 'confidence', 'alert_url')
+
+
+class FrozenTemplate:
+    """
+    Plantilla Django reducida a sus trozos estáticos. Solo admite campos
+    insertados tal cual (`{{ campo }}`): un filtro sobre el campo alteraría
+    el marcador y la plantilla se rechaza al congelarla.
+    """
+
+    def __init__(self, name, fields, escape):
+        markers = {field: f"\x1f{field}\x1f" for field in fields}
+        rendered = get_template(name).render(markers)
+
+        self.name = name
+        self.escape = escape
+        self.parts = []    # texto estático entre campos
+        self.slots = []    # campo que va después de cada trozo
+        remaining = rendered
+        while '\x1f' in remaining:
+            before, field, remaining = remaining.split('\x1f', 2)
+            if field not in markers:
+                raise ValueError(f"{name}: campo inesperado {field!r}")
+            self.parts.append(before)
+            self.slots.append(field)
+        self.parts.append(remaining)
+
+    def render(self, context):
+        values = [str(context[field]) for field in self.slots]
+        if self.escape:
+            values = [escape(value) for value in values]
+        out = [self.parts[0]]
+        for value, part in zip(values, self.parts[1:]):
+            out.append(value)
+            out.append(part)
+        return ''.join(out)
+
+
+@lru_cache(maxsize=None)
+def _frozen(name, escape):
+    """Plantilla congelada (una sola vez por proceso)."""
+    return FrozenTemplate(name, ALERT_FIELDS, escape)
+
+
+@lru_cache(maxsize=None)
+def _template(name):
+    """Plantilla compilada (una sola vez por proceso)."""
+    return get_template(name)
+
+
+def _alert_context(alert_data, time_format=DETECTED_AT_FORMAT):
+    # La fecha se formatea una sola vez y se reutiliza en el cuerpo y el pie.
+    return {**alert_data, 'detected_at': alert_data['timestamp'].strftime(time_format)}
+
+
+def render_alert_text(alert_data):
+    return _frozen(ALERT_TEXT_TEMPLATE, False).render(_alert_context(alert_data))
+
+
+def render_alert_html(alert_data, inline_css=None):
+    if inline_css is None:
+        inline_css = settings.ALERT_EMAIL_INLINE_CSS
+    name = ALERT_INLINE_HTML_TEMPLATE if inline_css else ALERT_HTML_TEMPLATE
+    return _frozen(name, True).render(_alert_context(alert_data))
+
+
+# Los correos de lote llevan un bucle: se renderizan con la plantilla Django compilada.
+def render_batch_text(alerts_data):
+    alerts = [_alert_context(alert_data, BATCH_DETECTED_AT_FORMAT) for alert_data in alerts_data]
+    return _template(BATCH_TEXT_TEMPLATE).render({'alerts': alerts})
+
+
+def render_batch_html(alerts_data):
+    alerts = [_alert_context(alert_data, BATCH_DETECTED_AT_FORMAT) for alert_data in alerts_data]
+    return _template(BATCH_HTML_TEMPLATE).render({'alerts': alerts})
@@ -0,0 +1,81 @@
+"""
+Caché LRU/TTL en proceso de token -> identidad del usuario para el API de subida.
+
+Cada alerta trae `userID` (la clave de un `rest_framework.authtoken.Token`).
+Resolverlo costaba una consulta al validar y otra después, en el hilo de
+notificaciones, para `alert.userID.user`. La caché guarda el `Token` con su
+`user` ya cargado: la ingesta resuelve la identidad sin tocar Postgres y las
+notificaciones reutilizan ese mismo objeto.
+
+Las entradas caducan a los `ALERT_TOKEN_CACHE_TTL` segundos y las señales las
+invalidan cuando se guarda o borra un token o su usuario (ver `signals.py`).
+Cada worker de gunicorn tiene su propia caché; el TTL limita cuánto tiempo
+otro worker puede servir una identidad desactualizada.
+"""
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from rest_framework.authtoken.models import Token
+
+
+class TokenIdentityCache:
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (expires_at, token)
+        self._lock = Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, key):
+        """Token (con `user` cargado) de `key`, o None si no existe."""
+        key = str(key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return entry[1]
+            self._stats['misses'] += 1
+
+        token = Token.objects.select_related('user').filter(key=key).first()
+        if token is None:
+            return None  # las claves desconocidas no se guardan (no pueden hacer crecer la caché)
+
+        with self._lock:
+            self._entries[key] = (now + self.ttl, token)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+        return token
+
+    def invalidate(self, key=None, user_id=None):
+        """Elimina la entrada de una clave de token, o todas las de un usuario."""
+        with self._lock:
+            if key is not None:
+                removed = self._entries.pop(str(key), None) is not None
+            else:
+                stale = [k for k, (_, token) in self._entries.items() if token.user_id == user_id]
+                for k in stale:
+                    del self._entries[k]
+                removed = bool(stale)
+            if removed:
+                self._stats['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, 'size': len(self._entries), 'maxsize': self.maxsize, 'ttl': self.ttl}
+
+
+token_cache = TokenIdentityCache(
+    maxsize=settings.ALERT_TOKEN_CACHE_SIZE,
+    ttl=settings.ALERT_TOKEN_CACHE_TTL,
+)
@@ -0,0 +1,298 @@
+"""
+Comando de gestión: benchmark_alert_emails
+
+Microbenchmark del renderizado de los correos de alerta: compara las
+plantillas congeladas (`alertuploadREST.emails`) con la versión anterior
+basada en f-strings (copiada abajo tal cual, solo como referencia) y con un
+`Template.render()` de Django normal.
+
+Uso:
+    python manage.py benchmark_alert_emails
+    python manage.py benchmark_alert_emails --iterations 20000
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from alertuploadREST.emails import (
+    ALERT_HTML_TEMPLATE, ALERT_TEXT_TEMPLATE, _alert_context, _template,
+    render_alert_html, render_alert_text,
+)
+
+
+# --- Versión anterior (f-strings), solo para comparar -----------------------
+
+def legacy_create_text_email(alert_data):
+    text_template = f"""
+🚨 ALERTA DE SEGURIDAD CRÍTICA 🚨
+
+Se ha detectado un ARMA en el sistema de vigilancia.
+
+📊 DETALLES DE LA ALERTA:
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+• ID de Alerta: {alert_data['alert_id']}
+• Fecha y Hora: {alert_data['timestamp'].strftime('%d/%m/%Y a las %H:%M:%S')}
+• Ubicación: {alert_data['location']}
+• Nivel de Confianza: {alert_data['confidence']}
+
+🔗 ACCIONES REQUERIDAS:
+• Revise inmediatamente la alerta en: {alert_data['alert_url']}
+• Verifique el área indicada
+• Contacte a las autoridades si es necesario
+
+⚠️ IMPORTANTE: Esta es una alerta automatizada del sistema de detección de armas. 
+Tome las medidas de seguridad apropiadas de inmediato.
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+Sistema de Detección de Armas
+Generado automáticamente el {alert_data['timestamp'].strftime('%d/%m/%Y a las %H:%M:%S')}
+"""
+    return text_template.strip()
+
+
+def legacy_create_html_email(alert_data):
+    html_template = f"""
+<!DOCTYPE html>
+<html lang="es">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Alerta de Seguridad</title>
+    <style>
+        body {{
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            line-height: 1.6;
+            margin: 0;
+            padding: 0;
+            background-color: #f4f4f4;
+        }}
+        .container {{
+            max-width: 600px;
+            margin: 20px auto;
+            background-color: #ffffff;
+            border-radius: 10px;
+            box-shadow: 0 0 20px rgba(0,0,0,0.1);
+            overflow: hidden;
+        }}
+        .header {{
+            background: linear-gradient(135deg, #dc3545, #c82333);
+            color: white;
+            padding: 30px;
+            text-align: center;
+        }}
+        .header h1 {{
+            margin: 0;
+            font-size: 28px;
+            font-weight: bold;
+        }}
+        .alert-icon {{
+            font-size: 48px;
+            margin-bottom: 10px;
+        }}
+        .content {{
+            padding: 30px;
+        }}
+        .alert-details {{
+            background-color: #f8f9fa;
+            border-left: 5px solid #dc3545;
+            padding: 20px;
+            margin: 20px 0;
+            border-radius: 0 5px 5px 0;
+        }}
+        .detail-row {{
+            display: flex;
+            justify-content: space-between;
+            padding: 8px 0;
+            border-bottom: 1px solid #e9ecef;
+        }}
+        .detail-row:last-child {{
+            border-bottom: none;
+        }}
+        .detail-label {{
+            font-weight: bold;
+            color: #495057;
+        }}
+        .detail-value {{
+            color: #212529;
+        }}
+        .action-button {{
+            display: inline-block;
+            background: linear-gradient(135deg, #007bff, #0056b3);
+            color: white;
+            padding: 15px 30px;
+            text-decoration: none;
+            border-radius: 5px;
+            font-weight: bold;
+            margin: 20px 0;
+            text-align: center;
+            transition: all 0.3s ease;
+        }}
+        .action-button:hover {{
+            background: linear-gradient(135deg, #0056b3, #004085);
+            transform: translateY(-2px);
+        }}
+        .warning-box {{
+            background-color: #fff3cd;
+            border: 1px solid #ffeaa7;
+            border-radius: 5px;
+            padding: 15px;
+            margin: 20px 0;
+        }}
+        .warning-text {{
+            color: #856404;
+            font-weight: 500;
+        }}
+        .footer {{
+            background-color: #343a40;
+            color: #ffffff;
+            padding: 20px;
+            text-align: center;
+            font-size: 12px;
+        }}
+        .priority-high {{
+            color: #dc3545;
+            font-weight: bold;
+            font-size: 18px;
+        }}
+        .timestamp {{
+            color: #6c757d;
+            font-size: 14px;
+        }}
+        @media (max-width: 600px) {{
+            .container {{
+                margin: 10px;
+                border-radius: 0;
+            }}
+            .detail-row {{
+                flex-direction: column;
+            }}
+            .detail-label {{
+                margin-bottom: 5px;
+            }}
+        }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <div class="alert-icon">🚨</div>
+            <h1>ALERTA DE SEGURIDAD CRÍTICA</h1>
+            <p style="margin: 10px 0 0 0; font-size: 18px;">Detección de Arma en el Sistema</p>
+        </div>
+        
+        <div class="content">
+            <div class="priority-high">⚠️ PRIORIDAD ALTA - ACCIÓN INMEDIATA REQUERIDA</div>
+            
+            <p>Se ha detectado la presencia de un <strong>arma</strong> en el sistema de vigilancia automatizado. Esta alerta requiere atención inmediata.</p>
+            
+            <div class="alert-details">
+                <h3 style="margin-top: 0; color: #dc3545;">📊 Detalles de la Alerta</h3>
+                
+                <div class="detail-row">
+                    <span class="detail-label">🆔 ID de Alerta:</span>
+                    <span class="detail-value">{alert_data['alert_id']}</span>
+                </div>
+                
+                <div class="detail-row">
+                    <span class="detail-label">🕐 Fecha y Hora:</span>
+                    <span class="detail-value">{alert_data['timestamp'].strftime('%d/%m/%Y a las %H:%M:%S')}</span>
+                </div>
+                
+                <div class="detail-row">
+                    <span class="detail-label">📍 Ubicación:</span>
+                    <span class="detail-value">{alert_data['location']}</span>
+                </div>
+                
+                <div class="detail-row">
+                    <span class="detail-label">🎯 Confianza:</span>
+                    <span class="detail-value">{alert_data['confidence']}</span>
+                </div>
+                
+            </div>
+            
+            <div style="text-align: center;">
+                <a href="{alert_data['alert_url']}" class="action-button">
+                    🔍 Ver Detalles de la Alerta
+                </a>
+            </div>
+            
+            <div class="warning-box">
+                <div class="warning-text">
+                    <strong>⚠️ Instrucciones de Seguridad:</strong><br>
+                    • Revise inmediatamente la ubicación indicada<br>
+                    • Mantenga la calma y siga los protocolos de seguridad<br>
+                    • Contacte a las autoridades competentes si es necesario<br>
+                    • No se acerque al área hasta confirmar que es segura
+                </div>
+            </div>
+            
+            <p><strong>Nota:</strong> Esta es una alerta automatizada generada por el sistema de inteligencia artificial de detección de armas. El sistema ha sido entrenado para identificar amenazas potenciales con alta precisión.</p>
+        </div>
+        
+        <div class="footer">
+            <div>🛡️ <strong>Sistema de Detección de Armas</strong></div>
+            <div class="timestamp">Generado automáticamente el {alert_data['timestamp'].strftime('%d/%m/%Y a las %H:%M:%S')}</div>
+            <div style="margin-top: 10px; font-size: 11px;">
+                Este mensaje es confidencial y está destinado únicamente al receptor indicado.
+            </div>
+        </div>
+    </div>
+</body>
+</html>
+"""
+    return html_template
+
+
+# -----------------------------------------------------------------------------
+
+
+def _per_render(func, alert_data, iterations):
+    """Microsegundos por llamada (mejor de 3 rondas)."""
+    best = None
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func(alert_data)
+        elapsed = (time.perf_counter() - started) / iterations * 1e6
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class Command(BaseCommand):
+    help = "Compara el coste por correo de las plantillas precompiladas frente a los f-strings."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=5000,
+                            help="Renderizados por ronda (por defecto 5000).")
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        alert_data = {
+            'alert_url': 'https://weaponnotificationserver.onrender.com/alert/0f1e2d3c4b5a',
+            'timestamp': timezone.localtime(),
+            'location': 'Entrada <principal> & "Lobby"',
+            'confidence': 'No especificada',
+            'alert_id': 12345,
+            'receiver': 'seguridad@example.com',
+        }
+
+        cases = [
+            ('texto  f-string (anterior)', legacy_create_text_email),
+            ('texto  Template.render()', lambda data: _template(ALERT_TEXT_TEMPLATE).render(_alert_context(data))),
+            ('texto  plantilla congelada', render_alert_text),
+            ('html   f-string (anterior)', legacy_create_html_email),
+            ('html   Template.render()', lambda data: _template(ALERT_HTML_TEMPLATE).render(_alert_context(data))),
+            ('html   plantilla congelada', lambda data: render_alert_html(data, inline_css=False)),
+            ('html   congelada, CSS en línea', lambda data: render_alert_html(data, inline_css=True)),
+        ]
+
+        # Primera llamada fuera de la medición: compila y cachea las plantillas.
+        for _, func in cases:
+            func(alert_data)
+
+        self.stdout.write(f"⏱️ {iterations} renderizados por ronda (mejor de 3):")
+        for label, func in cases:
+            size = len(func(alert_data).encode('utf-8'))
+            per_render = _per_render(func, alert_data, iterations)
+            self.stdout.write(f"   {label:<34} {per_render:8.1f} µs/correo  {size:6d} bytes")
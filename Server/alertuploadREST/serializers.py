@@ -1,9 +1,199 @@
+from concurrent.futures import ThreadPoolExecutor
+import mimetypes
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.uploadedfile import UploadedFile
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
-from detection.models import UploadAlert
+from rest_framework.authtoken.models import Token
+from alertuploadREST.identity import token_cache
+from detection.models import UploadAlert, public_id_from_name, scrambleUploadedFilename
+from detection.live import publish_alerts
+from detection.stats import record_alerts
+
+
+# Tamaño y Content-Type de un objeto ya subido. En S3 es un HEAD
+# (`PublicMediaStorage.head`); otros storages (desarrollo) usan la extensión.
+def _object_metadata(storage, name):
+    if hasattr(storage, 'head'):
+        return storage.head(name)
+    return storage.size(name), mimetypes.guess_type(name)[0]
+
+
+# Resuelve `userID` con la caché de tokens en proceso (Token con su usuario cargado)
+class CachedTokenField(serializers.PrimaryKeyRelatedField):
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool) or not isinstance(data, (str, int)):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        token = token_cache.get(data)
+        if token is None:
+            self.fail('does_not_exist', pk_value=data)
+        return token
+
+
+# Serializador de lista para la ingesta por lotes: sube las imágenes en
+# paralelo y guarda todas las alertas con un solo bulk_create (más sus estadísticas).
+class UploadAlertListSerializer(serializers.ListSerializer):
+
+    def upload_images(self, validated_data):
+        """
+        Sube todas las imágenes al almacenamiento de alertas en paralelo.
+        Devuelve (uploaded, failed): `uploaded` conserva el orden de entrada con
+        el nombre guardado en lugar del archivo; `failed` es posición -> error.
+        """
+        storage = UploadAlert._meta.get_field('image').storage
+
+        def upload(item):
+            image = item['image']
+            if not isinstance(image, UploadedFile):
+                return image  # ya guardada (nombre)
+            name = scrambleUploadedFilename(None, image.name)
+            return storage.save(name, image)
+
+        uploaded, failed = [], {}
+        workers = max(1, min(settings.ALERT_BATCH_UPLOAD_WORKERS, len(validated_data)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(upload, item) for item in validated_data]
+            for position, (item, future) in enumerate(zip(validated_data, futures)):
+                try:
+                    uploaded.append({**item, 'image': future.result()})
+                except Exception as exc:  # noqa: BLE001 - se informa por elemento
+                    failed[position] = str(exc)
+                    uploaded.append(None)
+        return uploaded, failed
+
+    def create(self, validated_data):
+        if any(isinstance(item['image'], UploadedFile) for item in validated_data):
+            validated_data, failed = self.upload_images(validated_data)
+            if failed:
+                raise serializers.ValidationError({'image': list(failed.values())})
+        # public_id = nombre guardado sin extensión (uuid4): el mismo id con el que se guardó el archivo
+        alerts = UploadAlert.objects.bulk_create([
+            UploadAlert(**item, public_id=public_id_from_name(item['image']) or uuid.uuid4())
+            for item in validated_data
+        ])
+        # bulk_create no emite post_save: estadísticas por token y aviso a los
+        # paneles en vivo aquí (misma transacción)
+        record_alerts(alerts)
+        publish_alerts(alerts)
+        return alerts
+
 
 # Serializer for UploadAlert Model
 class UploadAlertSerializer(serializers.ModelSerializer):
+    userID = CachedTokenField(queryset=Token.objects.all())
 
     class Meta:
         model = UploadAlert
-        fields = ('pk', 'image', 'userID', 'location', 'dateCreated', 'alertReceiver')
\ No newline at end of file
+        fields = ('pk', 'image', 'userID', 'location', 'dateCreated', 'alertReceiver')
+        list_serializer_class = UploadAlertListSerializer
+
+
+# Subida directa a S3, fase 1: el cliente pide un POST prefirmado.
+class PresignUploadSerializer(serializers.Serializer):
+    CONTENT_TYPES = {
+        'jpg': 'image/jpeg',
+        'jpeg': 'image/jpeg',
+        'png': 'image/png',
+        'webp': 'image/webp',
+    }
+    SIGNING_SALT = 'alertuploadREST.presigned-upload'
+
+    userID = CachedTokenField(queryset=Token.objects.all())
+    filename = serializers.CharField(max_length=200)
+
+    def validate_filename(self, value):
+        extension = value.rsplit('.', 1)[-1].lower() if '.' in value else ''
+        if extension not in self.CONTENT_TYPES:
+            raise serializers.ValidationError(
+                f"Extensión no soportada. Usa: {', '.join(sorted(self.CONTENT_TYPES))}."
+            )
+        return value
+
+    def create(self, validated_data):
+        filename = validated_data['filename']
+        name = scrambleUploadedFilename(None, filename.lower())
+        content_type = self.CONTENT_TYPES[name.rsplit('.', 1)[-1]]
+        storage = UploadAlert._meta.get_field('image').storage
+        upload = storage.presigned_post(
+            name,
+            content_type=content_type,
+            max_bytes=settings.ALERT_PRESIGNED_UPLOAD_MAX_BYTES,
+            expires_in=settings.ALERT_PRESIGNED_UPLOAD_EXPIRES,
+        )
+        upload_token = signing.dumps(
+            {'name': name, 'userID': validated_data['userID'].pk}, salt=self.SIGNING_SALT
+        )
+        return {'upload': upload, 'upload_token': upload_token, 'expires_in': settings.ALERT_PRESIGNED_UPLOAD_EXPIRES}
+
+    def to_representation(self, instance):
+        return instance
+
+
+# Subida directa a S3, fase 2: el objeto ya está en el bucket, se registra la alerta.
+class FinalizeUploadSerializer(UploadAlertSerializer):
+    upload_token = serializers.CharField(write_only=True)
+
+    class Meta(UploadAlertSerializer.Meta):
+        fields = UploadAlertSerializer.Meta.fields + ('upload_token',)
+        read_only_fields = ('image',)
+
+    def validate(self, attrs):
+        try:
+            upload = signing.loads(
+                attrs['upload_token'],
+                salt=PresignUploadSerializer.SIGNING_SALT,
+                # Margen para que el cliente termine la subida tras caducar el POST
+                max_age=settings.ALERT_PRESIGNED_UPLOAD_EXPIRES * 2,
+            )
+        except signing.BadSignature:
+            raise serializers.ValidationError({'upload_token': 'Token de subida inválido o caducado.'})
+
+        if upload['userID'] != attrs['userID'].pk:
+            raise serializers.ValidationError({'upload_token': 'El token de subida no pertenece a este usuario.'})
+
+        # El nombre firmado es "<uuid>.<ext>": ese uuid es el public_id de la alerta
+        attrs['public_id'] = public_id_from_name(upload['name'])
+
+        storage = UploadAlert._meta.get_field('image').storage
+        if not storage.exists(upload['name']):
+            raise serializers.ValidationError({'upload_token': 'La imagen aún no se ha subido al bucket.'})
+        self.validate_uploaded_image(storage, upload['name'])
+
+        attrs['image'] = upload['name']
+        return attrs
+
+    def validate_uploaded_image(self, storage, name):
+        """
+        Tamaño y tipo permitidos según los metadatos del objeto (HEAD, sin
+        descargarlo). La decodificación con Pillow se hace después en el carril
+        'media' (`detection.derivatives`), que descarta la alerta si el objeto
+        no es una imagen. Si no es válido se borra del bucket.
+        """
+        size, content_type = _object_metadata(storage, name)
+        if size > settings.ALERT_PRESIGNED_UPLOAD_MAX_BYTES:
+            error = f"La imagen supera el máximo de {settings.ALERT_PRESIGNED_UPLOAD_MAX_BYTES} bytes."
+        elif content_type not in PresignUploadSerializer.CONTENT_TYPES.values():
+            error = f"Tipo de imagen no soportado: {content_type}."
+        else:
+            return
+        storage.delete(name)
+        raise serializers.ValidationError({'image': [error]})
+
+    def create(self, validated_data):
+        validated_data.pop('upload_token')
+        self.duplicate = False
+        try:
+            with transaction.atomic():
+                return UploadAlert.objects.create(**validated_data)
+        except IntegrityError:
+            # Dos finalizaciones simultáneas de la misma subida: la segunda
+            # devuelve la alerta ya registrada (idempotente)
+            existing = UploadAlert.objects.filter(public_id=validated_data['public_id']).first()
+            if existing is None:
+                raise
+            self.duplicate = True
+            return existing
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from alertuploadREST.identity import token_cache
+
+
+# Token modificado o revocado -> olvidar su identidad en caché
+@receiver([post_save, post_delete], sender=Token)
+def invalidate_token_identity(sender, instance, **kwargs):
+    token_cache.invalidate(key=instance.pk)
+
+
+# Usuario modificado (desactivado, renombrado, borrado) -> olvidar todos sus tokens
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def invalidate_user_identity(sender, instance, **kwargs):
+    token_cache.invalidate(user_id=instance.pk)
@@ -1,2 +1,229 @@
+import io
+import tempfile
+import uuid
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from alertuploadREST.identity import token_cache
+from alertuploadREST.serializers import FinalizeUploadSerializer, PresignUploadSerializer
+from alertuploadREST.throttling import AlertRateLimiter, TokenBucket
+from detection import derivatives
+from detection.models import UploadAlert
+
+
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), 'red').save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class FinalizeUploadTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('camara', 'camara@example.com', 'clave')
+        self.storage = FileSystemStorage(location=tempfile.mkdtemp())
+        patcher = mock.patch.object(UploadAlert._meta.get_field('image'), 'storage', self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def finalize(self, content, extension='png'):
+        name = f'{uuid.uuid4()}.{extension}'
+        self.storage.save(name, ContentFile(content))
+        token = signing.dumps({'name': name, 'userID': self.user.auth_token.pk},
+                              salt=PresignUploadSerializer.SIGNING_SALT)
+        data = {'userID': self.user.auth_token.pk, 'location': 'Entrada',
+                'alertReceiver': 'guardia@example.com', 'upload_token': token}
+        return name, data
+
+    def test_valid_image_is_registered(self):
+        name, data = self.finalize(png_bytes())
+        serializer = FinalizeUploadSerializer(data=data)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        alert = serializer.save()
+        self.assertFalse(serializer.duplicate)
+        self.assertEqual(alert.image.name, name)
+
+    def test_unsupported_type_is_rejected_and_deleted(self):
+        name, data = self.finalize(b'GIF89a', extension='gif')
+        serializer = FinalizeUploadSerializer(data=data)
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('image', serializer.errors)
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(UploadAlert.objects.exists())
+
+    def test_validation_reads_metadata_only(self):
+        _, data = self.finalize(png_bytes())
+        with mock.patch.object(self.storage, 'open') as open_:
+            serializer = FinalizeUploadSerializer(data=data)
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+        open_.assert_not_called()
+
+    def test_not_an_image_is_discarded_by_the_media_lane(self):
+        name, data = self.finalize(b'<html>no soy una imagen</html>')
+        serializer = FinalizeUploadSerializer(data=data)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        alert = serializer.save()
+
+        derivatives._generate_for_ids([alert.pk])
+        self.assertFalse(UploadAlert.objects.filter(pk=alert.pk).exists())
+        self.assertFalse(self.storage.exists(name))
+
+    def test_valid_image_gets_derivatives_in_the_media_lane(self):
+        _, data = self.finalize(png_bytes())
+        serializer = FinalizeUploadSerializer(data=data)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        alert = serializer.save()
+
+        derivatives._generate_for_ids([alert.pk])
+        alert.refresh_from_db()
+        self.assertTrue(self.storage.exists(alert.thumbnail.name))
+        self.assertTrue(self.storage.exists(alert.preview.name))
+
+    def test_too_large_is_rejected(self):
+        name, data = self.finalize(png_bytes())
+        with self.settings(ALERT_PRESIGNED_UPLOAD_MAX_BYTES=10):
+            serializer = FinalizeUploadSerializer(data=data)
+            self.assertFalse(serializer.is_valid())
+        self.assertIn('image', serializer.errors)
+
+    def test_concurrent_finalize_returns_existing_alert(self):
+        _, data = self.finalize(png_bytes())
+        first = FinalizeUploadSerializer(data=data)
+        second = FinalizeUploadSerializer(data=data)
+        # Ambas validan antes de que ninguna inserte (la carrera del exists())
+        self.assertTrue(first.is_valid(), first.errors)
+        self.assertTrue(second.is_valid(), second.errors)
+
+        alert = first.save()
+        self.assertEqual(second.save().pk, alert.pk)
+        self.assertTrue(second.duplicate)
+        self.assertEqual(UploadAlert.objects.count(), 1)
+
+
+class TokenIdentityCacheTests(TestCase):
+
+    def setUp(self):
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.user = User.objects.create_user('camara', 'camara@example.com', 'clave')
+        self.key = self.user.auth_token.key
+
+    def test_cached_identity_needs_no_query(self):
+        self.assertEqual(token_cache.get(self.key).user, self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(token_cache.get(self.key).user.username, 'camara')
+
+    def test_saving_the_user_invalidates(self):
+        token_cache.get(self.key)
+        self.user.username = 'camara-norte'
+        self.user.save()
+        self.assertEqual(token_cache.get(self.key).user.username, 'camara-norte')
+
+    def test_deleting_the_user_invalidates(self):
+        token_cache.get(self.key)
+        self.user.delete()
+        self.assertIsNone(token_cache.get(self.key))
+
+    def test_saving_or_deleting_the_token_invalidates(self):
+        cached = token_cache.get(self.key)
+        token = Token.objects.get(key=self.key)
+        token.save()
+        self.assertIsNot(token_cache.get(self.key), cached)
+
+        token.delete()
+        self.assertIsNone(token_cache.get(self.key))
+
+
+class TokenBucketTests(TestCase):
+
+    def test_cost_equal_to_burst_is_admitted_once(self):
+        bucket = TokenBucket(rate=2, burst=5)
+        self.assertEqual(bucket.consume(5), 0)
+        wait = bucket.consume(5)
+        self.assertGreater(wait, 0)
+        self.assertLessEqual(wait, 2.5)
+
+    def test_cost_above_burst_is_never_admitted(self):
+        bucket = TokenBucket(rate=2, burst=5)
+        self.assertIsNone(bucket.consume(6))
+        # No se descuenta nada: una petición válida sigue pasando
+        self.assertEqual(bucket.consume(5), 0)
+
+    @override_settings(ALERT_RATE_LIMIT_OVERRIDES={'camara': [1, 5]})
+    def test_limiter_counts_too_large_apart_from_throttled(self):
+        limiter = AlertRateLimiter()
+        self.assertIsNone(limiter.consume('camara', 6))
+        self.assertEqual(limiter.consume('camara', 5), 0)
+        self.assertGreater(limiter.consume('camara', 1), 0)
+        stats = limiter.stats()
+        self.assertEqual((stats['too_large'], stats['throttled'], stats['allowed']), (1, 1, 5))
+
+
+class BatchThrottleTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('camara', 'camara@example.com', 'clave')
+        self.key = self.user.auth_token.key
+
+    def post_batch(self, count):
+        images = [SimpleUploadedFile(f'{i}.png', png_bytes(), 'image/png') for i in range(count)]
+        return self.client.post(reverse('api:postalert_batch'), {
+            'userID': self.key, 'location': 'Entrada', 'alertReceiver': 'guardia@example.com', 'image': images,
+        })
+
+    def test_batch_above_token_burst_gets_400_with_the_limit(self):
+        with self.settings(ALERT_RATE_LIMIT_OVERRIDES={self.key: [1, 2]}):
+            response = self.post_batch(3)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('2', response.json()['detail'])
+        self.assertNotIn('Retry-After', response)
+
+
+class BatchResultsTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('camara', 'camara@example.com', 'clave')
+        self.storage = FileSystemStorage(location=tempfile.mkdtemp())
+        patcher = mock.patch.object(UploadAlert._meta.get_field('image'), 'storage', self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_mixed_batch_reports_each_item(self):
+        images = [
+            SimpleUploadedFile('0.png', png_bytes(), 'image/png'),
+            SimpleUploadedFile('1.png', b'no soy una imagen', 'image/png'),
+            SimpleUploadedFile('2.png', png_bytes(), 'image/png'),
+        ]
+        response = self.client.post(reverse('api:postalert_batch'), {
+            'userID': self.user.auth_token.key, 'alertReceiver': 'guardia@example.com',
+            'location': ['Entrada', 'Patio', 'Salida'], 'image': images,
+        })
+
+        self.assertEqual(response.status_code, 207)
+        body = response.json()
+        self.assertEqual((body['received'], body['created'], body['failed']), (3, 2, 1))
+        results = body['results']
+        self.assertEqual([result['index'] for result in results], [0, 1, 2])
+        self.assertEqual([result['ok'] for result in results], [True, False, True])
+        self.assertIn('image', results[1]['errors'])
+        self.assertEqual([results[0]['alert']['location'], results[2]['alert']['location']], ['Entrada', 'Salida'])
+        self.assertEqual(sorted(UploadAlert.objects.values_list('location', flat=True)), ['Entrada', 'Salida'])
+
+    def test_all_invalid_batch_is_rejected(self):
+        images = [SimpleUploadedFile('0.png', b'no', 'image/png')]
+        response = self.client.post(reverse('api:postalert_batch'), {
+            'userID': self.user.auth_token.key, 'alertReceiver': 'guardia@example.com',
+            'location': 'Entrada', 'image': images,
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()['results'][0]['ok'])
+        self.assertFalse(UploadAlert.objects.exists())
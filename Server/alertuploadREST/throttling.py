@@ -0,0 +1,200 @@
+"""
+Control de admisión de los endpoints de ingesta de alertas.
+
+Antes de aceptar una alerta se hacen dos comprobaciones:
+
+  1. Admisión por cola: si los carriles 'email' / 'push' del despachador o la
+     cola del agrupador de correos de Brevo están casi llenos, el worker no
+     podría entregar más trabajo -> 503 + Retry-After.
+  2. Token bucket por token: cada `userID` puede subir `ALERT_RATE_LIMIT_RATE`
+     alertas por segundo con ráfagas de `ALERT_RATE_LIMIT_BURST`; un lote
+     cuesta un token por imagen -> 429 + Retry-After. Un lote más grande que
+     la ráfaga del token no se admitiría nunca -> 400 con el límite.
+
+Los buckets viven en memoria de cada worker de gunicorn (una búsqueda en un
+dict por petición, sin ida y vuelta por red), por lo que el límite efectivo
+por token es la tasa configurada por el número de workers. Los límites por
+token se sobrescriben con `ALERT_RATE_LIMIT_OVERRIDES`
+({"<token key>": [tasa, ráfaga]}). Contadores en `/api/metrics/`.
+"""
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException, Throttled
+from rest_framework.throttling import BaseThrottle
+
+from detection import email_batcher
+from detection.dispatcher import get_dispatcher, EMAIL_LANE, PUSH_LANE
+
+# Máximo de buckets en memoria (se descartan los usados hace más tiempo)
+MAX_BUCKETS = 10000
+
+
+class Overloaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'El servidor está saturado de notificaciones. Reintenta más tarde.'
+    default_code = 'overloaded'
+
+    def __init__(self, wait):
+        super().__init__()
+        # El manejador de excepciones de DRF convierte `wait` en la cabecera Retry-After
+        self.wait = wait
+
+
+class BatchTooLarge(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_code = 'batch_too_large'
+
+    def __init__(self, cost, burst):
+        super().__init__(f'El lote de {cost} imágenes supera el máximo de {burst:g} por petición de este token.')
+
+
+class TokenBucket:
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def consume(self, cost=1):
+        """Devuelve 0 si se tomaron `cost` tokens; si no, los segundos hasta que haya."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if cost > self.burst:
+            return None  # nunca se podrá satisfacer
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0
+        return (cost - self.tokens) / self.rate
+
+
+class AlertRateLimiter:
+
+    def __init__(self):
+        self._buckets = OrderedDict()
+        self._lock = Lock()
+        self._stats = {'allowed': 0, 'throttled': 0, 'overloaded': 0, 'too_large': 0}
+        self._throttled_by_token = {}
+
+    def limits_for(self, key):
+        override = settings.ALERT_RATE_LIMIT_OVERRIDES.get(key)
+        if override:
+            return float(override[0]), float(override[1])
+        return settings.ALERT_RATE_LIMIT_RATE, settings.ALERT_RATE_LIMIT_BURST
+
+    def consume(self, key, cost=1):
+        """Toma `cost` tokens del bucket de `key`. Devuelve la espera (0 = permitido)."""
+        rate, burst = self.limits_for(key)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None or (bucket.rate, bucket.burst) != (rate, burst):
+                bucket = self._buckets[key] = TokenBucket(rate, burst)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > MAX_BUCKETS:
+                self._buckets.popitem(last=False)
+
+            wait = bucket.consume(cost)
+            if wait == 0:
+                self._stats['allowed'] += cost
+            elif wait is None:
+                self._stats['too_large'] += 1
+            else:
+                self._stats['throttled'] += 1
+                self._throttled_by_token[key] = self._throttled_by_token.get(key, 0) + 1
+        return wait
+
+    def queue_wait(self):
+        """Retry-After (segundos) si los carriles de notificación están saturados; si no, 0."""
+        stats = get_dispatcher().stats()
+        queues = [(stats[lane]['queue_depth'], stats[lane]['queue_max']) for lane in (EMAIL_LANE, PUSH_LANE)]
+        batcher = email_batcher.stats()
+        if batcher and batcher['queue_max']:
+            queues.append((batcher['pending'], batcher['queue_max']))
+        for depth, maxsize in queues:
+            if depth >= maxsize * settings.ALERT_ADMISSION_MAX_QUEUE_RATIO:
+                with self._lock:
+                    self._stats['overloaded'] += 1
+                return settings.ALERT_ADMISSION_RETRY_AFTER
+        return 0
+
+    def stats(self):
+        with self._lock:
+            top = sorted(self._throttled_by_token.items(), key=lambda item: item[1], reverse=True)[:20]
+            return {
+                **self._stats,
+                'buckets': len(self._buckets),
+                'rate': settings.ALERT_RATE_LIMIT_RATE,
+                'burst': settings.ALERT_RATE_LIMIT_BURST,
+                'overrides': len(settings.ALERT_RATE_LIMIT_OVERRIDES),
+                'throttled_by_token': {key[:8] + '…': count for key, count in top},
+            }
+
+
+rate_limiter = AlertRateLimiter()
+
+
+def request_token_key(request):
+    """Clave del token que identifica a la cámara (campo `userID` o cabecera Authorization)."""
+    data = request.POST if not hasattr(request, 'data') else request.data
+    key = data.get('userID')
+    if not key:
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        if header.startswith('Token '):
+            key = header[len('Token '):].strip()
+    return key or f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def request_cost(request):
+    """Un lote cuesta un token por imagen."""
+    return max(1, len(request.FILES.getlist('image')))
+
+
+def check_admission(request):
+    """
+    Ambas comprobaciones para vistas fuera de DRF (p. ej. `postAlertAsync`).
+    Devuelve None si se admite la petición o la excepción a responder
+    (Overloaded, Throttled o BatchTooLarge).
+    """
+    wait = rate_limiter.queue_wait()
+    if wait:
+        return Overloaded(wait)
+    key, cost = request_token_key(request), request_cost(request)
+    wait = rate_limiter.consume(key, cost)
+    if wait is None:
+        return BatchTooLarge(cost, rate_limiter.limits_for(key)[1])
+    if wait != 0:
+        return Throttled(wait)
+    return None
+
+
+class QueueAdmissionThrottle(BaseThrottle):
+    """503 cuando el despachador de notificaciones no admite más trabajo."""
+
+    def allow_request(self, request, view):
+        wait = rate_limiter.queue_wait()
+        if wait:
+            raise Overloaded(wait)
+        return True
+
+
+class AlertTokenBucketThrottle(BaseThrottle):
+    """429 cuando el token (cámara) supera su tasa de ingesta."""
+
+    def allow_request(self, request, view):
+        key, cost = request_token_key(request), request_cost(request)
+        wait = rate_limiter.consume(key, cost)
+        if wait is None:
+            raise BatchTooLarge(cost, rate_limiter.limits_for(key)[1])
+        self._wait = wait
+        return wait == 0
+
+    def wait(self):
+        return self._wait
+
+
+ALERT_THROTTLES = [QueueAdmissionThrottle, AlertTokenBucketThrottle]
@@ -1,9 +1,19 @@
 from django.urls import re_path, path
 from . import views
+from . import async_views
 from rest_framework.authtoken import views as rest_framework_views
 
 urlpatterns = [
     # Alert POST
     path('images/', views.postAlert, name='postalert'),
+    # Alert POST (async, served by the ASGI app / uvicorn workers)
+    path('images/async/', async_views.postAlertAsync, name='postalert_async'),
+    # Alert batch POST (many detections per request)
+    path('images/batch/', views.postAlertBatch, name='postalert_batch'),
+    # Subida directa a S3 (POST prefirmado + finalización)
+    path('images/presign/', views.presignAlertUpload, name='presign_upload'),
+    path('images/finalize/', views.finalizeAlertUpload, name='finalize_upload'),
+    # Rate limiting / dispatcher / token cache counters (staff only)
+    path('metrics/', views.ingestionMetrics, name='ingestion_metrics'),
     re_path(r'^get_auth_token/$', rest_framework_views.obtain_auth_token, name='get_auth_token'),
-]
\ No newline at end of file
+]
@@ -1,47 +1,195 @@
-from alertuploadREST.serializers import UploadAlertSerializer
+from alertuploadREST.serializers import UploadAlertSerializer, PresignUploadSerializer, FinalizeUploadSerializer
 from rest_framework.response import Response
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, throttle_classes, permission_classes
+from rest_framework.permissions import IsAdminUser
 
 from django.http import JsonResponse
 
-from threading import Thread
 import re
 import os
-from datetime import datetime
 from django.conf import settings
 
-def start_new_thread(function):
-    def decorator(*args, **kwargs):
-        t = Thread(target = function, args=args, kwargs=kwargs)
-        t.daemon = True
-        t.start()
-    return decorator
+from django.db import transaction
+from django.utils import timezone
+
+from detection.models import NotificationOutbox
+from detection.outbox import enqueue_alert_notifications, enqueue_grouped_notifications
+from detection.derivatives import schedule_derivatives
+from detection.dispatcher import get_dispatcher
+from detection import http_pool, email_batcher, email_transports, resilience, vapid, live
+from alertuploadREST.identity import token_cache
+from alertuploadREST.throttling import ALERT_THROTTLES, rate_limiter
+from alertuploadREST.emails import render_alert_text, render_alert_html, render_batch_text, render_batch_html
+from rest_framework import status
+import logging
+
+logger = logging.getLogger(__name__)
 
 @api_view(['POST'])
+@throttle_classes(ALERT_THROTTLES)
 def postAlert(request):
     serializer = UploadAlertSerializer(data=request.data)
 
     if serializer.is_valid():
-        serializer.save()
-        print(f"Alerta guardada exitosamente. Datos: {serializer.data}")
-        send_email_alert(serializer)
-        # 🔔 Notificación Web Push al dueño de la alerta (en segundo plano)
-        send_web_push(serializer.instance)
+        # La alerta y sus notificaciones (outbox) se guardan en la misma transacción
+        with transaction.atomic():
+            serializer.save()
+            enqueue_alert_notifications(serializer.instance, alert_channels(serializer.instance))
+        schedule_derivatives([serializer.instance])
+        logger.info("✅ Alerta guardada exitosamente. Datos: %s", serializer.data)
 
     else:
-        print(f"La validación del serializador falló: {serializer.errors}")
+        logger.warning("⚠️ La validación del serializador falló: %s", serializer.errors)
         return JsonResponse({'error':'¡No se pudieron procesar los datos!'},status=400)
 
     return Response(request.META.get('HTTP_AUTHORIZATION'))
 
-# Envía la notificación web push sin bloquear la respuesta HTTP
-@start_new_thread
-def send_web_push(alert_instance):
-    try:
-        from detection.webpush_sender import notify_alert_owner
-        notify_alert_owner(alert_instance)
-    except Exception as e:
-        print(f"Error al enviar notificación web push: {e}")
+# Subida directa a S3, fase 1: devuelve un POST prefirmado para un nombre aleatorio.
+# Los bytes de la imagen van directos al bucket, nunca pasan por este worker.
+@api_view(['POST'])
+def presignAlertUpload(request):
+    serializer = PresignUploadSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    return Response(serializer.save(), status=status.HTTP_201_CREATED)
+
+# Subida directa a S3, fase 2: el objeto ya existe -> se crea la alerta + notificaciones.
+@api_view(['POST'])
+@throttle_classes(ALERT_THROTTLES)
+def finalizeAlertUpload(request):
+    serializer = FinalizeUploadSerializer(data=request.data)
+    if not serializer.is_valid():
+        logger.warning("⚠️ Finalización de subida rechazada: %s", serializer.errors)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    with transaction.atomic():
+        serializer.save()
+        if serializer.duplicate:
+            # Ya registrada por otra petición (reintento del cliente): misma respuesta, sin notificar dos veces
+            return Response(serializer.data, status=status.HTTP_200_OK)
+        enqueue_alert_notifications(serializer.instance, alert_channels(serializer.instance))
+        schedule_derivatives([serializer.instance])
+    logger.info("✅ Alerta (subida directa) guardada exitosamente. Datos: %s", serializer.data)
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+# POST de un lote de alertas: varias detecciones (imagen + datos) en una sola
+# petición multipart. `image` se repite una vez por detección; `location` y
+# `alertReceiver` se envían una vez (comunes a todas) o una por imagen, en orden.
+@api_view(['POST'])
+@throttle_classes(ALERT_THROTTLES)
+def postAlertBatch(request):
+    images = request.FILES.getlist('image')
+    if not images:
+        return JsonResponse({'error': '¡No se recibieron imágenes!'}, status=400)
+    if len(images) > settings.ALERT_BATCH_MAX_ITEMS:
+        return JsonResponse(
+            {'error': f'Máximo {settings.ALERT_BATCH_MAX_ITEMS} imágenes por lote.'}, status=400
+        )
+
+    items = batch_items(request.data, images)
+    results = [None] * len(items)
+
+    # Validación individual: un elemento inválido no tumba el lote completo
+    valid = []
+    for index, item in enumerate(items):
+        item_serializer = UploadAlertSerializer(data=item)
+        if item_serializer.is_valid():
+            valid.append((index, item_serializer.validated_data))
+        else:
+            results[index] = {'index': index, 'ok': False, 'errors': item_serializer.errors}
+
+    alerts = []
+    if valid:
+        batch = UploadAlertSerializer(many=True)
+        # Subida concurrente al bucket fuera de la transacción
+        uploaded, failed = batch.upload_images([data for _, data in valid])
+        for position, error in failed.items():
+            index = valid[position][0]
+            results[index] = {'index': index, 'ok': False, 'errors': {'image': [error]}}
+        stored = [(valid[position][0], data) for position, data in enumerate(uploaded) if data is not None]
+
+        if stored:
+            # Un solo INSERT para el lote + sus notificaciones en la misma transacción
+            with transaction.atomic():
+                alerts = batch.create([data for _, data in stored])
+                enqueue_grouped_notifications(batch_channels(alerts))
+                schedule_derivatives(alerts)
+            created = UploadAlertSerializer(alerts, many=True, context={'request': request}).data
+            for (index, _), data in zip(stored, created):
+                results[index] = {'index': index, 'ok': True, 'alert': data}
+
+    logger.info("📦 Lote de alertas procesado: %d/%d guardadas", len(alerts), len(items))
+
+    if len(alerts) == len(items):
+        response_status = status.HTTP_201_CREATED
+    elif alerts:
+        response_status = status.HTTP_207_MULTI_STATUS
+    else:
+        response_status = status.HTTP_400_BAD_REQUEST
+    return Response({
+        'received': len(items),
+        'created': len(alerts),
+        'failed': len(items) - len(alerts),
+        'results': results,
+    }, status=response_status)
+
+# Contadores de monitorización de este worker: límite de tasa, carriles del
+# despachador, caché de tokens, pools HTTP, lotes de correo y proveedores
+# (enrutado, reintentos, circuit breakers).
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def ingestionMetrics(request):
+    return Response({
+        'pid': os.getpid(),
+        'rate_limit': rate_limiter.stats(),
+        'dispatcher': get_dispatcher().stats(),
+        'token_cache': token_cache.stats(),
+        'http_pools': http_pool.stats(),
+        'email_batcher': email_batcher.stats(),
+        'resilience': resilience.stats(),
+        'email_transports': email_transports.stats(),
+        'vapid': vapid.stats(),
+        'live_updates': live.stats(),
+    })
+
+# Construye los datos del serializador de cada imagen a partir de los campos multipart
+def batch_items(data, images):
+    def field_values(name):
+        values = data.getlist(name) if hasattr(data, 'getlist') else [data.get(name)]
+        if len(values) == 1:
+            return values * len(images)
+        return values + [None] * (len(images) - len(values))
+
+    locations = field_values('location')
+    receivers = field_values('alertReceiver')
+    return [
+        {
+            'image': image,
+            'userID': data.get('userID'),
+            'location': locations[index],
+            'alertReceiver': receivers[index],
+        }
+        for index, image in enumerate(images)
+    ]
+
+# Notificaciones de un lote: UNA push al dueño y UN correo por receptor válido
+def batch_channels(alerts):
+    groups = [(NotificationOutbox.CHANNEL_PUSH, alerts)]
+    by_receiver = {}
+    for alert_instance in alerts:
+        if is_valid_email(alert_instance.alertReceiver):
+            by_receiver.setdefault(alert_instance.alertReceiver.strip().lower(), []).append(alert_instance)
+    groups.extend((NotificationOutbox.CHANNEL_EMAIL, group) for group in by_receiver.values())
+    return groups
+
+# Canales de notificación de una alerta: push al dueño y correo al receptor
+def alert_channels(alert_instance):
+    channels = [NotificationOutbox.CHANNEL_PUSH]
+    if is_valid_email(alert_instance.alertReceiver):
+        channels.append(NotificationOutbox.CHANNEL_EMAIL)
+    else:
+        logger.warning("⚠️ Correo electrónico inválido: %s", alert_instance.alertReceiver)
+    return channels
 
 # Validación de correo electrónico (el cliente solo admite correo).
 EMAIL_REGEX = re.compile(r'^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$')
@@ -51,27 +199,19 @@ def is_valid_email(value):
     return bool(EMAIL_REGEX.match((value or '').strip()))
 
 
-# Envía la alerta por correo electrónico vía SendGrid.
-def send_email_alert(serializer):
-    receiver = serializer.data['alertReceiver']
-    image_path = serializer.data.get('image', 'Sin ruta de imagen')
-
-    print(f"Procesando alerta para el receptor: {receiver}")
-    print(f"Ruta de imagen: {image_path}")
+# Entrega del canal 'email' del outbox (se ejecuta en el despachador o en
+# `process_notifications`). Devuelve True si Brevo aceptó el correo, o un
+# Future con el resultado si el envío agrupado está activo.
+def deliver_alert_email(alert_instance):
+    logger.info("📧 Procesando alerta %s para el receptor: %s", alert_instance.pk, alert_instance.alertReceiver)
+    return send_enhanced_email(alert_instance)
 
-    if is_valid_email(receiver):
-        print("Correo electrónico válido - Enviando correo vía SendGrid...")
-        send_enhanced_email(serializer)
-    else:
-        print(f"Correo electrónico inválido: {receiver}")
-
-@start_new_thread
-def send_enhanced_email(serializer):
+def send_enhanced_email(alert_instance):
     try:
-        print("Iniciando proceso de envío de correo de alerta vía Brevo API HTTP...")
+        logger.debug("Iniciando proceso de envío de correo de alerta vía Brevo API HTTP...")
 
-        # Extraer datos del serializador
-        alert_data = extract_alert_data(serializer)
+        # Extraer datos de la alerta
+        alert_data = extract_alert_data(alert_instance)
 
         # Crear el correo con HTML
         subject = "🚨 ALERTA DE SEGURIDAD - Arma Detectada"
@@ -82,320 +222,121 @@ def send_enhanced_email(serializer):
         # Contenido HTML mejorado
         html_content = create_html_email(alert_data)
 
-        receiver = serializer.data['alertReceiver']
+        receiver = alert_data['receiver']
 
-        print("Detalles del correo:")
-        print(f"  Asunto: {subject}")
-        print(f"  Para: {receiver}")
-        print(f"  De: {settings.DEFAULT_FROM_EMAIL}")
-        print(f"  Longitud de contenido HTML: {len(html_content)} caracteres")
+        logger.debug("Detalles del correo: asunto=%s para=%s de=%s html=%d caracteres",
+                     subject, receiver, settings.DEFAULT_FROM_EMAIL, len(html_content))
 
         # IMPORTANTE: Render bloquea el SMTP saliente. Se envía por la API HTTP
         # de Brevo (puerto 443), el mismo camino que el reset de contraseña.
-        from detection.email_sender import send_email_async
-        send_email_async(
+        from detection.email_batcher import batching_enabled
+        from detection.email_sender import send_email, send_email_batched
+        if batching_enabled():
+            # Se agrupa con los demás correos de la ventana (una llamada a Brevo);
+            # el outbox registra el resultado cuando se resuelve el Future.
+            logger.debug("Correo de alerta encolado en el lote de Brevo")
+            return send_email_batched(
+                subject=subject,
+                text_content=text_content,
+                to_email=receiver,
+                html_content=html_content,
+            )
+        sent = send_email(
             subject=subject,
             text_content=text_content,
             to_email=receiver,
             html_content=html_content,
         )
-        print("✅ Correo de alerta encolado vía Brevo API HTTP!")
+        logger.info("Correo de alerta vía Brevo API HTTP: %s", '✅ enviado' if sent else '❌ no enviado')
+        return sent
 
+    except email_batcher.BatcherFull:
+        # Contrapresión: el outbox devuelve la fila a 'pending' (sin respaldo síncrono)
+        raise
     except Exception as e:
-        print(f"Error al enviar correo mejorado: {e}")
-        import traceback
-        print(f"Rastreo completo: {traceback.format_exc()}")
+        logger.exception("❌ Error al enviar correo mejorado: %s", e)
 
         # Respaldo al correo simple
-        print("Intentando respaldo a correo simple...")
-        send_simple_email_fallback(serializer)
+        logger.info("Intentando respaldo a correo simple...")
+        return send_simple_email_fallback(alert_instance)
+
+# Entrega agrupada del canal 'email' (ingesta por lotes): un solo correo con
+# todas las detecciones del lote para el mismo receptor.
+def deliver_batch_email(alerts):
+    try:
+        alerts_data = [extract_alert_data(alert_instance) for alert_instance in alerts]
+        receiver = alerts_data[-1]['receiver']
+        logger.info("📧 Procesando lote de %d alertas para el receptor: %s", len(alerts), receiver)
+
+        from detection.email_sender import send_email
+        return send_email(
+            subject=f"🚨 ALERTA DE SEGURIDAD - {len(alerts)} Armas Detectadas",
+            text_content=create_batch_text_email(alerts_data),
+            to_email=receiver,
+            html_content=create_batch_html_email(alerts_data),
+        )
+    except Exception as e:
+        logger.error("❌ Error al enviar correo de lote: %s", e)
+        return False
 
-@start_new_thread
-def send_simple_email_fallback(serializer):
+def send_simple_email_fallback(alert_instance):
     """Respaldo simple (solo texto) también vía API HTTP de Brevo."""
     try:
-        alert_data = extract_alert_data(serializer)
+        alert_data = extract_alert_data(alert_instance)
 
-        from detection.email_sender import send_email_async
-        send_email_async(
+        from detection.email_sender import send_email
+        sent = send_email(
             subject='🚨 Alerta de Seguridad - Arma Detectada',
             text_content=create_text_email(alert_data),
-            to_email=serializer.data['alertReceiver'],
+            to_email=alert_data['receiver'],
         )
-        print("Correo de respaldo encolado vía Brevo API HTTP")
+        logger.info("Correo de respaldo vía Brevo API HTTP: %s", 'enviado' if sent else 'no enviado')
+        return sent
 
     except Exception as e:
-        print(f"Error en correo de respaldo: {e}")
+        logger.error("❌ Error en correo de respaldo: %s", e)
+        return False
 
-def extract_alert_data(serializer):
-    data = serializer.data
-    
+def extract_alert_data(alert_instance):
     # Obtener URL de la alerta
-    alert_url = generate_alert_url(data.get('image', ''))
+    alert_url = generate_alert_url(alert_instance.public_id)
     
-    # Obtener timestamp actual
-    current_time = datetime.now()
+    # Hora de la detección (no la del envío: el outbox puede reintentar más tarde)
+    detection_time = timezone.localtime(alert_instance.dateCreated)
     
     # Determinar ubicación si está disponible
-    location = data.get('location', 'Ubicación no especificada')
+    location = alert_instance.location or 'Ubicación no especificada'
     
     # Obtener detalles adicionales
-    confidence = data.get('confidence', 'No especificada')
-    alert_id = getattr(serializer.instance, 'id', 'N/A') if serializer.instance else 'N/A'
+    confidence = 'No especificada'
+    alert_id = alert_instance.pk or 'N/A'
     
     return {
         'alert_url': alert_url,
-        'timestamp': current_time,
+        'timestamp': detection_time,
         'location': location,
         'confidence': confidence,
         'alert_id': alert_id,
-        'receiver': data['alertReceiver']
+        'receiver': alert_instance.alertReceiver
     }
 
 def create_text_email(alert_data):
-    text_template = f"""
-🚨 ALERTA DE SEGURIDAD CRÍTICA 🚨
-
-Se ha detectado un ARMA en el sistema de vigilancia.
+    return render_alert_text(alert_data)
 
-📊 DETALLES DE LA ALERTA:
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-• ID de Alerta: {alert_data['alert_id']}
-• Fecha y Hora: {alert_data['timestamp'].strftime('%d/%m/%Y a las %H:%M:%S')}
-• Ubicación: {alert_data['location']}
-• Nivel de Confianza: {alert_data['confidence']}
-
-🔗 ACCIONES REQUERIDAS:
-• Revise inmediatamente la alerta en: {alert_data['alert_url']}
-• Verifique el área indicada
-• Contacte a las autoridades si es necesario
+def create_html_email(alert_data):
+    return render_alert_html(alert_data)
 
-⚠️ IMPORTANTE: Esta es una alerta automatizada del sistema de detección de armas. 
-Tome las medidas de seguridad apropiadas de inmediato.
+def create_batch_text_email(alerts_data):
+    return render_batch_text(alerts_data)
 
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-Sistema de Detección de Armas
-Generado automáticamente el {alert_data['timestamp'].strftime('%d/%m/%Y a las %H:%M:%S')}
-"""
-    return text_template.strip()
+def create_batch_html_email(alerts_data):
+    return render_batch_html(alerts_data)
 
-def create_html_email(alert_data):
-    html_template = f"""
-<!DOCTYPE html>
-<html lang="es">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Alerta de Seguridad</title>
-    <style>
-        body {{
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            line-height: 1.6;
-            margin: 0;
-            padding: 0;
-            background-color: #f4f4f4;
-        }}
-        .container {{
-            max-width: 600px;
-            margin: 20px auto;
-            background-color: #ffffff;
-            border-radius: 10px;
-            box-shadow: 0 0 20px rgba(0,0,0,0.1);
-            overflow: hidden;
-        }}
-        .header {{
-            background: linear-gradient(135deg, #dc3545, #c82333);
-            color: white;
-            padding: 30px;
-            text-align: center;
-        }}
-        .header h1 {{
-            margin: 0;
-            font-size: 28px;
-            font-weight: bold;
-        }}
-        .alert-icon {{
-            font-size: 48px;
-            margin-bottom: 10px;
-        }}
-        .content {{
-            padding: 30px;
-        }}
-        .alert-details {{
-            background-color: #f8f9fa;
-            border-left: 5px solid #dc3545;
-            padding: 20px;
-            margin: 20px 0;
-            border-radius: 0 5px 5px 0;
-        }}
-        .detail-row {{
-            display: flex;
-            justify-content: space-between;
-            padding: 8px 0;
-            border-bottom: 1px solid #e9ecef;
-        }}
-        .detail-row:last-child {{
-            border-bottom: none;
-        }}
-        .detail-label {{
-            font-weight: bold;
-            color: #495057;
-        }}
-        .detail-value {{
-            color: #212529;
-        }}
-        .action-button {{
-            display: inline-block;
-            background: linear-gradient(135deg, #007bff, #0056b3);
-            color: white;
-            padding: 15px 30px;
-            text-decoration: none;
-            border-radius: 5px;
-            font-weight: bold;
-            margin: 20px 0;
-            text-align: center;
-            transition: all 0.3s ease;
-        }}
-        .action-button:hover {{
-            background: linear-gradient(135deg, #0056b3, #004085);
-            transform: translateY(-2px);
-        }}
-        .warning-box {{
-            background-color: #fff3cd;
-            border: 1px solid #ffeaa7;
-            border-radius: 5px;
-            padding: 15px;
-            margin: 20px 0;
-        }}
-        .warning-text {{
-            color: #856404;
-            font-weight: 500;
-        }}
-        .footer {{
-            background-color: #343a40;
-            color: #ffffff;
-            padding: 20px;
-            text-align: center;
-            font-size: 12px;
-        }}
-        .priority-high {{
-            color: #dc3545;
-            font-weight: bold;
-            font-size: 18px;
-        }}
-        .timestamp {{
-            color: #6c757d;
-            font-size: 14px;
-        }}
-        @media (max-width: 600px) {{
-            .container {{
-                margin: 10px;
-                border-radius: 0;
-            }}
-            .detail-row {{
-                flex-direction: column;
-            }}
-            .detail-label {{
-                margin-bottom: 5px;
-            }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <div class="alert-icon">🚨</div>
-            <h1>ALERTA DE SEGURIDAD CRÍTICA</h1>
-            <p style="margin: 10px 0 0 0; font-size: 18px;">Detección de Arma en el Sistema</p>
-        </div>
-        
-        <div class="content">
-            <div class="priority-high">⚠️ PRIORIDAD ALTA - ACCIÓN INMEDIATA REQUERIDA</div>
-            
-            <p>Se ha detectado la presencia de un <strong>arma</strong> en el sistema de vigilancia automatizado. Esta alerta requiere atención inmediata.</p>
-            
-            <div class="alert-details">
-                <h3 style="margin-top: 0; color: #dc3545;">📊 Detalles de la Alerta</h3>
-                
-                <div class="detail-row">
-                    <span class="detail-label">🆔 ID de Alerta:</span>
-                    <span class="detail-value">{alert_data['alert_id']}</span>
-                </div>
-                
-                <div class="detail-row">
-                    <span class="detail-label">🕐 Fecha y Hora:</span>
-                    <span class="detail-value">{alert_data['timestamp'].strftime('%d/%m/%Y a las %H:%M:%S')}</span>
-                </div>
-                
-                <div class="detail-row">
-                    <span class="detail-label">📍 Ubicación:</span>
-                    <span class="detail-value">{alert_data['location']}</span>
-                </div>
-                
-                <div class="detail-row">
-                    <span class="detail-label">🎯 Confianza:</span>
-                    <span class="detail-value">{alert_data['confidence']}</span>
-                </div>
-                
-            </div>
-            
-            <div style="text-align: center;">
-                <a href="{alert_data['alert_url']}" class="action-button">
-                    🔍 Ver Detalles de la Alerta
-                </a>
-            </div>
-            
-            <div class="warning-box">
-                <div class="warning-text">
-                    <strong>⚠️ Instrucciones de Seguridad:</strong><br>
-                    • Revise inmediatamente la ubicación indicada<br>
-                    • Mantenga la calma y siga los protocolos de seguridad<br>
-                    • Contacte a las autoridades competentes si es necesario<br>
-                    • No se acerque al área hasta confirmar que es segura
-                </div>
-            </div>
-            
-            <p><strong>Nota:</strong> Esta es una alerta automatizada generada por el sistema de inteligencia artificial de detección de armas. El sistema ha sido entrenado para identificar amenazas potenciales con alta precisión.</p>
-        </div>
-        
-        <div class="footer">
-            <div>🛡️ <strong>Sistema de Detección de Armas</strong></div>
-            <div class="timestamp">Generado automáticamente el {alert_data['timestamp'].strftime('%d/%m/%Y a las %H:%M:%S')}</div>
-            <div style="margin-top: 10px; font-size: 11px;">
-                Este mensaje es confidencial y está destinado únicamente al receptor indicado.
-            </div>
-        </div>
-    </div>
-</body>
-</html>
-"""
-    return html_template
-
-def generate_alert_url(image_path):
-    try:
-        if not image_path:
-            return 'https://weaponnotificationserver.onrender.com/alert/unknown'
-        
-        # Método robusto usando os.path
-        filename = os.path.basename(str(image_path))
-        
-        if filename:
-            name_without_extension = os.path.splitext(filename)[0]
-            if name_without_extension:
-                return f'https://weaponnotificationserver.onrender.com/alert/{name_without_extension}'
-        
-        # Respaldo al método original
-        parts_by_dot = str(image_path).split(".")
-        if len(parts_by_dot) >= 4:
-            parts_by_slash = str(parts_by_dot[3]).split("/")
-            if len(parts_by_slash) >= 3:
-                return f'https://weaponnotificationserver.onrender.com/alert/{parts_by_slash[2]}'
-        
-        return 'https://weaponnotificationserver.onrender.com/alert/processing'
-        
-    except Exception as e:
-        print(f"Error al generar URL de alerta: {e}")
-        return 'https://weaponnotificationserver.onrender.com/alert/error'
+def generate_alert_url(public_id):
+    # El identificador público está indexado: la vista de detalle lo busca sin comparar nombres de imagen
+    if not public_id:
+        return 'https://weaponnotificationserver.onrender.com/alert/unknown'
+    return f'https://weaponnotificationserver.onrender.com/alert/{public_id}'
 
 def split(value, key):
-    return str(value).split(key)
\ No newline at end of file
+    return str(value).split(key)
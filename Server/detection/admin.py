@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from detection.models import UploadAlert, PushSubscription
+from detection.models import UploadAlert, ArchivedAlert, PushSubscription, NotificationOutbox
 
 # Register your models here.
 admin.site.register(UploadAlert)
@@ -8,6 +8,21 @@ admin.site.register(UploadAlert)
 
 @admin.register(PushSubscription)
 class PushSubscriptionAdmin(admin.ModelAdmin):
-    list_display = ('user', 'endpoint', 'created')
+    list_display = ('user', 'endpoint', 'created', 'last_success_at', 'consecutive_failures', 'last_latency_ms')
     search_fields = ('user__username', 'endpoint')
-    readonly_fields = ('created',)
\ No newline at end of file
+    readonly_fields = ('created', 'last_success_at', 'last_failure_at', 'consecutive_failures', 'last_latency_ms')
+
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ('alert', 'channel', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('channel', 'status')
+    readonly_fields = ('created', 'sent_at')
+
+
+@admin.register(ArchivedAlert)
+class ArchivedAlertAdmin(admin.ModelAdmin):
+    list_display = ('public_id', 'userID', 'location', 'dateCreated', 'archived_at', 'reason', 'hot_files_purged')
+    list_filter = ('reason', 'hot_files_purged')
+    search_fields = ('public_id', 'location', 'alertReceiver')
+    readonly_fields = ('public_id', 'archived_at')
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class DetectionConfig(AppConfig):
     name = 'detection'
+
+    def ready(self):
+        # Incremental per-token alert statistics
+        from . import signals  # noqa: F401
@@ -0,0 +1,152 @@
+"""
+Archivo de alertas: tabla caliente (UploadAlert) y tabla fría (ArchivedAlert).
+
+El panel solo consulta UploadAlert; las alertas archivadas (a mano desde la
+página de la alerta o por antigüedad con `python manage.py archive_alerts`)
+salen de ella para que sus consultas mantengan la misma latencia aunque el
+historial crezca:
+
+  1. Las imágenes (original, miniatura y vista previa) se copian al prefijo
+     'archive/' del bucket con una clase de almacenamiento más barata
+     (ArchiveMediaStorage: copia en S3, los bytes no pasan por el worker).
+  2. En una transacción se crea la ArchivedAlert y se borra la UploadAlert.
+     El borrado descuenta la alerta de las estadísticas del token
+     (detection/stats.py): estas describen lo que muestra el panel.
+  3. Las entradas de la página de la alerta se borran de la caché. Con una
+     caché por proceso (LocMem) el borrado solo llega al worker que archiva:
+     en los demás la página caduca sola (ALERT_PAGE_LOCAL_CACHE_SECONDS).
+  4. Las imágenes de la tabla caliente se borran más tarde
+     (`purge_hot_files`), cuando ya no puede quedar en la caché de ningún
+     worker una página de la alerta que las enlace.
+
+Las alertas con notificaciones pendientes no se archivan hasta que el outbox
+las entregue (el borrado se llevaría sus filas del outbox).
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedAlert, NotificationOutbox, UploadAlert
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FIELDS = ('image', 'thumbnail', 'preview')
+
+
+def find_alert(public_id):
+    """Alerta por su public_id: primero la tabla caliente, luego el archivo."""
+    return (
+        UploadAlert.objects.filter(public_id=public_id).first()
+        or ArchivedAlert.objects.filter(public_id=public_id).first()
+    )
+
+
+def _storages(field):
+    return (UploadAlert._meta.get_field(field).storage,
+            ArchivedAlert._meta.get_field(field).storage)
+
+
+def _copy_files(alert):
+    """Copia las imágenes de la alerta al almacenamiento del archivo: {campo: nombre}."""
+    names = {}
+    for field in IMAGE_FIELDS:
+        name = getattr(alert, field).name
+        if not name:
+            names[field] = ''
+            continue
+        hot, cold = _storages(field)
+        if hasattr(cold, 'copy_from'):
+            names[field] = cold.copy_from(hot, name)
+        elif cold.exists(name):
+            names[field] = name    # reintento: ya se copió
+        else:
+            with hot.open(name) as content:
+                names[field] = cold.save(name, content)
+    return names
+
+
+def archive_alerts(alerts, reason=ArchivedAlert.REASON_MANUAL):
+    """
+    Archiva `alerts` (UploadAlert). Devuelve las ArchivedAlert creadas; las
+    alertas con notificaciones pendientes o cuyas imágenes no se pudieron
+    copiar se quedan en la tabla caliente.
+    """
+    from .views import ALERT_FRAGMENT_KEY
+
+    alerts = list(alerts)
+    busy = set(
+        NotificationOutbox.objects.filter(
+            alert__in=alerts,
+            status__in=[NotificationOutbox.STATUS_PENDING, NotificationOutbox.STATUS_SENDING],
+        ).values_list('alert_id', flat=True)
+    )
+    alerts = [alert for alert in alerts if alert.pk not in busy]
+    if not alerts:
+        return []
+
+    copied = []
+    workers = max(1, min(settings.ALERT_ARCHIVE_COPY_WORKERS, len(alerts)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_copy_files, alert) for alert in alerts]
+        for alert, future in zip(alerts, futures):
+            try:
+                copied.append((alert, future.result()))
+            except Exception as exc:  # noqa: BLE001 - la alerta sigue en la tabla caliente
+                logger.error("❌ No se pudieron copiar las imágenes de la alerta %s: %s", alert.pk, exc)
+
+    if not copied:
+        return []
+
+    with transaction.atomic():
+        archived = ArchivedAlert.objects.bulk_create([
+            ArchivedAlert(
+                public_id=alert.public_id,
+                userID_id=alert.userID_id,
+                alertReceiver=alert.alertReceiver,
+                location=alert.location,
+                dateCreated=alert.dateCreated,
+                reason=reason,
+                **names,
+            )
+            for alert, names in copied
+        ])
+        UploadAlert.objects.filter(pk__in=[alert.pk for alert, _ in copied]).delete()
+
+    cache.delete_many([ALERT_FRAGMENT_KEY.format(alert.public_id) for alert, _ in copied])
+    logger.info("🗄️ %d alertas archivadas (%s)", len(archived), reason)
+    return archived
+
+
+def aged_alerts(days=None):
+    """Alertas de la tabla caliente con más de `days` días (ALERT_ARCHIVE_AFTER_DAYS)."""
+    days = settings.ALERT_ARCHIVE_AFTER_DAYS if days is None else days
+    return UploadAlert.objects.filter(dateCreated__lt=timezone.now() - timedelta(days=days))
+
+
+def purge_hot_files(chunk_size=500):
+    """
+    Borra las imágenes de la tabla caliente de las alertas archivadas hace más
+    de lo que vive una página en caché (ninguna las enlaza ya). Devuelve
+    cuántas alertas se limpiaron.
+    """
+    from .views import alert_page_cache_seconds
+
+    cutoff = timezone.now() - timedelta(seconds=alert_page_cache_seconds())
+    pending = ArchivedAlert.objects.filter(hot_files_purged=False, archived_at__lt=cutoff).order_by('pk')
+    purged = 0
+    while True:
+        chunk = list(pending.only('pk', *IMAGE_FIELDS)[:chunk_size])
+        if not chunk:
+            return purged
+        for archived in chunk:
+            for field in IMAGE_FIELDS:
+                name = getattr(archived, field).name
+                if name:
+                    _storages(field)[0].delete(name)
+        ArchivedAlert.objects.filter(pk__in=[archived.pk for archived in chunk]).update(hot_files_purged=True)
+        purged += len(chunk)
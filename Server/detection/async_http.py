@@ -0,0 +1,27 @@
+"""
+Cliente HTTP asíncrono (aiohttp) compartido para el modo ASGI.
+
+Una sesión por event loop: reutiliza conexiones keep-alive hacia Brevo y los
+servicios push mientras el proceso (worker uvicorn) esté vivo. Las sesiones
+de aiohttp no se pueden compartir entre loops, por eso se indexan por loop.
+"""
+import asyncio
+
+import aiohttp
+
+_sessions = {}
+
+
+def get_session():
+    """Sesión aiohttp del event loop actual (se crea la primera vez)."""
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        # Limpiar sesiones de loops que ya terminaron.
+        for old_loop in [l for l in _sessions if l.is_closed()]:
+            _sessions.pop(old_loop, None)
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, limit_per_host=20, keepalive_timeout=60),
+        )
+        _sessions[loop] = session
+    return session
@@ -0,0 +1,124 @@
+"""
+Derivados de las imágenes de alerta (Pillow), generados fuera de la petición.
+
+Por cada `UploadAlert` se guardan, junto al original en `PublicMediaStorage`:
+  - thumbs/<uuid>.jpg    miniatura JPEG para las filas del dashboard
+  - previews/<uuid>.webp vista previa WebP para la página de la alerta
+
+Así el dashboard (hasta 100 filas por página) ya no descarga los fotogramas
+a resolución completa desde S3.
+
+Las vistas de ingesta llaman a `schedule_derivatives()` dentro de su
+transacción; tras el commit el trabajo va al carril 'media' del despachador.
+Es también la primera vez que se decodifican las subidas directas a S3
+(`finalizeAlertUpload` solo mira los metadatos): si el objeto no es una
+imagen, la alerta se descarta aquí.
+Para alertas antiguas: `python manage.py generate_derivatives`.
+"""
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from .dispatcher import get_dispatcher, DispatcherBusy, MEDIA_LANE
+from .models import UploadAlert
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidImage(Exception):
+    """El objeto guardado no es una imagen que Pillow pueda decodificar."""
+
+
+def _render(image, max_size, fmt, quality):
+    """Reduce `image` a `max_size` (lado mayor) y la codifica en `fmt`."""
+    copy = image.copy()
+    copy.thumbnail((max_size, max_size), Image.LANCZOS)
+    buffer = BytesIO()
+    if fmt == 'WEBP':
+        copy.save(buffer, fmt, quality=quality, method=4)
+    else:
+        copy.save(buffer, fmt, quality=quality, optimize=True, progressive=True)
+    return ContentFile(buffer.getvalue())
+
+
+def generate_derivatives(alert):
+    """
+    Genera miniatura y vista previa WebP de `alert` y las guarda en el mismo
+    storage que el original. Devuelve True si se generaron.
+    """
+    if not alert.image:
+        return False
+
+    storage = alert.image.storage
+    stem = os.path.splitext(os.path.basename(alert.image.name))[0]
+    quality = settings.ALERT_DERIVATIVE_QUALITY
+
+    with storage.open(alert.image.name, 'rb') as source:
+        data = source.read()
+    try:
+        image = Image.open(BytesIO(data))
+        # Decodificación JPEG a escala reducida: mucho más rápida para miniaturas.
+        image.draft('RGB', (settings.ALERT_PREVIEW_MAX_SIZE, settings.ALERT_PREVIEW_MAX_SIZE))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as exc:
+        # Errores del contenido (los de red/S3 ocurren antes, al leer): no es una imagen
+        raise InvalidImage(f"{type(exc).__name__}: {exc}") from exc
+
+    # Al regenerar, se reemplazan los derivados anteriores (el storage no sobrescribe).
+    for previous in (alert.thumbnail, alert.preview):
+        if previous:
+            storage.delete(previous.name)
+
+    thumbnail_name = storage.save(
+        f"thumbs/{stem}.jpg",
+        _render(image, settings.ALERT_THUMBNAIL_MAX_SIZE, 'JPEG', quality),
+    )
+    preview_name = storage.save(
+        f"previews/{stem}.webp",
+        _render(image, settings.ALERT_PREVIEW_MAX_SIZE, 'WEBP', quality),
+    )
+
+    UploadAlert.objects.filter(pk=alert.pk).update(thumbnail=thumbnail_name, preview=preview_name)
+    alert.thumbnail.name = thumbnail_name
+    alert.preview.name = preview_name
+    logger.info("🖼️ Derivados generados para la alerta %s", alert.pk)
+    return True
+
+
+def discard_alert(alert):
+    """Borra una alerta cuya imagen no es válida (y sus notificaciones pendientes)."""
+    alert.image.storage.delete(alert.image.name)
+    alert.delete()
+
+
+def _generate_for_ids(alert_ids):
+    for alert in UploadAlert.objects.filter(pk__in=alert_ids):
+        try:
+            generate_derivatives(alert)
+        except InvalidImage as exc:
+            logger.warning("⚠️ La alerta %s no tiene una imagen válida, se descarta: %s", alert.pk, exc)
+            discard_alert(alert)
+        except Exception as exc:  # noqa: BLE001 - el original sigue disponible
+            logger.error("❌ No se pudieron generar derivados de la alerta %s: %s", alert.pk, exc)
+
+
+def schedule_derivatives(alerts):
+    """
+    Encola la generación de derivados tras el commit de la transacción actual.
+    Si el carril 'media' está lleno se omite: el comando
+    `generate_derivatives` completa las alertas que queden sin miniatura.
+    """
+    alert_ids = [alert.pk for alert in alerts]
+
+    def submit():
+        try:
+            get_dispatcher().submit(MEDIA_LANE, _generate_for_ids, alert_ids)
+        except DispatcherBusy:
+            logger.warning("⚠️ Carril 'media' lleno: derivados pendientes para %s", alert_ids)
+
+    transaction.on_commit(submit)
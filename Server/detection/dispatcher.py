@@ -0,0 +1,226 @@
+"""
+Despachador de notificaciones compartido por proceso.
+
+Antes cada alerta creaba varios hilos (push, correo, respaldo y el hilo de
+`send_email_async`). Con ráfagas de detecciones eso eran cientos de hilos por
+worker de gunicorn. Este módulo mantiene un pool FIJO de hilos por "carril"
+(`email`, `push`, `media`) con colas acotadas:
+
+  - Si la cola de un carril está llena, `submit()` bloquea al llamador hasta
+    `NOTIFICATION_SUBMIT_TIMEOUT` segundos y luego lanza `DispatcherBusy`
+    (contrapresión en lugar de crear trabajo sin límite).
+  - `stats()` expone profundidad de cola, tareas procesadas/fallidas y el
+    tiempo que las tareas esperaron en cola.
+
+Uso:
+    from detection.dispatcher import get_dispatcher
+    get_dispatcher().submit('email', funcion, *args, **kwargs)
+
+Con `preload_app = True` el módulo se importa en el master de gunicorn; los
+hilos se crean de forma perezosa y `get_dispatcher()` detecta el fork (cambio
+de PID) para crear un despachador nuevo en cada worker.
+"""
+import logging
+import os
+import time
+from queue import Queue, Full, Empty
+from threading import Thread, Lock
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+EMAIL_LANE = 'email'
+PUSH_LANE = 'push'
+MEDIA_LANE = 'media'   # derivados de imagen (miniaturas / WebP)
+
+# Centinela para detener los hilos de un carril.
+_STOP = object()
+
+
+class DispatcherBusy(Exception):
+    """La cola del carril sigue llena tras esperar el tiempo de contrapresión."""
+
+
+class _Lane:
+    """Cola acotada + pool fijo de hilos para un tipo de notificación."""
+
+    def __init__(self, name, workers, maxsize):
+        self.name = name
+        self.workers = workers
+        self.queue = Queue(maxsize=maxsize)
+        self.threads = []
+        self.lock = Lock()
+        self.stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'rejected': 0,
+            'wait_total': 0.0,
+            'wait_max': 0.0,
+            'run_total': 0.0,
+        }
+
+    def start(self):
+        with self.lock:
+            self.threads = [t for t in self.threads if t.is_alive()]
+            for i in range(len(self.threads), self.workers):
+                thread = Thread(
+                    target=self._run,
+                    name=f"notify-{self.name}-{i}",
+                    daemon=True,
+                )
+                thread.start()
+                self.threads.append(thread)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is _STOP:
+                    return
+                enqueued_at, func, args, kwargs = item
+                started = time.monotonic()
+                waited = started - enqueued_at
+                # Conexiones caducadas o rotas no pasan de una tarea a la siguiente
+                close_old_connections()
+                try:
+                    func(*args, **kwargs)
+                    ok = True
+                except Exception as exc:  # noqa: BLE001 - una tarea no tumba el pool
+                    ok = False
+                    logger.exception("❌ Tarea de notificación '%s' falló: %s", self.name, exc)
+                finally:
+                    close_old_connections()
+                elapsed = time.monotonic() - started
+                with self.lock:
+                    self.stats['completed' if ok else 'failed'] += 1
+                    self.stats['wait_total'] += waited
+                    self.stats['wait_max'] = max(self.stats['wait_max'], waited)
+                    self.stats['run_total'] += elapsed
+            finally:
+                self.queue.task_done()
+
+    def snapshot(self):
+        with self.lock:
+            data = dict(self.stats)
+            alive = sum(1 for t in self.threads if t.is_alive())
+        done = data['completed'] + data['failed']
+        data['wait_avg'] = data['wait_total'] / done if done else 0.0
+        data['queue_depth'] = self.queue.qsize()
+        data['queue_max'] = self.queue.maxsize
+        data['workers'] = self.workers
+        data['workers_alive'] = alive
+        return data
+
+
+class NotificationDispatcher:
+    """Pool de hilos con un carril (cola + hilos) por canal de notificación."""
+
+    def __init__(self, lanes, submit_timeout=2.0):
+        """
+        Args:
+            lanes (dict): {'email': (hilos, tamaño_cola), 'push': (...)}
+            submit_timeout (float): segundos que `submit()` espera con la
+                cola llena antes de lanzar `DispatcherBusy`.
+        """
+        self.pid = os.getpid()
+        self.submit_timeout = submit_timeout
+        self._lanes = {
+            name: _Lane(name, workers, maxsize)
+            for name, (workers, maxsize) in lanes.items()
+        }
+        self._started = False
+        self._start_lock = Lock()
+
+    def _ensure_started(self):
+        if self._started:
+            return
+        with self._start_lock:
+            if not self._started:
+                for lane in self._lanes.values():
+                    lane.start()
+                self._started = True
+                logger.info("🚀 Despachador de notificaciones iniciado (PID %s)", self.pid)
+
+    def submit(self, lane, func, *args, **kwargs):
+        """
+        Encola `func(*args, **kwargs)` en el carril indicado.
+
+        Bloquea hasta `submit_timeout` si la cola está llena y entonces lanza
+        `DispatcherBusy`. Retorna True cuando la tarea quedó encolada.
+        """
+        self._ensure_started()
+        target = self._lanes[lane]
+        try:
+            target.queue.put(
+                (time.monotonic(), func, args, kwargs),
+                timeout=self.submit_timeout,
+            )
+        except Full:
+            with target.lock:
+                target.stats['rejected'] += 1
+            logger.warning("⚠️ Cola de notificaciones '%s' llena (%s)", lane, target.queue.maxsize)
+            raise DispatcherBusy(lane)
+        with target.lock:
+            target.stats['submitted'] += 1
+        return True
+
+    def queue_depth(self, lane):
+        return self._lanes[lane].queue.qsize()
+
+    def stats(self):
+        """Estadísticas por carril: profundidad de cola, esperas y resultados."""
+        return {name: lane.snapshot() for name, lane in self._lanes.items()}
+
+    def join(self, timeout=30):
+        """Espera a que todas las colas se vacíen (útil en tests/comandos)."""
+        deadline = time.monotonic() + timeout
+        for lane in self._lanes.values():
+            while lane.queue.unfinished_tasks:
+                if time.monotonic() > deadline:
+                    return False
+                time.sleep(0.05)
+        return True
+
+    def shutdown(self):
+        """Detiene los hilos tras procesar lo que ya estaba encolado."""
+        if not self._started:
+            return
+        for lane in self._lanes.values():
+            for _ in lane.threads:
+                lane.queue.put(_STOP)
+        self._started = False
+
+
+_dispatcher = None
+_dispatcher_lock = Lock()
+
+
+def get_dispatcher():
+    """Despachador del proceso actual (se recrea tras un fork de gunicorn)."""
+    global _dispatcher
+
+    pid = os.getpid()
+    if _dispatcher is None or _dispatcher.pid != pid:
+        with _dispatcher_lock:
+            if _dispatcher is None or _dispatcher.pid != pid:
+                _dispatcher = NotificationDispatcher(
+                    lanes={
+                        EMAIL_LANE: (
+                            settings.NOTIFICATION_EMAIL_WORKERS,
+                            settings.NOTIFICATION_EMAIL_QUEUE_SIZE,
+                        ),
+                        PUSH_LANE: (
+                            settings.NOTIFICATION_PUSH_WORKERS,
+                            settings.NOTIFICATION_PUSH_QUEUE_SIZE,
+                        ),
+                        MEDIA_LANE: (
+                            settings.NOTIFICATION_MEDIA_WORKERS,
+                            settings.NOTIFICATION_MEDIA_QUEUE_SIZE,
+                        ),
+                    },
+                    submit_timeout=settings.NOTIFICATION_SUBMIT_TIMEOUT,
+                )
+    return _dispatcher
@@ -0,0 +1,195 @@
+"""
+Envío agrupado de correos vía Brevo (`messageVersions`).
+
+Durante una ráfaga de detecciones cada alerta hacía su propia llamada a la
+API de Brevo. `EmailBatcher` acumula los correos durante una ventana corta
+(`BREVO_BATCH_WINDOW` segundos, o hasta `BREVO_BATCH_MAX_MESSAGES`) y los
+envía en UNA sola llamada con un `messageVersion` personalizado por correo
+(destinatario, asunto y contenido propios).
+
+  - `submit()` devuelve un `Future` que se resuelve con un `SendResult`
+    (ok, message_id de Brevo, error) del correo concreto: el outbox lo
+    registra en la fila de la alerta que lo originó.
+  - Un hilo por proceso hace los envíos; se recrea tras el fork de gunicorn
+    (cambio de PID), igual que el despachador.
+  - Si el proceso muere con correos en la ventana, sus filas del outbox
+    siguen en 'sending' y se reintentan al caducar el lease.
+  - La cola está acotada (`BREVO_BATCH_QUEUE_SIZE`): con la cola llena
+    `submit()` lanza `BatcherFull` al momento y el outbox devuelve la fila a
+    'pending'. La admisión de alertas (alertuploadREST/throttling.py) también
+    mira su profundidad.
+
+Con `BREVO_BATCH_WINDOW = 0` se desactiva y cada correo se envía al momento.
+"""
+import logging
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+from queue import Queue, Empty, Full
+from threading import Thread, Lock
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+# Resultado de un correo: ok, id del mensaje en Brevo, error (si falló) y si
+# otro proveedor podría enviarlo (False: el proveedor rechazó el mensaje, 4xx).
+SendResult = namedtuple('SendResult', ['ok', 'message_id', 'error', 'retryable'], defaults=(True,))
+
+
+class BatcherFull(Exception):
+    """La cola del agrupador está llena: el correo no se encoló."""
+
+
+class EmailBatcher:
+    """Acumula correos durante `window` segundos y los envía en lotes."""
+
+    def __init__(self, window, max_messages, send_batch, maxsize=0):
+        """
+        Args:
+            window (float): segundos que se espera a más correos tras el primero.
+            max_messages (int): tamaño máximo de un lote (se envía al llenarse).
+            send_batch (callable): recibe la lista de mensajes (dicts) y
+                devuelve una lista de `SendResult` en el mismo orden.
+            maxsize (int): correos en cola como máximo (0 = sin límite).
+        """
+        self.pid = os.getpid()
+        self.window = window
+        self.max_messages = max_messages
+        self.send_batch = send_batch
+        self.queue = Queue(maxsize=maxsize)
+        self.lock = Lock()
+        self.thread = None
+        self.stats_data = {'messages': 0, 'batches': 0, 'failed': 0, 'largest_batch': 0, 'rejected': 0}
+
+    def submit(self, message):
+        """
+        Encola `message` para el próximo lote. Devuelve un `Future[SendResult]`.
+        Lanza `BatcherFull` sin esperar si la cola está llena.
+        """
+        self._ensure_started()
+        future = Future()
+        try:
+            self.queue.put_nowait((message, future))
+        except Full:
+            with self.lock:
+                self.stats_data['rejected'] += 1
+            logger.warning("⚠️ Cola del agrupador de correos llena (%s)", self.queue.maxsize)
+            raise BatcherFull(self.queue.maxsize)
+        return future
+
+    def _ensure_started(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = Thread(target=self._run, name='email-batcher', daemon=True)
+                self.thread.start()
+
+    def _collect(self):
+        """Espera el primer correo y reúne los que lleguen durante la ventana."""
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_messages:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Brevo exige un único remitente por llamada.
+            by_sender = {}
+            for message, future in batch:
+                by_sender.setdefault(message.get('from_email'), []).append((message, future))
+            for items in by_sender.values():
+                self._send(items)
+            for _ in batch:
+                self.queue.task_done()
+
+    def _send(self, items):
+        close_old_connections()
+        messages = [message for message, _ in items]
+        try:
+            results = self.send_batch(messages)
+        except Exception as exc:  # noqa: BLE001 - se informa a cada correo del lote
+            logger.error("❌ Error enviando lote de %s correos: %s", len(messages), exc)
+            results = [SendResult(False, '', f"{type(exc).__name__}: {exc}")] * len(messages)
+
+        with self.lock:
+            self.stats_data['messages'] += len(messages)
+            self.stats_data['batches'] += 1
+            self.stats_data['failed'] += sum(1 for result in results if not result.ok)
+            self.stats_data['largest_batch'] = max(self.stats_data['largest_batch'], len(messages))
+
+        # Los callbacks (p. ej. el registro en el outbox) corren en este hilo.
+        for (_, future), result in zip(items, results):
+            try:
+                future.set_result(result)
+            except Exception as exc:  # noqa: BLE001 - un callback no detiene el lote
+                logger.error("❌ Error registrando resultado de correo: %s", exc)
+
+    def flush(self, timeout=30):
+        """Espera a que se envíen los correos encolados (comandos / tests)."""
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def stats(self):
+        with self.lock:
+            return {
+                **self.stats_data,
+                'pending': self.queue.qsize(),
+                'queue_max': self.queue.maxsize,
+                'window': self.window,
+                'max_messages': self.max_messages,
+            }
+
+
+_batcher = None
+_batcher_lock = Lock()
+
+
+def batching_enabled():
+    return settings.BREVO_BATCH_WINDOW > 0
+
+
+def get_batcher():
+    """Agrupador del proceso actual (se recrea tras un fork de gunicorn)."""
+    global _batcher
+
+    pid = os.getpid()
+    if _batcher is None or _batcher.pid != pid:
+        with _batcher_lock:
+            if _batcher is None or _batcher.pid != pid:
+                from .email_sender import send_batch
+                _batcher = EmailBatcher(
+                    window=settings.BREVO_BATCH_WINDOW,
+                    max_messages=settings.BREVO_BATCH_MAX_MESSAGES,
+                    send_batch=send_batch,
+                    maxsize=settings.BREVO_BATCH_QUEUE_SIZE,
+                )
+    return _batcher
+
+
+def flush(timeout=30):
+    """Espera los correos pendientes del agrupador del proceso, si existe."""
+    if _batcher is None or _batcher.pid != os.getpid():
+        return True
+    return _batcher.flush(timeout)
+
+
+def stats():
+    if _batcher is None or _batcher.pid != os.getpid():
+        return {}
+    return _batcher.stats()
@@ -2,75 +2,351 @@
 Sistema de envío de emails usando la API HTTP de Brevo (Sendinblue).
 Render bloquea el SMTP saliente (puerto 587), por eso se usa la API HTTP
 (https://api.brevo.com/v3/smtp/email, puerto 443) que NO está bloqueada.
+
+`send_email` / `send_batch` pasan por el enrutador de proveedores
+(`detection.email_transports`): Brevo HTTP y, si está configurado, SMTP como
+alternativa con failover automático.
 """
-from threading import Thread
 from django.template.loader import render_to_string
 from django.conf import settings
+import asyncio
 import logging
 import os
+import time
+import aiohttp
 import requests
 
-logger = logging.getLogger(__name__)
-
-BREVO_API_URL = "https://api.brevo.com/v3/smtp/email"
+from .dispatcher import get_dispatcher, DispatcherBusy, EMAIL_LANE
+from .http_pool import get_session
+from .resilience import (
+    CircuitOpen, RETRYABLE_STATUS, THROTTLED_STATUS, get_breaker, get_retry_policy, parse_retry_after,
+)
 
+logger = logging.getLogger(__name__)
 
 def _get_brevo_api_key():
     """API key de Brevo (empieza con 'xkeysib-')."""
     return os.environ.get('BREVO_API_KEY', getattr(settings, 'BREVO_API_KEY', '') or '')
 
 
-def send_email_async(subject, text_content, to_email, html_content=None, from_email=None):
+def _brevo_session():
+    """Pool de conexiones hacia Brevo: una conexión por hilo del carril 'email'."""
+    return get_session('brevo', pool_maxsize=settings.NOTIFICATION_EMAIL_WORKERS)
+
+
+def _brevo_policy():
+    return get_retry_policy(
+        'brevo',
+        max_attempts=settings.BREVO_RETRY_MAX_ATTEMPTS,
+        base_delay=settings.BREVO_RETRY_BASE_DELAY,
+        max_delay=settings.BREVO_RETRY_MAX_DELAY,
+    )
+
+
+def _brevo_breaker():
+    return get_breaker(
+        'brevo',
+        failure_threshold=settings.BREVO_BREAKER_FAILURES,
+        reset_timeout=settings.BREVO_BREAKER_RESET,
+    )
+
+
+def _post_brevo(payload, api_key):
     """
-    Envía un email usando la API HTTP de Brevo (no SMTP bloqueado por Render).
-    Se ejecuta en un thread separado para no bloquear la respuesta HTTP.
+    POST a Brevo con reintentos (429/5xx/errores de red, jitter, Retry-After)
+    detrás del circuit breaker. Devuelve la última respuesta; lanza
+    `CircuitOpen` si el proveedor está marcado como caído, o la excepción de
+    red del último intento.
     """
+    policy, breaker = _brevo_policy(), _brevo_breaker()
+    policy.record('calls')
+    for attempt in range(1, policy.max_attempts + 1):
+        probe = breaker.check()
+        retry_after = None
+        try:
+            response = _brevo_session().post(
+                settings.BREVO_API_URL, json=payload, headers=_brevo_headers(api_key),
+                timeout=(3.05, settings.BREVO_TIMEOUT),
+            )
+        except requests.RequestException as exc:
+            breaker.record_failure()
+            if attempt == policy.max_attempts:
+                policy.record('gave_up')
+                raise
+            logger.warning(f"⚠️ Brevo: intento {attempt}/{policy.max_attempts} falló ({exc})")
+        else:
+            if response.status_code not in RETRYABLE_STATUS:
+                # 2xx o error del propio mensaje (4xx): el proveedor responde bien.
+                breaker.record_success()
+                return response
+            if response.status_code in THROTTLED_STATUS:
+                breaker.record_throttled()
+            else:
+                breaker.record_failure()
+            if attempt == policy.max_attempts:
+                policy.record('gave_up')
+                return response
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            logger.warning(f"⚠️ Brevo: status {response.status_code} en intento {attempt}/{policy.max_attempts}")
+        finally:
+            if probe:
+                breaker.release_probe()
+
+        delay = policy.delay(attempt, retry_after)
+        if delay is None:
+            policy.record('gave_up')
+            return response
+        policy.record('retries')
+        time.sleep(delay)
+
+
+async def _apost_brevo(payload, api_key):
+    """Versión asíncrona de `_post_brevo`. Devuelve (status, cuerpo)."""
+    from .async_http import get_session as get_async_session
+
+    policy, breaker = _brevo_policy(), _brevo_breaker()
+    policy.record('calls')
+    for attempt in range(1, policy.max_attempts + 1):
+        probe = breaker.check()
+        retry_after = None
+        try:
+            async with get_async_session().post(
+                settings.BREVO_API_URL, json=payload, headers=_brevo_headers(api_key),
+                timeout=aiohttp.ClientTimeout(total=settings.BREVO_TIMEOUT),
+            ) as response:
+                status, body = response.status, await response.text()
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            breaker.record_failure()
+            if attempt == policy.max_attempts:
+                policy.record('gave_up')
+                raise
+            logger.warning(f"⚠️ Brevo: intento {attempt}/{policy.max_attempts} falló ({exc})")
+        else:
+            if status not in RETRYABLE_STATUS:
+                breaker.record_success()
+                return status, body
+            if status in THROTTLED_STATUS:
+                breaker.record_throttled()
+            else:
+                breaker.record_failure()
+            if attempt == policy.max_attempts:
+                policy.record('gave_up')
+                return status, body
+            logger.warning(f"⚠️ Brevo: status {status} en intento {attempt}/{policy.max_attempts}")
+        finally:
+            if probe:
+                breaker.release_probe()
+
+        delay = policy.delay(attempt, retry_after)
+        if delay is None:
+            policy.record('gave_up')
+            return status, body
+        policy.record('retries')
+        await asyncio.sleep(delay)
+
+
+def _brevo_headers(api_key):
+    return {
+        "api-key": api_key,
+        "Content-Type": "application/json",
+        "accept": "application/json",
+    }
+
+
+def _message_payload(subject, text_content, to_email, html_content=None, from_email=None):
+    """Cuerpo de la API de Brevo para un único correo."""
+    payload = {
+        "sender": {"email": from_email or settings.DEFAULT_FROM_EMAIL, "name": "Weapon Detection System"},
+        "to": [{"email": to_email}],
+        "subject": subject,
+        "textContent": text_content,
+    }
+    if html_content:
+        payload["htmlContent"] = html_content
+    return payload
+
+
+def _message(subject, text_content, to_email, html_content=None, from_email=None):
+    return {
+        'subject': subject,
+        'text_content': text_content,
+        'to_email': to_email,
+        'html_content': html_content,
+        'from_email': from_email or settings.DEFAULT_FROM_EMAIL,
+    }
+
+
+def send_email(subject, text_content, to_email, html_content=None, from_email=None):
+    """
+    Envía un email de forma síncrona por el mejor proveedor disponible
+    (Brevo HTTP / SMTP, con failover). Pensado para ejecutarse dentro de un
+    hilo del despachador de notificaciones.
+
+    Returns:
+        bool: True si algún proveedor aceptó el mensaje.
+    """
+    from .email_transports import get_router
+
+    return get_router().send(_message(subject, text_content, to_email, html_content, from_email)).ok
+
+
+async def asend_email(subject, text_content, to_email, html_content=None, from_email=None):
+    """
+    Versión asíncrona de `send_email` para el modo ASGI (uvicorn): Brevo va
+    por la sesión aiohttp compartida, sin ocupar un hilo por envío. Si falla,
+    se pasa a los demás proveedores configurados (en un hilo).
+
+    Returns:
+        bool: True si algún proveedor aceptó el mensaje.
+    """
+    from asgiref.sync import sync_to_async
+    from .email_transports import get_router
+
+    router = get_router()
+    if router.has_transport('brevo'):
+        started = time.monotonic()
+        ok = await _asend_brevo(subject, text_content, to_email, html_content, from_email)
+        router.record('brevo', time.monotonic() - started, ok)
+        if ok:
+            return True
+    if not router.has_other_than('brevo'):
+        return False
+    message = _message(subject, text_content, to_email, html_content, from_email)
+    # Solo E/S de red (sin ORM): no ocupa el hilo síncrono compartido
+    result = await sync_to_async(router.send, thread_sensitive=False)(message, exclude=('brevo',))
+    return result.ok
+
+
+async def _asend_brevo(subject, text_content, to_email, html_content=None, from_email=None):
+    """Envío por la API de Brevo con aiohttp. Devuelve True si Brevo aceptó el mensaje."""
     if not from_email:
         from_email = settings.DEFAULT_FROM_EMAIL
 
-    def _send():
-        try:
-            api_key = _get_brevo_api_key()
-            if not api_key:
-                logger.error("❌ BREVO_API_KEY no configurado (revisa .env / Render)")
-                return False
-
-            logger.info(f"📧 Enviando email a {to_email} vía Brevo API HTTP...")
-
-            payload = {
-                "sender": {"email": from_email, "name": "Weapon Detection System"},
-                "to": [{"email": to_email}],
-                "subject": subject,
-                "textContent": text_content,
-            }
-            if html_content:
-                payload["htmlContent"] = html_content
+    try:
+        api_key = _get_brevo_api_key()
+        if not api_key:
+            logger.error("❌ BREVO_API_KEY no configurado (revisa .env / Render)")
+            return False
 
-            headers = {
-                "api-key": api_key,
-                "Content-Type": "application/json",
-                "accept": "application/json",
-            }
+        logger.info(f"📧 Enviando email a {to_email} vía Brevo API HTTP (async)...")
 
-            response = requests.post(BREVO_API_URL, json=payload, headers=headers, timeout=15)
+        payload = _message_payload(subject, text_content, to_email, html_content, from_email)
+        status, body = await _apost_brevo(payload, api_key)
 
-            # Brevo devuelve 201 (Created) cuando acepta el mensaje.
-            if response.status_code in (200, 201):
-                logger.info(f"✅ Email enviado exitosamente a {to_email} (status {response.status_code})")
-                return True
-            else:
-                logger.warning(f"⚠️ Brevo devolvió status inesperado: {response.status_code}")
-                logger.warning(f"   Body: {response.text}")
-                return False
-
-        except Exception as e:
-            logger.error(f"❌ Error enviando email vía Brevo API: {str(e)}")
-            import traceback
-            logger.error(traceback.format_exc())
+        if status in (200, 201):
+            logger.info(f"✅ Email enviado exitosamente a {to_email} (status {status})")
+            return True
+        else:
+            logger.warning(f"⚠️ Brevo devolvió status inesperado: {status}")
+            logger.warning(f"   Body: {body}")
             return False
 
-    thread = Thread(target=_send, daemon=True)
-    thread.start()
+    except CircuitOpen as e:
+        logger.warning(f"⚠️ {e}: no se envía el email a {to_email}")
+        return False
+
+    except Exception as e:
+        logger.error(f"❌ Error enviando email vía Brevo API (async): {str(e)}")
+        return False
+
+
+def brevo_send_batch(messages):
+    """
+    Envía uno o varios correos en UNA llamada a Brevo (`messageVersions`).
+    `messages` son dicts con los argumentos de `send_email` y el mismo
+    remitente. Devuelve un `SendResult` por mensaje, en el mismo orden.
+    Lanza `CircuitOpen` o el error de red si Brevo no responde.
+    """
+    from .email_batcher import SendResult
+
+    api_key = _get_brevo_api_key()
+    if not api_key:
+        logger.error("❌ BREVO_API_KEY no configurado (revisa .env / Render)")
+        return [SendResult(False, '', 'BREVO_API_KEY no configurado')] * len(messages)
+
+    first = messages[0]
+    payload = _message_payload(
+        first['subject'], first['text_content'], first['to_email'],
+        first.get('html_content'), first.get('from_email'),
+    )
+    if len(messages) > 1:
+        # El correo base solo aporta remitente y contenido por defecto; cada
+        # versión lleva su propio destinatario, asunto y contenido.
+        del payload["to"]
+        payload["messageVersions"] = []
+        for message in messages:
+            version = {
+                "to": [{"email": message['to_email']}],
+                "subject": message['subject'],
+                "textContent": message['text_content'],
+            }
+            if message.get('html_content'):
+                version["htmlContent"] = message['html_content']
+            payload["messageVersions"].append(version)
+
+    logger.info(f"📧 Enviando lote de {len(messages)} email(s) vía Brevo API HTTP...")
+    response = _post_brevo(payload, api_key)
+
+    if response.status_code not in (200, 201):
+        error = f"Brevo devolvió status {response.status_code}: {response.text[:500]}"
+        logger.warning(f"⚠️ {error}")
+        # 4xx (salvo 429): Brevo rechazó el mensaje; otro proveedor no lo arreglaría
+        retryable = response.status_code in RETRYABLE_STATUS
+        return [SendResult(False, '', error, retryable)] * len(messages)
+
+    body = response.json() if response.content else {}
+    # Un correo: {"messageId": ...}; con versiones: {"messageIds": [...]} en orden.
+    message_ids = body.get('messageIds') or [body.get('messageId', '')]
+    if len(message_ids) != len(messages):
+        message_ids = [''] * len(messages)
+    logger.info(f"✅ Lote de {len(messages)} email(s) aceptado por Brevo (status {response.status_code})")
+    return [SendResult(True, message_id or '', '') for message_id in message_ids]
+
+
+def send_batch(messages):
+    """
+    Envía varios correos (mismo remitente) por el mejor proveedor: en una
+    sola llamada si es Brevo; los que fallen pasan a los demás proveedores.
+    Devuelve un `SendResult` por mensaje, en el mismo orden.
+    """
+    from .email_transports import get_router
+
+    return get_router().send_many(messages)
+
+
+def send_email_batched(subject, text_content, to_email, html_content=None, from_email=None):
+    """
+    Encola el correo en el agrupador de Brevo (ventana `BREVO_BATCH_WINDOW`).
+
+    Returns:
+        Future: se resuelve con el `SendResult` de este correo.
+    """
+    from .email_batcher import get_batcher
+
+    return get_batcher().submit(_message(subject, text_content, to_email, html_content, from_email))
+
+
+def send_email_async(subject, text_content, to_email, html_content=None, from_email=None):
+    """
+    Envía un email usando la API HTTP de Brevo (no SMTP bloqueado por Render).
+    Se encola en el carril 'email' del despachador para no bloquear la respuesta HTTP.
+
+    Returns:
+        bool: True si el email quedó encolado.
+    """
+    try:
+        get_dispatcher().submit(
+            EMAIL_LANE, send_email,
+            subject=subject,
+            text_content=text_content,
+            to_email=to_email,
+            html_content=html_content,
+            from_email=from_email,
+        )
+    except DispatcherBusy:
+        logger.error(f"❌ Cola de emails llena: no se encoló el email para {to_email}")
+        return False
 
     logger.info(f"🚀 Email encolado para {to_email} vía Brevo API HTTP")
     return True
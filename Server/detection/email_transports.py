@@ -0,0 +1,309 @@
+"""
+Proveedores de correo intercambiables con enrutado por latencia y failover.
+
+Cada proveedor (`EmailTransport`) envía mensajes (dicts con subject,
+text_content, to_email, html_content y from_email) y devuelve un
+`SendResult` por mensaje:
+
+  - `brevo`: API HTTP de Brevo (`detection.email_sender`), con reintentos,
+    circuit breaker y envío de lotes con `messageVersions`.
+  - `smtp`: `EmailMultiAlternatives` de Django contra `EMAIL_HOST`.
+
+`EMAIL_TRANSPORTS` fija qué proveedores se usan y su orden de preferencia
+(también acepta rutas a clases propias, p. ej. `miapp.correo.MiTransport`).
+`TransportRouter` ordena en cada mensaje los proveedores por su p95 de
+latencia reciente penalizado por su tasa de fallos; si el elegido falla
+(error de red / 5xx, `SendResult.retryable`), prueba el siguiente. Un mensaje
+rechazado por el proveedor (4xx) no se reenvía por otro. Un proveedor sin suficientes muestras recientes (ventana
+`EMAIL_ROUTER_WINDOW`) cuenta con `EMAIL_ROUTER_DEFAULT_LATENCY`, así que
+tras recuperarse vuelve a recibir tráfico.
+
+Para probar contra servidores locales basta con apuntar `BREVO_API_URL` y
+`EMAIL_HOST` / `EMAIL_PORT` / `EMAIL_USE_TLS` a ellos
+(`python manage.py check_email_transports --to ...`).
+"""
+import logging
+import math
+import os
+import time
+from collections import deque
+from threading import Lock
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.message import make_msgid
+from django.utils.module_loading import import_string
+
+from .email_batcher import SendResult
+from .resilience import CircuitOpen, get_breaker
+
+logger = logging.getLogger(__name__)
+
+# Muestras de latencia guardadas por proveedor.
+HEALTH_SAMPLES = 200
+
+
+class EmailTransport:
+    """Interfaz de un proveedor de correo."""
+
+    name = ''
+
+    def configured(self):
+        """True si tiene credenciales / host para enviar."""
+        return True
+
+    def available(self):
+        """False mientras el proveedor esté marcado como caído (circuito abierto)."""
+        return True
+
+    def send(self, message):
+        """Envía un mensaje y devuelve su `SendResult` (o lanza la excepción)."""
+        raise NotImplementedError
+
+    def send_many(self, messages):
+        """
+        Envía varios mensajes; por defecto uno a uno. Un fallo solo marca su
+        propio mensaje: los ya enviados no se repiten en otro proveedor.
+        """
+        results = []
+        for message in messages:
+            try:
+                results.append(self.send(message))
+            except CircuitOpen as exc:
+                results.append(SendResult(False, '', str(exc)))
+            except Exception as exc:  # noqa: BLE001 - el resto del lote sigue
+                logger.error("❌ Proveedor de correo '%s' falló con %s: %s", self.name, message['to_email'], exc)
+                results.append(SendResult(False, '', f"{type(exc).__name__}: {exc}"))
+        return results
+
+
+class BrevoTransport(EmailTransport):
+    name = 'brevo'
+
+    def configured(self):
+        from .email_sender import _get_brevo_api_key
+        return bool(_get_brevo_api_key())
+
+    def available(self):
+        from .email_sender import _brevo_breaker
+        return not _brevo_breaker().is_open()
+
+    def send(self, message):
+        return self.send_many([message])[0]
+
+    def send_many(self, messages):
+        from .email_sender import brevo_send_batch
+        return brevo_send_batch(messages)
+
+
+class SMTPTransport(EmailTransport):
+    name = 'smtp'
+
+    def configured(self):
+        return bool(settings.EMAIL_HOST)
+
+    def _breaker(self):
+        return get_breaker(
+            'smtp',
+            failure_threshold=settings.BREVO_BREAKER_FAILURES,
+            reset_timeout=settings.BREVO_BREAKER_RESET,
+        )
+
+    def available(self):
+        return not self._breaker().is_open()
+
+    def send(self, message):
+        breaker = self._breaker()
+        probe = breaker.check()
+        try:
+            message_id = make_msgid()
+            email = EmailMultiAlternatives(
+                subject=message['subject'],
+                body=message['text_content'],
+                from_email=message.get('from_email') or settings.DEFAULT_FROM_EMAIL,
+                to=[message['to_email']],
+                headers={'Message-ID': message_id},
+                connection=get_connection(
+                    'django.core.mail.backends.smtp.EmailBackend', timeout=settings.EMAIL_TIMEOUT
+                ),
+            )
+            if message.get('html_content'):
+                email.attach_alternative(message['html_content'], "text/html")
+            try:
+                sent = email.send(fail_silently=False)
+            except Exception:
+                breaker.record_failure()
+                raise
+            breaker.record_success()
+        finally:
+            if probe:
+                breaker.release_probe()
+        if sent != 1:
+            return SendResult(False, '', f"SMTP aceptó {sent} mensajes")
+        return SendResult(True, message_id, '')
+
+
+TRANSPORTS = {
+    BrevoTransport.name: BrevoTransport,
+    SMTPTransport.name: SMTPTransport,
+}
+
+
+class TransportHealth:
+    """Latencias y resultados recientes de un proveedor."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.samples = deque(maxlen=HEALTH_SAMPLES)   # (momento, latencia, ok)
+        self.counters = {'sent': 0, 'failed': 0, 'failovers_from': 0}
+
+    def record(self, latency, ok):
+        with self.lock:
+            self.samples.append((time.monotonic(), latency, ok))
+            self.counters['sent' if ok else 'failed'] += 1
+
+    def count_failover(self):
+        with self.lock:
+            self.counters['failovers_from'] += 1
+
+    def snapshot(self, window):
+        """(muestras, tasa de éxito, p95) dentro de la ventana."""
+        cutoff = time.monotonic() - window
+        with self.lock:
+            recent = [(latency, ok) for at, latency, ok in self.samples if at >= cutoff]
+        if not recent:
+            return 0, 1.0, 0.0
+        latencies = sorted(latency for latency, _ in recent)
+        success_rate = sum(1 for _, ok in recent if ok) / len(recent)
+        return len(recent), success_rate, latencies[math.ceil(0.95 * len(latencies)) - 1]
+
+
+class TransportRouter:
+    """Elige proveedor por p95 y tasa de éxito recientes; failover al siguiente."""
+
+    def __init__(self, transports, window=300, min_samples=5, default_latency=1.0):
+        self.pid = os.getpid()
+        self.transports = transports
+        self.window = window
+        self.min_samples = min_samples
+        self.default_latency = default_latency
+        self.health = {transport.name: TransportHealth() for transport in transports}
+
+    def has_transport(self, name):
+        return name in self.health
+
+    def has_other_than(self, name):
+        return any(transport.name != name for transport in self.transports)
+
+    def score(self, transport):
+        """Latencia esperada (s): p95 dividido por la tasa de éxito reciente."""
+        samples, success_rate, p95 = self.health[transport.name].snapshot(self.window)
+        if samples < self.min_samples:
+            return self.default_latency
+        return p95 / max(success_rate, 0.05)
+
+    def ranked(self, exclude=()):
+        """Proveedores disponibles ordenados del mejor al peor (empate: orden configurado)."""
+        candidates = [
+            (self.score(transport), index, transport)
+            for index, transport in enumerate(self.transports)
+            if transport.name not in exclude and transport.available()
+        ]
+        return [transport for _, _, transport in sorted(candidates, key=lambda item: item[:2])]
+
+    def record(self, name, latency, ok):
+        if name in self.health:
+            self.health[name].record(latency, ok)
+
+    def _attempt(self, transport, messages):
+        started = time.monotonic()
+        try:
+            results = transport.send_many(messages)
+        except CircuitOpen as exc:
+            results = [SendResult(False, '', str(exc))] * len(messages)
+        except Exception as exc:  # noqa: BLE001 - se prueba el siguiente proveedor
+            logger.error("❌ Proveedor de correo '%s' falló: %s", transport.name, exc)
+            results = [SendResult(False, '', f"{type(exc).__name__}: {exc}")] * len(messages)
+        # Un rechazo del mensaje (4xx) no indica un proveedor caído
+        healthy = any(result.ok or not result.retryable for result in results)
+        self.record(transport.name, time.monotonic() - started, healthy)
+        return results
+
+    def send(self, message, exclude=()):
+        return self.send_many([message], exclude=exclude)[0]
+
+    def send_many(self, messages, exclude=()):
+        """
+        Envía `messages` por el mejor proveedor; los que fallen por el
+        proveedor (`retryable`) se reintentan en los siguientes. Devuelve un
+        `SendResult` por mensaje, en orden.
+        """
+        results = [SendResult(False, '', 'Ningún proveedor de correo disponible')] * len(messages)
+        pending = list(range(len(messages)))
+        for transport in self.ranked(exclude):
+            attempt = self._attempt(transport, [messages[i] for i in pending])
+            for i, result in zip(pending, attempt):
+                results[i] = result
+            pending = [i for i, result in zip(pending, attempt) if not result.ok and result.retryable]
+            if not pending:
+                break
+            self.health[transport.name].count_failover()
+            logger.warning("⚠️ %s correo(s) fallaron en '%s': se prueba otro proveedor",
+                           len(pending), transport.name)
+        return results
+
+    def stats(self):
+        data = {}
+        for transport in self.transports:
+            samples, success_rate, p95 = self.health[transport.name].snapshot(self.window)
+            data[transport.name] = {
+                **self.health[transport.name].counters,
+                'available': transport.available(),
+                'recent_samples': samples,
+                'success_rate': round(success_rate, 3),
+                'p95_ms': round(p95 * 1000, 1),
+                'score_ms': round(self.score(transport) * 1000, 1),
+            }
+        return data
+
+
+def build_transports(names):
+    transports = []
+    for name in names:
+        name = name.strip()
+        if not name:
+            continue
+        transport_class = TRANSPORTS.get(name) or import_string(name)
+        transport = transport_class()
+        if transport.configured():
+            transports.append(transport)
+        else:
+            logger.warning("⚠️ Proveedor de correo '%s' sin configurar: se omite", name)
+    return transports
+
+
+_router = None
+_router_lock = Lock()
+
+
+def get_router():
+    """Enrutador del proceso actual (se recrea tras un fork de gunicorn)."""
+    global _router
+
+    pid = os.getpid()
+    if _router is None or _router.pid != pid:
+        with _router_lock:
+            if _router is None or _router.pid != pid:
+                _router = TransportRouter(
+                    build_transports(settings.EMAIL_TRANSPORTS),
+                    window=settings.EMAIL_ROUTER_WINDOW,
+                    min_samples=settings.EMAIL_ROUTER_MIN_SAMPLES,
+                    default_latency=settings.EMAIL_ROUTER_DEFAULT_LATENCY,
+                )
+    return _router
+
+
+def stats():
+    if _router is None or _router.pid != os.getpid():
+        return {}
+    return _router.stats()
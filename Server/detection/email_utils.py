@@ -1,13 +1,15 @@
 """
-Sistema de envío de emails asíncrono optimizado para SendGrid SMTP
-Evita bloqueos y timeouts en el servidor
-SendGrid es más rápido y confiable que Gmail
+Sistema de envío de emails asíncrono con cola propia (legado).
+Evita bloqueos y timeouts en el servidor.
+
+El envío pasa por el enrutador de proveedores (`detection.email_transports`:
+Brevo HTTP / SMTP con failover). El worker se arranca con el primer email
+encolado, no al importar el módulo.
 """
 from threading import Thread, Lock
-from queue import Queue, Empty
+from queue import Queue
 import time
 import logging
-from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.conf import settings
 
@@ -30,7 +32,7 @@ stats = {
 
 class EmailWorker(Thread):
     """
-    Worker dedicado que procesa emails de forma asíncrona con SendGrid
+    Worker dedicado que procesa emails de forma asíncrona
     Corre en un thread separado sin bloquear el servidor
     """
     
@@ -44,32 +46,25 @@ class EmailWorker(Thread):
     
     def run(self):
         """Loop principal que procesa emails continuamente"""
-        logger.info("🚀 SendGrid Email Worker iniciado y listo")
+        logger.info("🚀 Email Worker iniciado y listo")
         
         while self._running:
+            # Bloquea hasta que llegue un email (sin sondeo); None = detener
+            email_data = email_queue.get()
             try:
-                # Espera máximo 1 segundo por un email en la cola
-                email_data = email_queue.get(timeout=1)
-                
-                if email_data:
-                    success = self._send_email_with_retry(email_data)
-                    
-                    if success:
-                        with queue_lock:
-                            stats['sent'] += 1
-                    else:
-                        with queue_lock:
-                            stats['failed'] += 1
-                
-                email_queue.task_done()
-                
-            except Empty:
-                # Es normal, la cola está vacía
-                time.sleep(0.1)
-                
+                if email_data is None:
+                    break
+
+                success = self._send_email_with_retry(email_data)
+
+                with queue_lock:
+                    stats['sent' if success else 'failed'] += 1
+
             except Exception as e:
                 logger.error(f"❌ Error inesperado en Email Worker: {e}")
-                time.sleep(1)
+
+            finally:
+                email_queue.task_done()
     
     def _send_email_with_retry(self, email_data):
         """
@@ -95,49 +90,44 @@ class EmailWorker(Thread):
         return False
     
     def _send_email(self, email_data, attempt=1):
-        """Envía un email individual usando SendGrid"""
+        """Envía un email individual por el mejor proveedor disponible"""
+        from .email_transports import get_router
+
         start_time = time.time()
-        
-        logger.info(f"📧 [Intento {attempt}] Enviando vía SendGrid a {email_data['to']}")
-        
-        try:
-            # Crear email multipart
-            email = EmailMultiAlternatives(
-                subject=email_data['subject'],
-                body=email_data['text_content'],
-                from_email=email_data['from_email'],
-                to=email_data['to'],
-            )
-            
-            # Adjuntar HTML si existe
-            if email_data.get('html_content'):
-                email.attach_alternative(email_data['html_content'], "text/html")
-            
-            # Enviar con timeout (SendGrid suele responder en 1-3 segundos)
-            result = email.send(fail_silently=False)
-            
-            elapsed = time.time() - start_time
-            
-            if result == 1:
-                logger.info(f"✅ Email enviado vía SendGrid en {elapsed:.2f}s a {email_data['to']}")
-                return True
-            else:
-                logger.warning(f"⚠️ Email.send() retornó {result}")
-                return False
-                
-        except Exception as e:
-            elapsed = time.time() - start_time
-            logger.error(f"❌ Error enviando email vía SendGrid después de {elapsed:.2f}s: {e}")
-            raise
-    
+
+        logger.info(f"📧 [Intento {attempt}] Enviando a {email_data['to']}")
+
+        router = get_router()
+        results = [
+            router.send({
+                'subject': email_data['subject'],
+                'text_content': email_data['text_content'],
+                'to_email': to_email,
+                'html_content': email_data.get('html_content'),
+                'from_email': email_data['from_email'],
+            })
+            for to_email in email_data['to']
+        ]
+
+        elapsed = time.time() - start_time
+        if all(result.ok for result in results):
+            logger.info(f"✅ Email enviado en {elapsed:.2f}s a {email_data['to']}")
+            return True
+
+        errors = '; '.join(result.error for result in results if not result.ok)
+        logger.error(f"❌ Error enviando email después de {elapsed:.2f}s: {errors}")
+        raise RuntimeError(errors)
+
     def stop(self):
         """Detiene el worker de forma ordenada"""
         logger.info("🛑 Deteniendo Email Worker...")
         self._running = False
         stats['processing'] = False
+        email_queue.put(None)
 
 
-# Iniciar el worker automáticamente al importar el módulo
+# El worker se inicia con el primer email encolado (no al importar el módulo:
+# con preload_app el hilo quedaría en el master de gunicorn y no en los workers)
 _email_worker = None
 
 def start_email_worker():
@@ -147,13 +137,10 @@ def start_email_worker():
     if _email_worker is None or not _email_worker.is_alive():
         _email_worker = EmailWorker(max_retries=3, retry_delay=1)
         _email_worker.start()
-        logger.info("✅ SendGrid Email Worker iniciado")
+        logger.info("✅ Email Worker iniciado")
     
     return _email_worker
 
-# Iniciar automáticamente
-start_email_worker()
-
 
 def send_email_async(subject, text_content, to_emails, html_content=None, from_email=None):
     """
@@ -322,16 +309,16 @@ def wait_for_queue_empty(timeout=30):
         bool: True si la cola se vació, False si hubo timeout
     """
     start = time.time()
-    
-    while not email_queue.empty():
-        if time.time() - start > timeout:
-            logger.warning(f"⚠️ Timeout ({timeout}s) esperando cola vacía")
-            return False
-        time.sleep(0.1)
-    
-    # Esperar un poco más para asegurar que se procesó todo
-    time.sleep(0.5)
-    
+
+    # Espera a que el worker marque como terminados todos los emails (sin sondeo)
+    with email_queue.all_tasks_done:
+        while email_queue.unfinished_tasks:
+            remaining = timeout - (time.time() - start)
+            if remaining <= 0:
+                logger.warning(f"⚠️ Timeout ({timeout}s) esperando cola vacía")
+                return False
+            email_queue.all_tasks_done.wait(remaining)
+
     logger.info(f"✅ Cola vacía en {time.time() - start:.2f}s")
     return True
 
@@ -14,4 +14,4 @@ class DetectionFilter(django_filters.FilterSet):
 	class Meta:
 		model = UploadAlert
 		fields = '__all__'
-		exclude = ['customer', 'userID', 'image', 'uuid']
\ No newline at end of file
+		exclude = ['customer', 'userID', 'image', 'thumbnail', 'preview', 'uuid', 'public_id']
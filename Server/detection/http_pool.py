@@ -0,0 +1,140 @@
+"""
+Clientes HTTP síncronos con conexiones keep-alive, compartidos por proceso.
+
+Antes cada correo hacía `requests.post(...)` sin sesión: DNS + TCP + TLS hacia
+api.brevo.com por cada alerta. `get_session('brevo')` devuelve una
+`requests.Session` con un pool de conexiones persistentes (urllib3) que
+comparten los hilos del despachador de notificaciones.
+
+  - Un pool por nombre y por proceso: con `preload_app = True` el módulo se
+    importa en el master de gunicorn; igual que el despachador, se detecta el
+    fork (cambio de PID) y se crea una sesión nueva en cada worker, para no
+    compartir sockets TLS entre procesos.
+  - `stats()` expone por pool: peticiones, conexiones nuevas (el resto son
+    reutilizadas), proporción de reutilización, errores (y su tasa) y
+    latencias (media, p50, p95, máxima).
+  - Web Push usa un pool por origen del servicio push (`push:<origen>`, p. ej.
+    `push:https://fcm.googleapis.com`), así que las métricas salen por origen.
+
+Uso:
+    from detection.http_pool import get_session
+    response = get_session('brevo').post(url, json=payload, timeout=15)
+"""
+import os
+import time
+from collections import deque
+from threading import Lock
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Últimas latencias que se guardan para calcular percentiles.
+LATENCY_SAMPLES = 512
+
+
+class PoolStats:
+    """Contadores de un pool: peticiones, conexiones abiertas y latencias."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.requests = 0
+        self.errors = 0
+        self.new_connections = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def record(self, elapsed, ok):
+        with self.lock:
+            self.requests += 1
+            if not ok:
+                self.errors += 1
+            self.latency_total += elapsed
+            self.latency_max = max(self.latency_max, elapsed)
+            self.latencies.append(elapsed)
+
+    def connection_opened(self):
+        with self.lock:
+            self.new_connections += 1
+
+    def snapshot(self):
+        with self.lock:
+            samples = sorted(self.latencies)
+            data = {
+                'requests': self.requests,
+                'errors': self.errors,
+                'new_connections': self.new_connections,
+                'reused_connections': max(0, self.requests - self.new_connections),
+                'latency_avg_ms': round(self.latency_total / self.requests * 1000, 1) if self.requests else 0.0,
+                'latency_max_ms': round(self.latency_max * 1000, 1),
+                'reuse_ratio': round(1 - self.new_connections / self.requests, 3) if self.requests else 0.0,
+                'error_rate': round(self.errors / self.requests, 3) if self.requests else 0.0,
+            }
+        for name, fraction in (('latency_p50_ms', 0.50), ('latency_p95_ms', 0.95)):
+            data[name] = round(samples[int(fraction * (len(samples) - 1))] * 1000, 1) if samples else 0.0
+        return data
+
+
+def _counting_pool(base, stats):
+    """Subclase del pool de urllib3 que cuenta cada conexión TCP/TLS abierta."""
+
+    class CountingPool(base):
+        def _new_conn(self):
+            stats.connection_opened()
+            return super()._new_conn()
+
+    return CountingPool
+
+
+class PooledSession(requests.Session):
+    """`requests.Session` con pool keep-alive dimensionado y métricas."""
+
+    def __init__(self, name, pool_maxsize=10):
+        super().__init__()
+        self.name = name
+        self.pid = os.getpid()
+        self.pool_stats = PoolStats()
+
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=0)
+        adapter.poolmanager.pool_classes_by_scheme = {
+            'http': _counting_pool(HTTPConnectionPool, self.pool_stats),
+            'https': _counting_pool(HTTPSConnectionPool, self.pool_stats),
+        }
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
+
+    def request(self, method, url, *args, **kwargs):
+        started = time.monotonic()
+        ok = False
+        try:
+            response = super().request(method, url, *args, **kwargs)
+            ok = response.status_code < 500
+            return response
+        finally:
+            self.pool_stats.record(time.monotonic() - started, ok)
+
+    def stats(self):
+        return self.pool_stats.snapshot()
+
+
+_sessions = {}
+_sessions_lock = Lock()
+
+
+def get_session(name, pool_maxsize=10):
+    """Sesión `name` del proceso actual (se recrea tras un fork de gunicorn)."""
+    pid = os.getpid()
+    session = _sessions.get(name)
+    if session is None or session.pid != pid:
+        with _sessions_lock:
+            session = _sessions.get(name)
+            if session is None or session.pid != pid:
+                session = _sessions[name] = PooledSession(name, pool_maxsize=pool_maxsize)
+    return session
+
+
+def stats():
+    """Métricas de todos los pools del proceso actual."""
+    pid = os.getpid()
+    return {name: session.stats() for name, session in list(_sessions.items()) if session.pid == pid}
@@ -0,0 +1,253 @@
+"""
+Actualizaciones en vivo del panel (Server-Sent Events).
+
+Cada alerta nueva se publica como un resumen JSON y llega a todos los
+navegadores conectados del dueño, en cualquier worker de gunicorn:
+
+  - PostgreSQL: `publish_alerts()` hace `pg_notify` DENTRO de la transacción
+    de ingesta (la notificación solo sale si la alerta se guarda). En cada
+    proceso un hilo escucha con `LISTEN` en una conexión propia y reparte los
+    avisos a los suscriptores locales. Sin sondeo: un INSERT, un NOTIFY.
+  - Otras bases de datos (SQLite en desarrollo): reparto local tras el commit,
+    solo dentro del proceso que guardó la alerta.
+
+Los suscriptores (una conexión SSE del panel) reciben los resúmenes en una
+`asyncio.Queue` acotada: si un navegador no consume, se descartan sus avisos
+en vez de acumular memoria.
+
+El flujo SSE solo se sirve con workers ASGI (uvicorn): con workers WSGI
+('sync' / 'gthread') cada panel abierto ocuparía un hilo durante toda la
+conexión, así que la vista responde 204 y el panel sondea
+`recent_alert_summaries()` cada `LIVE_UPDATES_POLL_SECONDS`.
+"""
+import asyncio
+import json
+import logging
+import os
+import select
+import time
+from threading import Lock, Thread
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'weapon_alerts'
+
+# Avisos pendientes por conexión antes de empezar a descartar.
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def alert_summary(alert):
+    """Resumen de una alerta para el panel (lo que dibuja una fila de la tabla)."""
+    image_name = getattr(alert.image, 'name', '') or ''
+    try:
+        image_url = alert.image.url if image_name else ''
+    except Exception:  # noqa: BLE001 - el resumen no debe romper la ingesta
+        image_url = ''
+    return {
+        'user': alert.userID.user_id,
+        'id': alert.pk,
+        'location': alert.location,
+        'alertReceiver': alert.alertReceiver,
+        'dateCreated': timezone.localtime(alert.dateCreated or timezone.now()).strftime('%Y-%m-%d %H:%M:%S'),
+        'image_url': image_url,
+        'url': f'/alert/{alert.public_id}/' if alert.public_id else '',
+    }
+
+
+def publish_alerts(alerts):
+    """
+    Publica las alertas recién creadas. Debe llamarse dentro de la transacción
+    de ingesta: la publicación se confirma o se descarta con ella.
+    Con `LIVE_UPDATES_ENABLED` desactivado no hace nada (el panel sondea).
+    """
+    if not settings.LIVE_UPDATES_ENABLED:
+        return
+    payloads = [json.dumps(alert_summary(alert)) for alert in alerts]
+    if not payloads:
+        return
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload",
+                [CHANNEL, payloads],
+            )
+    else:
+        transaction.on_commit(lambda: get_broker().dispatch_many(payloads))
+
+
+def recent_alert_summaries(token, after=None, limit=50):
+    """
+    Sondeo del panel (sin SSE): resúmenes de las alertas de `token` con id
+    mayor que `after`, en orden de llegada, y el último id visto.
+    """
+    from .models import UploadAlert
+
+    alerts = UploadAlert.objects.filter(userID=token)
+    if after is None:
+        # Primera consulta: solo se fija el punto de partida
+        return [], alerts.order_by('-pk').values_list('pk', flat=True).first() or 0
+    rows = list(alerts.filter(pk__gt=after).select_related('userID').order_by('pk')[:limit])
+    return [alert_summary(alert) for alert in rows], (rows[-1].pk if rows else after)
+
+
+class Subscriber:
+    """Cola de avisos de una conexión SSE (event loop ASGI)."""
+
+    def __init__(self, user_id, loop):
+        self.user_id = user_id
+        self.loop = loop
+        self.dropped = 0
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def push(self, event):
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._put, event)
+
+
+class Broker:
+    """Suscriptores locales del proceso y, con PostgreSQL, el hilo LISTEN."""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.lock = Lock()
+        self.subscribers = {}    # user_id -> set(Subscriber)
+        self.listener = None
+        self.counters = {'published': 0, 'delivered': 0, 'listener_errors': 0}
+
+    def subscribe(self, user_id, loop):
+        subscriber = Subscriber(user_id, loop)
+        with self.lock:
+            self.subscribers.setdefault(user_id, set()).add(subscriber)
+        self._ensure_listener()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            group = self.subscribers.get(subscriber.user_id)
+            if group is not None:
+                group.discard(subscriber)
+                if not group:
+                    del self.subscribers[subscriber.user_id]
+
+    def dispatch_many(self, payloads):
+        for payload in payloads:
+            self.dispatch(payload)
+
+    def dispatch(self, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+        with self.lock:
+            self.counters['published'] += 1
+            targets = list(self.subscribers.get(event.get('user'), ()))
+            self.counters['delivered'] += len(targets)
+        for subscriber in targets:
+            subscriber.push(event)
+
+    def _ensure_listener(self):
+        if connection.vendor != 'postgresql':
+            return
+        with self.lock:
+            if self.listener is None or not self.listener.is_alive():
+                self.listener = Thread(target=self._listen, name='alerts-listen', daemon=True)
+                self.listener.start()
+
+    def _listen(self):
+        """Bucle LISTEN con reconexión; reparte cada NOTIFY a los suscriptores."""
+        wrapper = connections['default']
+        while True:
+            conn = None
+            try:
+                conn = wrapper.get_new_connection(wrapper.get_connection_params())
+                conn.autocommit = True
+                conn.cursor().execute(f'LISTEN {CHANNEL}')
+                logger.info("📡 Escuchando avisos de alertas (LISTEN %s)", CHANNEL)
+                while True:
+                    if callable(getattr(conn, 'notifies', None)):
+                        # psycopg 3
+                        for notify in conn.notifies(timeout=5.0):
+                            self.dispatch(notify.payload)
+                    else:
+                        # psycopg2
+                        if select.select([conn], [], [], 5.0)[0]:
+                            conn.poll()
+                            while conn.notifies:
+                                self.dispatch(conn.notifies.pop(0).payload)
+            except Exception as exc:  # noqa: BLE001 - reconectar siempre
+                with self.lock:
+                    self.counters['listener_errors'] += 1
+                logger.error("❌ LISTEN de alertas interrumpido: %s. Reintentando en 5s", exc)
+                time.sleep(5)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:  # noqa: BLE001
+                        pass
+
+    def stats(self):
+        with self.lock:
+            return {
+                **self.counters,
+                'connections': sum(len(group) for group in self.subscribers.values()),
+                'users': len(self.subscribers),
+                'listening': bool(self.listener and self.listener.is_alive()),
+            }
+
+
+_broker = None
+_broker_lock = Lock()
+
+
+def get_broker():
+    """Broker del proceso actual (se recrea tras un fork de gunicorn)."""
+    global _broker
+
+    pid = os.getpid()
+    if _broker is None or _broker.pid != pid:
+        with _broker_lock:
+            if _broker is None or _broker.pid != pid:
+                _broker = Broker()
+    return _broker
+
+
+def stats():
+    if _broker is None or _broker.pid != os.getpid():
+        return {}
+    return _broker.stats()
+
+
+# ============================================
+# Flujo SSE
+# ============================================
+
+def _event(summary):
+    return f"id: {summary['id']}\nevent: alert\ndata: {json.dumps(summary)}\n\n"
+
+
+async def astream(user_id):
+    """Generador SSE asíncrono (workers ASGI/uvicorn): sin hilos por conexión."""
+    broker = get_broker()
+    subscriber = broker.subscribe(user_id, loop=asyncio.get_running_loop())
+    deadline = time.monotonic() + settings.LIVE_UPDATES_STREAM_SECONDS
+    try:
+        yield f"retry: {settings.LIVE_UPDATES_RETRY_MS}\n\n"
+        while time.monotonic() < deadline:
+            try:
+                summary = await asyncio.wait_for(subscriber.queue.get(), settings.LIVE_UPDATES_HEARTBEAT)
+                yield _event(summary)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+    finally:
+        broker.unsubscribe(subscriber)
@@ -0,0 +1,60 @@
+"""
+Comando de gestión: archive_alerts
+
+Mueve a la tabla de archivo (ArchivedAlert) las alertas con más de
+`ALERT_ARCHIVE_AFTER_DAYS` días, por bloques, y copia sus imágenes al prefijo
+'archive/' del bucket (clase ALERT_ARCHIVE_STORAGE_CLASS). Después borra las
+imágenes de la tabla caliente de las alertas archivadas hace más de lo que
+vive la página de la alerta en caché (`ALERT_PAGE_CACHE_SECONDS`, o
+`ALERT_PAGE_LOCAL_CACHE_SECONDS` con la caché por proceso; ver detection/archive.py).
+
+Pensado para ejecutarse a diario (cron / Render cron job). Las alertas con
+notificaciones pendientes se saltan y se archivan en la siguiente ejecución.
+
+Uso:
+    python manage.py archive_alerts
+    python manage.py archive_alerts --dry-run
+    python manage.py archive_alerts --days 30 --chunk-size 200
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from detection.archive import aged_alerts, archive_alerts, purge_hot_files
+from detection.models import ArchivedAlert
+
+
+class Command(BaseCommand):
+    help = "Archiva por bloques las alertas antiguas y limpia sus imágenes de la tabla caliente."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ALERT_ARCHIVE_AFTER_DAYS,
+                            help="Antigüedad (días) a partir de la que se archiva (por defecto %(default)s).")
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help="Alertas archivadas por transacción (por defecto %(default)s).")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Solo cuenta lo que se archivaría.")
+
+    def handle(self, *args, **options):
+        aged = aged_alerts(options['days']).order_by('pk')
+
+        if options['dry_run']:
+            self.stdout.write(f"🔎 Se archivarían {aged.count()} alertas con más de {options['days']} días.")
+            return
+
+        archived = skipped = 0
+        last_pk = 0
+        while True:
+            chunk = list(aged.filter(pk__gt=last_pk)[:options['chunk_size']])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+            done = len(archive_alerts(chunk, reason=ArchivedAlert.REASON_AGE))
+            archived += done
+            skipped += len(chunk) - done
+
+        purged = purge_hot_files()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"🗄️ Alertas archivadas: {archived} ({skipped} pendientes de notificar o con error de copia); "
+            f"imágenes originales borradas de {purged} alertas archivadas."
+        ))
@@ -0,0 +1,66 @@
+"""
+Comando de gestión: check_email_transports
+
+Envía un correo de prueba por cada proveedor configurado (`EMAIL_TRANSPORTS`)
+y muestra su latencia, el resultado y el orden en que el enrutador los
+elegiría. Sirve para validar credenciales o probar contra servidores locales
+(`BREVO_API_URL=http://127.0.0.1:8025/...`, `EMAIL_HOST=127.0.0.1`,
+`EMAIL_PORT=1025`, `EMAIL_USE_TLS=False`).
+
+Uso:
+    python manage.py check_email_transports --to correo@dominio.com
+    python manage.py check_email_transports --to correo@dominio.com --transport smtp
+    python manage.py check_email_transports --to correo@dominio.com --via-router --count 20
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from detection.email_sender import _message
+from detection.email_transports import get_router
+
+
+class Command(BaseCommand):
+    help = "Prueba los proveedores de correo y muestra el enrutado por latencia."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--to', required=True, help="Destinatario de los correos de prueba.")
+        parser.add_argument('--transport', default=None,
+                            help="Probar solo este proveedor (p. ej. brevo o smtp).")
+        parser.add_argument('--via-router', action='store_true',
+                            help="Enviar por el enrutador (mejor proveedor + failover) en vez de uno a uno.")
+        parser.add_argument('--count', type=int, default=1,
+                            help="Correos por proveedor (por defecto 1).")
+
+    def handle(self, *args, **options):
+        router = get_router()
+        transports = [
+            transport for transport in router.transports
+            if options['transport'] in (None, transport.name)
+        ]
+        if not transports:
+            raise CommandError("No hay proveedores de correo configurados para probar.")
+
+        for index in range(options['count']):
+            message = _message(
+                subject=f"Prueba de proveedores de correo #{index + 1}",
+                text_content="Correo de prueba del Sistema de Detección de Armas.",
+                to_email=options['to'],
+            )
+            if options['via_router']:
+                targets = [('router', lambda msg: router.send(msg))]
+            else:
+                targets = [(transport.name, lambda msg, t=transport: router._attempt(t, [msg])[0])
+                           for transport in transports]
+
+            for name, send in targets:
+                started = time.monotonic()
+                result = send(message)
+                elapsed = (time.monotonic() - started) * 1000
+                status = '✅' if result.ok else '❌'
+                detail = result.message_id if result.ok else result.error
+                self.stdout.write(f"{status} {name:<8} {elapsed:8.1f} ms  {detail}")
+
+        self.stdout.write("\n📊 Orden del enrutador: " + ', '.join(t.name for t in router.ranked()))
+        for name, data in router.stats().items():
+            self.stdout.write(f"   {name}: {data}")
@@ -0,0 +1,102 @@
+"""
+Comando de gestión: explain_dashboard
+
+Muestra el plan de ejecución (EXPLAIN) de las consultas del panel de alertas
+tal como las construye la vista `home` (DetectionFilter + paginación por
+cursor) y comprueba qué índices usan:
+  - uploadalert_user_created_idx  (userID, -dateCreated, -id): primera página
+    y páginas siguientes por cursor, rango de fechas;
+  - uploadalert_location_trgm / uploadalert_receiver_trgm (pg_trgm, solo
+    PostgreSQL): filtros `icontains` de ubicación y receptor.
+
+Con pocas filas el planificador puede preferir un recorrido secuencial aunque
+el índice exista; para una comprobación realista usar una base con datos (o
+`--analyze` sobre producción, que ejecuta las consultas).
+
+Uso:
+    python manage.py explain_dashboard
+    python manage.py explain_dashboard --user admin --location norte --receiver gmail
+    python manage.py explain_dashboard --analyze
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from detection.filters import DetectionFilter
+from detection.models import UploadAlert
+from detection.pagination import NEXT, capped_count, page_queryset
+
+INDEXES = ('uploadalert_user_created_idx', 'uploadalert_location_trgm', 'uploadalert_receiver_trgm')
+
+
+class Command(BaseCommand):
+    help = "Muestra el EXPLAIN de las consultas del panel y los índices que usan."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', default=None,
+                            help="Usuario cuyo panel se analiza (por defecto, el que tiene más alertas).")
+        parser.add_argument('--location', default='norte', help="Texto del filtro de ubicación.")
+        parser.add_argument('--receiver', default='gmail', help="Texto del filtro de receptor.")
+        parser.add_argument('--per-page', type=int, default=25)
+        parser.add_argument('--analyze', action='store_true',
+                            help="EXPLAIN ANALYZE (ejecuta las consultas; solo PostgreSQL).")
+
+    def handle(self, *args, **options):
+        token = self._token(options['user'])
+        base = UploadAlert.objects.filter(userID=token).order_by('-dateCreated')
+        per_page = options['per_page']
+        today = timezone.localdate()
+
+        def filtered(**params):
+            return DetectionFilter(params, queryset=base).qs
+
+        # Posición de un cursor a media lista, como al pulsar "Siguiente" varias veces.
+        middle = filtered().order_by('-dateCreated', '-id')[per_page * 10:per_page * 10 + 1].first()
+        if middle is None:
+            middle = filtered().order_by('-dateCreated', '-id').first()
+        cursor = (middle.dateCreated, middle.pk, NEXT) if middle else None
+
+        queries = [
+            ("Primera página", page_queryset(filtered(), None, per_page)),
+            ("Página por cursor", page_queryset(filtered(), cursor, per_page)),
+            ("Conteo acotado", filtered().order_by()[:1001]),
+            ("Rango de fechas", page_queryset(filtered(
+                startDate=str(today - timedelta(days=30)), endDate=str(today)), None, per_page)),
+            ("Ubicación icontains", page_queryset(filtered(location=options['location']), None, per_page)),
+            ("Receptor icontains", page_queryset(filtered(alertReceiver=options['receiver']), None, per_page)),
+        ]
+
+        explain_options = {}
+        if options['analyze']:
+            if connection.vendor != 'postgresql':
+                raise CommandError("--analyze solo está disponible en PostgreSQL.")
+            explain_options = {'analyze': True, 'buffers': True}
+
+        total, exact = capped_count(filtered(), 1000)
+        self.stdout.write(f"📊 Panel de '{token.user.username}': {total}{'' if exact else '+'} alertas "
+                          f"({connection.vendor})\n")
+
+        for title, queryset in queries:
+            plan = queryset.explain(**explain_options)
+            used = [name for name in INDEXES if name in plan]
+            status = '✅' if used else '⚠️'
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{status} {title}: {', '.join(used) or 'sin índice del panel'}"))
+            self.stdout.write(plan + "\n")
+
+    def _token(self, username):
+        if username:
+            token = Token.objects.filter(user__username=username).select_related('user').first()
+            if token is None:
+                raise CommandError(f"El usuario '{username}' no existe o no tiene token.")
+            return token
+        token = (
+            Token.objects.annotate(alerts=Count('uploadalert')).order_by('-alerts')
+            .select_related('user').first()
+        )
+        if token is None:
+            raise CommandError("No hay usuarios con token.")
+        return token
@@ -0,0 +1,47 @@
+"""
+Comando de gestión: generate_derivatives
+
+Genera la miniatura (thumbs/<uuid>.jpg) y la vista previa WebP
+(previews/<uuid>.webp) de las alertas que aún no las tienen, p. ej. alertas
+anteriores a esta función o cuyo encolado se omitió con el carril 'media'
+lleno.
+
+Uso:
+    python manage.py generate_derivatives             # solo las que faltan
+    python manage.py generate_derivatives --all       # regenerar todas
+    python manage.py generate_derivatives --limit 500
+"""
+from django.core.management.base import BaseCommand
+
+from detection.derivatives import generate_derivatives
+from detection.models import UploadAlert
+
+
+class Command(BaseCommand):
+    help = "Genera miniaturas y vistas previas WebP de las alertas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help="Regenera también las alertas que ya tienen derivados.")
+        parser.add_argument('--limit', type=int, default=None,
+                            help="Máximo de alertas a procesar.")
+
+    def handle(self, *args, **options):
+        queryset = UploadAlert.objects.order_by('-dateCreated')
+        if not options['all']:
+            queryset = queryset.filter(thumbnail='')
+        if options['limit']:
+            queryset = queryset[:options['limit']]
+
+        done = failed = 0
+        for alert in queryset.iterator(chunk_size=200):
+            try:
+                generate_derivatives(alert)
+                done += 1
+            except Exception as exc:  # noqa: BLE001 - continuar con el resto
+                failed += 1
+                self.stderr.write(f"❌ Alerta {alert.pk}: {exc}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"🖼️ Derivados generados: {done}. Fallidos: {failed}."
+        ))
@@ -0,0 +1,71 @@
+"""
+Comando de gestión: process_notifications
+
+Worker del outbox de notificaciones (`NotificationOutbox`). Reclama filas
+vencidas en lotes con `SELECT ... FOR UPDATE SKIP LOCKED` y entrega cada una
+por su canal (email vía Brevo, web push vía VAPID), registrando intentos,
+próximo reintento y estado final.
+
+Se pueden lanzar varias instancias (en uno o varios hosts): SKIP LOCKED evita
+que dos workers tomen la misma fila.
+
+Uso:
+    python manage.py process_notifications              # bucle continuo
+    python manage.py process_notifications --once       # un solo lote
+    python manage.py process_notifications --batch-size 100 --idle-sleep 2
+"""
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from detection import email_batcher
+from detection.outbox import process_batch
+
+
+class Command(BaseCommand):
+    help = "Entrega las notificaciones pendientes del outbox (SKIP LOCKED, reintentos con backoff)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help="Filas reclamadas por lote (por defecto 50).")
+        parser.add_argument('--idle-sleep', type=float, default=1.0,
+                            help="Segundos de espera cuando no hay trabajo (por defecto 1).")
+        parser.add_argument('--once', action='store_true',
+                            help="Procesa un solo lote y termina.")
+
+    def handle(self, *args, **options):
+        self._running = True
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        self.stdout.write(self.style.SUCCESS("📬 Worker de notificaciones iniciado."))
+        total_sent = total_failed = 0
+
+        while self._running:
+            close_old_connections()
+            sent, failed, deferred, released = process_batch(batch_size=options['batch_size'])
+            total_sent += sent
+            total_failed += failed
+
+            if sent or failed or deferred or released:
+                self.stdout.write(f"   Lote: {sent} enviada(s), {failed} fallida(s), {deferred} en el lote de Brevo, "
+                                  f"{released} devuelta(s) por agrupador lleno")
+
+            if options['once']:
+                break
+            # Las diferidas también son trabajo: hay más filas esperando tras ellas.
+            # Las liberadas no: el agrupador está lleno, se espera a que se vacíe.
+            if not (sent or failed or deferred):
+                time.sleep(options['idle_sleep'])
+
+        # Correos aún en la ventana del agrupador de Brevo
+        email_batcher.flush()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"👋 Worker detenido. Enviadas: {total_sent}, fallidas: {total_failed}."
+        ))
+
+    def _stop(self, signum, frame):
+        self._running = False
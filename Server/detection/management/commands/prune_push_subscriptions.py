@@ -0,0 +1,64 @@
+"""
+Comando de gestión: prune_push_subscriptions
+
+Borra en bloques las suscripciones push muertas:
+  - las que acumulan `PUSH_SUBSCRIPTION_PRUNE_FAILURES` fallos seguidos
+    (timeouts, 5xx... que nunca devuelven 404/410; las que devuelven 404/410
+    ya se borran al enviar, en `webpush_sender`);
+  - las que exceden `PUSH_SUBSCRIPTIONS_PER_USER` por usuario (se conservan
+    las que recibieron una push con éxito más recientemente).
+
+Solo cuentan señales de fallo reales: una suscripción sin alertas recientes
+(un usuario sin detecciones) no se borra por antigüedad.
+
+Uso:
+    python manage.py prune_push_subscriptions
+    python manage.py prune_push_subscriptions --dry-run
+    python manage.py prune_push_subscriptions --max-failures 5 --chunk-size 500
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from detection.models import PushSubscription
+from detection.push_views import evict_extra_subscriptions
+
+
+class Command(BaseCommand):
+    help = "Borra en bloques las suscripciones push muertas o sobrantes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-failures', type=int, default=settings.PUSH_SUBSCRIPTION_PRUNE_FAILURES,
+                            help="Fallos seguidos a partir de los que se borra (por defecto %(default)s).")
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help="Filas borradas por consulta (por defecto %(default)s).")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Solo cuenta lo que se borraría.")
+
+    def handle(self, *args, **options):
+        doomed = PushSubscription.objects.filter(consecutive_failures__gte=options['max_failures'])
+
+        if options['dry_run']:
+            self.stdout.write(f"🔎 Se borrarían {doomed.count()} suscripciones muertas.")
+            return
+
+        deleted = 0
+        while True:
+            chunk = list(doomed.values_list('pk', flat=True)[:options['chunk_size']])
+            if not chunk:
+                break
+            deleted += PushSubscription.objects.filter(pk__in=chunk).delete()[0]
+
+        evicted = 0
+        over_cap = (
+            PushSubscription.objects.values('user')
+            .annotate(total=Count('pk'))
+            .filter(total__gt=settings.PUSH_SUBSCRIPTIONS_PER_USER)
+            .values_list('user', flat=True)
+        )
+        for user_id in over_cap:
+            evicted += evict_extra_subscriptions(user_id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"🧹 Suscripciones borradas: {deleted} muertas, {evicted} por exceder el máximo por usuario."
+        ))
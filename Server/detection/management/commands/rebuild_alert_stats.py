@@ -0,0 +1,36 @@
+"""
+Comando de gestión: rebuild_alert_stats
+
+Recalcula desde cero las estadísticas por token (AlertStats, AlertDailyStats y
+AlertLocationStats) a partir de la tabla de alertas. Normalmente se mantienen
+solas (detection/stats.py); sirve tras cargas masivas con SQL directo,
+restauraciones o si se sospecha que se desincronizaron.
+
+Uso:
+    python manage.py rebuild_alert_stats
+    python manage.py rebuild_alert_stats --user admin
+"""
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from detection.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recalcula las estadísticas de alertas por token desde la tabla de alertas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', default=None,
+                            help="Recalcular solo las estadísticas de este usuario.")
+
+    def handle(self, *args, **options):
+        token_ids = None
+        if options['user']:
+            token_ids = list(Token.objects.filter(user__username=options['user']).values_list('pk', flat=True))
+            if not token_ids:
+                raise CommandError(f"El usuario '{options['user']}' no existe o no tiene token.")
+
+        total = rebuild(token_ids=token_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f"📊 Estadísticas recalculadas. Tokens con alertas: {total}."
+        ))
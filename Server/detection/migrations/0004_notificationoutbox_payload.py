@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 10:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0003_notificationoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationoutbox',
+            name='payload',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.16 on 2026-10-18 10:43
+
+from django.db import migrations, models
+import webdev.storage_backends
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0004_notificationoutbox_payload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadalert',
+            name='preview',
+            field=models.ImageField(blank=True, default='', storage=webdev.storage_backends.PublicMediaStorage(), upload_to='', verbose_name='WebP preview'),
+        ),
+        migrations.AddField(
+            model_name='uploadalert',
+            name='thumbnail',
+            field=models.ImageField(blank=True, default='', storage=webdev.storage_backends.PublicMediaStorage(), upload_to='', verbose_name='Thumbnail'),
+        ),
+    ]
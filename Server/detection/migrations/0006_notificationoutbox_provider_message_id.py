@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 10:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0005_uploadalert_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationoutbox',
+            name='provider_message_id',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.16 on 2026-10-18 10:58
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_last_success(apps, schema_editor):
+    # Sin historial de envíos: se asume que las suscripciones existentes
+    # funcionaban al crearse (si no, la expulsión por usuario las descartaría primero).
+    PushSubscription = apps.get_model('detection', 'PushSubscription')
+    PushSubscription.objects.filter(last_success_at__isnull=True).update(last_success_at=F('created'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0006_notificationoutbox_provider_message_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pushsubscription',
+            name='consecutive_failures',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='pushsubscription',
+            name='last_failure_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pushsubscription',
+            name='last_latency_ms',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pushsubscription',
+            name='last_success_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_last_success, migrations.RunPython.noop),
+    ]
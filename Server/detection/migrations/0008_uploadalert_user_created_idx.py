@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0007_pushsubscription_health'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='uploadalert',
+            index=models.Index(fields=['userID', '-dateCreated', '-id'], name='uploadalert_user_created_idx'),
+        ),
+    ]
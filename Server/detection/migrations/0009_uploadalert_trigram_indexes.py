@@ -0,0 +1,71 @@
+# Índices trigram (pg_trgm) para los filtros `icontains` del panel.
+#
+# DetectionFilter busca con `location__icontains` / `alertReceiver__icontains`,
+# que Django traduce a `UPPER("campo"::text) LIKE UPPER('%texto%')`. Un índice
+# B-tree no sirve para un LIKE con comodín inicial; uno GIN con
+# `gin_trgm_ops` sobre la misma expresión sí.
+#
+# Si la base de datos no es PostgreSQL, o la extensión pg_trgm no está
+# disponible o no hay permisos para crearla, la migración no hace nada: los
+# filtros siguen funcionando (con recorrido secuencial) y
+# `python manage.py explain_dashboard` lo muestra en el plan.
+
+import logging
+
+from django.db import DatabaseError, migrations, transaction
+
+logger = logging.getLogger(__name__)
+
+TRIGRAM_INDEXES = {
+    'uploadalert_location_trgm': 'location',
+    'uploadalert_receiver_trgm': 'alertReceiver',
+}
+
+
+def _trigram_available(cursor):
+    cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+    if cursor.fetchone():
+        return True
+    cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    if not cursor.fetchone():
+        return False
+    try:
+        with transaction.atomic():
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except DatabaseError as exc:
+        logger.warning("⚠️ No se pudo crear la extensión pg_trgm: %s", exc)
+        return False
+    return True
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        if not _trigram_available(cursor):
+            logger.warning("⚠️ pg_trgm no disponible: se omiten los índices trigram de UploadAlert.")
+            return
+        for name, column in TRIGRAM_INDEXES.items():
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS "{name}" ON "detection_uploadalert" '
+                f'USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+            )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for name in TRIGRAM_INDEXES:
+            cursor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0008_uploadalert_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
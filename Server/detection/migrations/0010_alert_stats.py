@@ -0,0 +1,79 @@
+# Generated by Django 4.2.16 on 2026-10-18 11:01
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+
+def backfill_alert_stats(apps, schema_editor):
+    # Estadísticas iniciales a partir de las alertas existentes (con los modelos
+    # históricos: la migración no depende del código actual de detection.stats)
+    UploadAlert = apps.get_model('detection', 'UploadAlert')
+    AlertStats = apps.get_model('detection', 'AlertStats')
+    AlertDailyStats = apps.get_model('detection', 'AlertDailyStats')
+    AlertLocationStats = apps.get_model('detection', 'AlertLocationStats')
+
+    alerts = UploadAlert.objects.order_by()
+    AlertStats.objects.bulk_create(
+        AlertStats(token_id=row['userID'], total=row['total'], last_alert_at=row['last'])
+        for row in alerts.values('userID').annotate(total=Count('pk'), last=Max('dateCreated'))
+    )
+    AlertDailyStats.objects.bulk_create(
+        (AlertDailyStats(token_id=row['userID'], day=row['day'], count=row['count'])
+         for row in alerts.annotate(day=TruncDate('dateCreated')).values('userID', 'day')
+         .annotate(count=Count('pk'))),
+        batch_size=1000,
+    )
+    AlertLocationStats.objects.bulk_create(
+        (AlertLocationStats(token_id=row['userID'], location=row['location'], count=row['count'])
+         for row in alerts.values('userID', 'location').annotate(count=Count('pk'))),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authtoken', '0003_tokenproxy'),
+        ('detection', '0009_uploadalert_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertStats',
+            fields=[
+                ('token', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='alert_stats', serialize=False, to='authtoken.token')),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('last_alert_at', models.DateTimeField(blank=True, null=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AlertLocationStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location', models.CharField(max_length=200)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('token', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alert_location_stats', to='authtoken.token')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AlertDailyStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('token', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alert_daily_stats', to='authtoken.token')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='alertlocationstats',
+            constraint=models.UniqueConstraint(fields=('token', 'location'), name='alertlocationstats_token_location_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='alertdailystats',
+            constraint=models.UniqueConstraint(fields=('token', 'day'), name='alertdailystats_token_day_uniq'),
+        ),
+        migrations.RunPython(backfill_alert_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 11:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0010_alert_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadalert',
+            name='public_id',
+            field=models.UUIDField(editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Rellena `public_id` de las alertas existentes por bloques.
+#
+# El nombre de la imagen ya es un UUID (`scrambleUploadedFilename`) y las URLs
+# antiguas (/alert/<uuid>/) lo usan: se reutiliza como public_id para que los
+# enlaces ya enviados por correo o push sigan funcionando. Si el nombre no es
+# un UUID (o está repetido) se genera uno nuevo.
+
+import uuid
+
+from django.db import migrations
+
+CHUNK_SIZE = 1000
+
+
+def public_id_from_name(name):
+    # Copia de detection.models.public_id_from_name al escribir la migración
+    # (la migración no debe cambiar si el modelo cambia)
+    stem = str(name or '').rsplit('/', 1)[-1].rsplit('.', 1)[0]
+    try:
+        return uuid.UUID(stem)
+    except ValueError:
+        return None
+
+
+def backfill_public_ids(apps, schema_editor):
+    UploadAlert = apps.get_model('detection', 'UploadAlert')
+    used = set()
+    last_pk = 0
+    while True:
+        chunk = list(
+            UploadAlert.objects.filter(pk__gt=last_pk, public_id__isnull=True)
+            .order_by('pk').only('pk', 'image')[:CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+        for alert in chunk:
+            public_id = public_id_from_name(alert.image.name)
+            if public_id is None or public_id in used:
+                public_id = uuid.uuid4()
+            used.add(public_id)
+            alert.public_id = public_id
+        UploadAlert.objects.bulk_update(chunk, ['public_id'])
+        last_pk = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0011_uploadalert_public_id'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_public_ids, migrations.RunPython.noop),
+    ]
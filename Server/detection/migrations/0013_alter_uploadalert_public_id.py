@@ -0,0 +1,19 @@
+# Generated by Django 4.2.16 on 2026-10-18 11:10
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0012_backfill_uploadalert_public_id'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='uploadalert',
+            name='public_id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+    ]
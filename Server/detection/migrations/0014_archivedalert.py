@@ -0,0 +1,36 @@
+# Generated by Django 4.2.16 on 2026-10-18 11:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+import webdev.storage_backends
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authtoken', '0003_tokenproxy'),
+        ('detection', '0013_alter_uploadalert_public_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAlert',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('public_id', models.UUIDField(editable=False, unique=True)),
+                ('alertReceiver', models.CharField(max_length=200)),
+                ('location', models.CharField(max_length=200)),
+                ('dateCreated', models.DateTimeField()),
+                ('image', models.ImageField(storage=webdev.storage_backends.ArchiveMediaStorage(), upload_to='', verbose_name='Archived image')),
+                ('thumbnail', models.ImageField(blank=True, default='', storage=webdev.storage_backends.ArchiveMediaStorage(), upload_to='', verbose_name='Thumbnail')),
+                ('preview', models.ImageField(blank=True, default='', storage=webdev.storage_backends.ArchiveMediaStorage(), upload_to='', verbose_name='WebP preview')),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('reason', models.CharField(choices=[('manual', 'Manual'), ('age', 'Antigüedad')], default='manual', max_length=10)),
+                ('hot_files_purged', models.BooleanField(default=False)),
+                ('userID', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='authtoken.token')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['userID', '-dateCreated'], name='archivedalert_user_created_idx'), models.Index(fields=['hot_files_purged', 'archived_at'], name='archivedalert_purge_idx')],
+            },
+        ),
+    ]
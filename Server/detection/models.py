@@ -1,5 +1,6 @@
 import uuid
 from django.db import models
+from django.utils import timezone
 
 from django.conf import settings
 from django.db.models.signals import post_save
@@ -7,7 +8,7 @@ from django.dispatch import receiver
 from rest_framework.authtoken.models import Token
 
 from django.contrib.auth.models import User
-from webdev.storage_backends import PublicMediaStorage
+from webdev.storage_backends import ArchiveMediaStorage, PublicMediaStorage
 
 # Changes uploaded file name
 def scrambleUploadedFilename(instance, filename):
@@ -18,15 +19,105 @@ def scrambleUploadedFilename(instance, filename):
     :return:
     """
     extension = filename.split(".")[-1]
-    return "{}.{}".format(uuid.uuid4(), extension)
+    # Same UUID as the alert's public_id, so the stored name and the detail URL match
+    name = instance.public_id if instance is not None else uuid.uuid4()
+    return "{}.{}".format(name, extension)
+
+# UUID from a scrambled file name ("<uuid>.<ext>", optionally inside folders), or None
+def public_id_from_name(name):
+    stem = str(name or '').rsplit('/', 1)[-1].rsplit('.', 1)[0]
+    try:
+        return uuid.UUID(stem)
+    except ValueError:
+        return None
 
 # Data model
 class UploadAlert(models.Model):
     image = models.ImageField("Uploaded image", upload_to=scrambleUploadedFilename,storage=PublicMediaStorage())
     userID = models.ForeignKey(Token, on_delete=models.CASCADE)
+    # Identificador público (URL de detalle, correos, push): indexado y único
+    public_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
     alertReceiver = models.CharField(max_length=200)
     location = models.CharField(max_length=200)
     dateCreated = models.DateTimeField(auto_now_add=True)
+    # Derivados generados fuera de la petición (detection/derivatives.py)
+    thumbnail = models.ImageField("Thumbnail", blank=True, default='', storage=PublicMediaStorage())
+    preview = models.ImageField("WebP preview", blank=True, default='', storage=PublicMediaStorage())
+
+    class Meta:
+        indexes = [
+            # Panel: alertas de un token de la más reciente a la más antigua
+            # (mismo orden que la paginación por cursor). Los índices trigram de
+            # location/alertReceiver se crean en la migración 0009 (solo PostgreSQL).
+            models.Index(fields=['userID', '-dateCreated', '-id'], name='uploadalert_user_created_idx'),
+        ]
+
+# Alertas archivadas (detection/archive.py): a mano desde la página de la alerta
+# o por antigüedad con `python manage.py archive_alerts`. Salen de UploadAlert
+# para que la tabla del panel siga siendo pequeña; las imágenes se copian al
+# prefijo 'archive/' del bucket y la página /alert/<uuid>/ las sigue mostrando.
+class ArchivedAlert(models.Model):
+    REASON_MANUAL = 'manual'
+    REASON_AGE = 'age'
+    REASON_CHOICES = [
+        (REASON_MANUAL, 'Manual'),
+        (REASON_AGE, 'Antigüedad'),
+    ]
+
+    public_id = models.UUIDField(unique=True, editable=False)
+    userID = models.ForeignKey(Token, on_delete=models.CASCADE)
+    alertReceiver = models.CharField(max_length=200)
+    location = models.CharField(max_length=200)
+    dateCreated = models.DateTimeField()
+    image = models.ImageField("Archived image", storage=ArchiveMediaStorage())
+    thumbnail = models.ImageField("Thumbnail", blank=True, default='', storage=ArchiveMediaStorage())
+    preview = models.ImageField("WebP preview", blank=True, default='', storage=ArchiveMediaStorage())
+    archived_at = models.DateTimeField(auto_now_add=True)
+    reason = models.CharField(max_length=10, choices=REASON_CHOICES, default=REASON_MANUAL)
+    # Las imágenes de la tabla caliente se borran después (ver archive.purge_hot_files)
+    hot_files_purged = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['userID', '-dateCreated'], name='archivedalert_user_created_idx'),
+            models.Index(fields=['hot_files_purged', 'archived_at'], name='archivedalert_purge_idx'),
+        ]
+
+    def __str__(self):
+        return f"ArchivedAlert({self.public_id})"
+
+# Estadísticas por token mantenidas de forma incremental (detection/stats.py):
+# el panel lee una fila en vez de contar la tabla de alertas.
+class AlertStats(models.Model):
+    token = models.OneToOneField(Token, on_delete=models.CASCADE, primary_key=True, related_name='alert_stats')
+    total = models.PositiveIntegerField(default=0)
+    last_alert_at = models.DateTimeField(null=True, blank=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"AlertStats({self.token_id}: {self.total})"
+
+
+class AlertDailyStats(models.Model):
+    token = models.ForeignKey(Token, on_delete=models.CASCADE, related_name='alert_daily_stats')
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['token', 'day'], name='alertdailystats_token_day_uniq'),
+        ]
+
+
+class AlertLocationStats(models.Model):
+    token = models.ForeignKey(Token, on_delete=models.CASCADE, related_name='alert_location_stats')
+    location = models.CharField(max_length=200)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['token', 'location'], name='alertlocationstats_token_location_uniq'),
+        ]
 
 # Generate and save a token each time a user is saved in a database
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
@@ -45,6 +136,73 @@ class PushSubscription(models.Model):
     auth = models.CharField(max_length=100)     # secreto de autenticación
     user_agent = models.CharField(max_length=300, blank=True, default='')
     created = models.DateTimeField(auto_now_add=True)
+    # Salud del endpoint (detection/webpush_sender.py): se actualiza tras cada envío
+    last_success_at = models.DateTimeField(null=True, blank=True)
+    last_failure_at = models.DateTimeField(null=True, blank=True)
+    consecutive_failures = models.PositiveIntegerField(default=0)
+    last_latency_ms = models.PositiveIntegerField(null=True, blank=True)
+
+    def __str__(self):
+        return f"PushSubscription({self.user.username})"
+
+    def is_healthy(self, now=None):
+        """
+        False si acumula `PUSH_SUBSCRIPTION_MAX_FAILURES` fallos seguidos y el
+        último fue hace menos de `PUSH_SUBSCRIPTION_RETRY_AFTER` segundos.
+        Pasado ese tiempo se vuelve a probar.
+        """
+        if self.consecutive_failures < settings.PUSH_SUBSCRIPTION_MAX_FAILURES:
+            return True
+        now = now or timezone.now()
+        return (self.last_failure_at is None or
+                (now - self.last_failure_at).total_seconds() >= settings.PUSH_SUBSCRIPTION_RETRY_AFTER)
+
+# Outbox transaccional: una fila por canal de notificación de cada alerta.
+# Se escribe en la misma transacción que la alerta y la drena el comando
+# `process_notifications` (SELECT ... FOR UPDATE SKIP LOCKED).
+class NotificationOutbox(models.Model):
+    CHANNEL_EMAIL = 'email'
+    CHANNEL_PUSH = 'push'
+    CHANNEL_CHOICES = [
+        (CHANNEL_EMAIL, 'Email'),
+        (CHANNEL_PUSH, 'Web Push'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_SENDING, 'Enviando'),
+        (STATUS_SENT, 'Enviada'),
+        (STATUS_FAILED, 'Fallida'),
+    ]
+
+    alert = models.ForeignKey(
+        UploadAlert, on_delete=models.CASCADE, related_name='notifications'
+    )
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)   # lease del worker que la procesa
+    last_error = models.TextField(blank=True, default='')
+    # Notificación agrupada (ingesta por lotes): {"alert_ids": [...]}.
+    payload = models.JSONField(default=dict, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    # Id del mensaje en el proveedor (messageId de Brevo) para rastrear la entrega.
+    provider_message_id = models.CharField(max_length=255, blank=True, default='')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def alert_ids(self):
+        """Alertas cubiertas por esta notificación (una, o todas las del lote)."""
+        return self.payload.get('alert_ids') or [self.alert_id]
 
     def __str__(self):
-        return f"PushSubscription({self.user.username})"
\ No newline at end of file
+        return f"NotificationOutbox({self.alert_id}, {self.channel}, {self.status})"
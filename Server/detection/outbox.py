@@ -0,0 +1,302 @@
+"""
+Outbox transaccional de notificaciones (email y web push).
+
+Flujo:
+  1. `postAlert` guarda la alerta y llama a `enqueue_alert_notifications()`
+     dentro de la MISMA transacción: si la alerta existe, sus notificaciones
+     también (sobreviven a reinicios de gunicorn, deploys u OOM).
+  2. Tras el commit, el worker web intenta la entrega inmediata en el
+     despachador (`NOTIFICATION_OUTBOX_INLINE`).
+  3. El comando `python manage.py process_notifications` drena lo pendiente
+     con `SELECT ... FOR UPDATE SKIP LOCKED`, de modo que varios procesos o
+     hosts pueden repartirse la carga sin entregar dos veces la misma fila.
+
+Cada fila guarda intentos, próximo reintento (backoff exponencial) y estado
+final. Una fila en 'sending' cuyo lease (`locked_until`) caducó se considera
+abandonada (worker muerto) y vuelve a ser reclamable.
+
+En modo ASGI (`alertuploadREST.async_views`) la entrega inmediata se hace en
+el event loop con `aprocess_entries()` y los handlers asíncronos (aiohttp).
+
+Un handler puede devolver un `Future` (p. ej. el agrupador de correos de
+Brevo): la fila sigue en 'sending' y el resultado se registra al resolverse.
+Si el agrupador está lleno (`BatcherFull`) la fila vuelve a 'pending' sin
+gastar el intento.
+"""
+import asyncio
+import logging
+from concurrent.futures import Future
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .dispatcher import get_dispatcher, DispatcherBusy, EMAIL_LANE, PUSH_LANE
+from .email_batcher import BatcherFull
+from .models import NotificationOutbox, UploadAlert
+
+logger = logging.getLogger(__name__)
+
+# Resultado de `deliver` para una fila devuelta a 'pending' sin intentarla (`release`).
+RELEASED = 'released'
+
+# Función que entrega cada canal. Reciben la alerta y devuelven True/False
+# (o un Future con el resultado, ver `deliver`).
+CHANNEL_HANDLERS = {
+    NotificationOutbox.CHANNEL_EMAIL: 'alertuploadREST.views.deliver_alert_email',
+    NotificationOutbox.CHANNEL_PUSH: 'detection.webpush_sender.deliver_alert_push',
+}
+
+# Entrega agrupada (un correo / una push por lote). Reciben la lista de alertas.
+BATCH_CHANNEL_HANDLERS = {
+    NotificationOutbox.CHANNEL_EMAIL: 'alertuploadREST.views.deliver_batch_email',
+    NotificationOutbox.CHANNEL_PUSH: 'detection.webpush_sender.deliver_batch_push',
+}
+
+# Entrega asíncrona (modo ASGI). Los canales sin versión async usan la síncrona en un hilo.
+ASYNC_CHANNEL_HANDLERS = {
+    NotificationOutbox.CHANNEL_EMAIL: 'alertuploadREST.async_views.adeliver_alert_email',
+    NotificationOutbox.CHANNEL_PUSH: 'detection.webpush_sender.adeliver_alert_push',
+}
+
+CHANNEL_LANES = {
+    NotificationOutbox.CHANNEL_EMAIL: EMAIL_LANE,
+    NotificationOutbox.CHANNEL_PUSH: PUSH_LANE,
+}
+
+
+def enqueue_alert_notifications(alert, channels, inline=None):
+    """
+    Crea las filas del outbox para `alert`. Debe llamarse dentro de la
+    transacción que guarda la alerta. Tras el commit intenta la entrega
+    inmediata en el despachador si `NOTIFICATION_OUTBOX_INLINE` está activo
+    (`inline=False` la omite, p. ej. cuando la vista async entrega por su cuenta).
+    """
+    return enqueue_grouped_notifications([(channel, [alert]) for channel in channels], inline=inline)
+
+
+def enqueue_grouped_notifications(groups, inline=None):
+    """
+    Igual que `enqueue_alert_notifications`, pero cada grupo `(canal, alertas)`
+    genera UNA sola fila que cubre todas sus alertas (ingesta por lotes).
+    """
+    entries = NotificationOutbox.objects.bulk_create([
+        NotificationOutbox(
+            alert=alerts[-1],
+            channel=channel,
+            payload={'alert_ids': [a.pk for a in alerts]} if len(alerts) > 1 else {},
+        )
+        for channel, alerts in groups if alerts
+    ])
+
+    if inline is None:
+        inline = settings.NOTIFICATION_OUTBOX_INLINE
+    if inline:
+        transaction.on_commit(lambda: dispatch_entries(entries))
+
+    return entries
+
+
+def dispatch_entries(entries):
+    """
+    Encola la entrega inmediata de cada fila en el carril de su canal.
+    Se reutiliza la alerta ya cargada en la ingesta (con su Token y User),
+    sin volver a consultarla en el hilo de notificación.
+    """
+    for entry in entries:
+        if entry.pk is None:
+            continue
+        try:
+            get_dispatcher().submit(
+                CHANNEL_LANES[entry.channel], process_batch,
+                ids=[entry.pk], preloaded={entry.alert_id: entry.alert},
+            )
+        except DispatcherBusy:
+            # Queda 'pending': la recogerá `process_notifications`.
+            logger.warning("⚠️ Despachador lleno: notificación %s queda en el outbox", entry.pk)
+
+
+def claim_batch(batch_size=50, ids=None, preloaded=None):
+    """
+    Reclama hasta `batch_size` filas vencidas con FOR UPDATE SKIP LOCKED y
+    las marca 'sending' con un lease. Devuelve la lista de filas reclamadas.
+    `preloaded` ({alert_id: alerta}) evita recargar alertas ya en memoria.
+    """
+    now = timezone.now()
+    lease = now + timedelta(seconds=settings.NOTIFICATION_OUTBOX_LEASE)
+
+    due = Q(status=NotificationOutbox.STATUS_PENDING, next_attempt_at__lte=now) | Q(
+        status=NotificationOutbox.STATUS_SENDING, locked_until__lt=now
+    )
+    queryset = NotificationOutbox.objects.filter(due)
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+
+    with transaction.atomic():
+        claimed = list(
+            queryset.select_for_update(
+                skip_locked=connection.features.has_select_for_update_skip_locked
+            ).order_by('next_attempt_at').values_list('pk', flat=True)[:batch_size]
+        )
+        if not claimed:
+            return []
+        NotificationOutbox.objects.filter(pk__in=claimed).update(
+            status=NotificationOutbox.STATUS_SENDING,
+            locked_until=lease,
+            attempts=F('attempts') + 1,
+        )
+
+    # Se cargan fuera del bloqueo, con la alerta y su dueño en la misma consulta
+    # (salvo que ya vengan de la ingesta).
+    entries = NotificationOutbox.objects.filter(pk__in=claimed)
+    if not preloaded:
+        return list(entries.select_related('alert__userID__user'))
+    entries = list(entries)
+    for entry in entries:
+        if entry.alert_id in preloaded:
+            entry.alert = preloaded[entry.alert_id]
+    return entries
+
+
+def _call_handler(entry):
+    """Ejecuta el handler síncrono del canal (individual o agrupado)."""
+    alert_ids = entry.alert_ids()
+    if len(alert_ids) > 1:
+        handler = import_string(BATCH_CHANNEL_HANDLERS[entry.channel])
+        alerts = list(
+            UploadAlert.objects.select_related('userID__user')
+            .filter(pk__in=alert_ids).order_by('dateCreated')
+        )
+        return bool(handler(alerts)) if alerts else True
+    handler = import_string(CHANNEL_HANDLERS[entry.channel])
+    result = handler(entry.alert)
+    return result if isinstance(result, Future) else bool(result)
+
+
+def deliver(entry):
+    """
+    Entrega una fila ya reclamada y registra el resultado. Si el handler
+    devuelve un Future, el registro se difiere y se devuelve None; si el
+    agrupador de correos está lleno, se devuelve `RELEASED`.
+    """
+    try:
+        ok = _call_handler(entry)
+        if isinstance(ok, Future):
+            ok.add_done_callback(lambda future: _record_future(entry, future))
+            return None
+        error = '' if ok else 'El proveedor no aceptó la notificación.'
+    except BatcherFull:
+        return release(entry)
+    except Exception as exc:  # noqa: BLE001 - se registra y se reintenta
+        ok = False
+        error = f"{type(exc).__name__}: {exc}"
+        logger.error("❌ Error entregando notificación %s: %s", entry.pk, exc)
+
+    return record_result(entry, ok, error)
+
+
+def release(entry):
+    """
+    Devuelve una fila reclamada a 'pending' sin contar el intento
+    (contrapresión: el agrupador de correos no admitía más). Devuelve
+    `RELEASED`: no es un fallo de entrega.
+    """
+    delay = settings.NOTIFICATION_OUTBOX_RETRY_BASE
+    entry.status = NotificationOutbox.STATUS_PENDING
+    entry.attempts -= 1
+    entry.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+    entry.locked_until = None
+    entry.save(update_fields=['status', 'attempts', 'next_attempt_at', 'locked_until'])
+    logger.warning("⚠️ Agrupador de correos lleno: notificación %s reintentará en %ss", entry.pk, delay)
+    return RELEASED
+
+
+def _record_future(entry, future):
+    """Registra el resultado diferido (`SendResult` o excepción) de un handler."""
+    try:
+        result = future.result()
+        ok, message_id = result.ok, result.message_id
+        error = '' if ok else (result.error or 'El proveedor no aceptó la notificación.')
+    except Exception as exc:  # noqa: BLE001 - se registra y se reintenta
+        ok, message_id = False, ''
+        error = f"{type(exc).__name__}: {exc}"
+        logger.error("❌ Error entregando notificación %s: %s", entry.pk, exc)
+    record_result(entry, ok, error, message_id=message_id)
+
+
+def record_result(entry, ok, error='', message_id=''):
+    """Guarda el resultado de un intento: enviada, reintento con backoff o fallida."""
+    now = timezone.now()
+    if ok:
+        entry.status = NotificationOutbox.STATUS_SENT
+        entry.sent_at = now
+        entry.last_error = ''
+        entry.provider_message_id = message_id
+    elif entry.attempts >= settings.NOTIFICATION_OUTBOX_MAX_ATTEMPTS:
+        entry.status = NotificationOutbox.STATUS_FAILED
+        entry.last_error = error
+        logger.error("❌ Notificación %s (%s) descartada tras %s intentos",
+                     entry.pk, entry.channel, entry.attempts)
+    else:
+        delay = settings.NOTIFICATION_OUTBOX_RETRY_BASE * (2 ** (entry.attempts - 1))
+        entry.status = NotificationOutbox.STATUS_PENDING
+        entry.next_attempt_at = now + timedelta(seconds=delay)
+        entry.last_error = error
+        logger.info("⏳ Notificación %s reintentará en %ss", entry.pk, delay)
+
+    entry.locked_until = None
+    entry.save(update_fields=[
+        'status', 'sent_at', 'last_error', 'next_attempt_at', 'locked_until', 'provider_message_id',
+    ])
+    return ok
+
+
+def process_batch(batch_size=50, ids=None, preloaded=None):
+    """
+    Reclama y entrega un lote. Devuelve (enviadas, fallidas, diferidas,
+    liberadas): las diferidas (Future) siguen en vuelo y su resultado se
+    registra después; las liberadas volvieron a 'pending' sin gastar intento.
+    """
+    entries = claim_batch(batch_size=batch_size, ids=ids, preloaded=preloaded)
+    sent = failed = deferred = released = 0
+    for entry in entries:
+        ok = deliver(entry)
+        if ok is None:
+            deferred += 1
+        elif ok == RELEASED:
+            released += 1
+        elif ok:
+            sent += 1
+        else:
+            failed += 1
+    return sent, failed, deferred, released
+
+
+async def adeliver(entry):
+    """Versión asíncrona de `deliver` (event loop del worker ASGI)."""
+    try:
+        handler_path = ASYNC_CHANNEL_HANDLERS.get(entry.channel)
+        if handler_path and len(entry.alert_ids()) == 1:
+            ok = bool(await import_string(handler_path)(entry.alert))
+        else:
+            ok = await sync_to_async(_call_handler)(entry)
+        error = '' if ok else 'El proveedor no aceptó la notificación.'
+    except Exception as exc:  # noqa: BLE001 - se registra y se reintenta
+        ok = False
+        error = f"{type(exc).__name__}: {exc}"
+        logger.error("❌ Error entregando notificación %s: %s", entry.pk, exc)
+
+    return await sync_to_async(record_result)(entry, ok, error)
+
+
+async def aprocess_entries(ids, preloaded=None):
+    """Reclama las filas `ids` y las entrega concurrentemente en el event loop."""
+    entries = await sync_to_async(claim_batch)(
+        batch_size=len(ids), ids=ids, preloaded=preloaded
+    )
+    results = await asyncio.gather(*(adeliver(entry) for entry in entries))
+    return sum(results), len(results) - sum(results)
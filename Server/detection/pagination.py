@@ -0,0 +1,107 @@
+"""
+Paginación por cursor (keyset) del panel de alertas.
+
+`Paginator` hace un `COUNT(*)` y un `OFFSET` en cada página: cuanto más
+profunda la página, más filas recorre la base de datos. Aquí cada página se
+pide con `WHERE (dateCreated, id) < (cursor)` + `LIMIT`, así que la página
+1000 cuesta lo mismo que la primera:
+
+  - El orden es siempre `-dateCreated, -id` (el id desempata alertas del mismo
+    instante).
+  - Los cursores son opacos y van firmados (`django.core.signing`): el
+    cliente no puede fabricar uno ni ver la clave.
+  - El total es opcional: `capped_count` cuenta como mucho `limit` filas y
+    devuelve `(n, exacto)`.
+
+Uso:
+    page = paginate_keyset(queryset, request.GET.get('cursor'), per_page=25)
+    page.object_list, page.next_cursor, page.prev_cursor
+"""
+from datetime import datetime
+
+from django.core import signing
+from django.db.models import Q
+
+CURSOR_SALT = 'detection.pagination.cursor'
+
+# Dirección del cursor: páginas más antiguas ('n') o más recientes ('p').
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(alert, direction):
+    return signing.dumps(
+        {'d': alert.dateCreated.isoformat(), 'i': alert.pk, 'r': direction},
+        salt=CURSOR_SALT, compress=True,
+    )
+
+
+def decode_cursor(cursor):
+    """(fecha, id, dirección) del cursor, o None si falta o no es válido."""
+    if not cursor:
+        return None
+    try:
+        data = signing.loads(cursor, salt=CURSOR_SALT)
+        return datetime.fromisoformat(data['d']), int(data['i']), data['r']
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        return None
+
+
+class KeysetPage:
+    """Una página de resultados con los cursores para moverse desde ella."""
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = encode_cursor(object_list[-1], NEXT) if has_next else None
+        self.prev_cursor = encode_cursor(object_list[0], PREVIOUS) if has_previous else None
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def page_queryset(queryset, position, per_page):
+    """Consulta (con LIMIT per_page + 1) de la página que sigue o precede a `position`."""
+    if position is None:
+        return queryset.order_by('-dateCreated', '-id')[:per_page + 1]
+
+    created, pk, direction = position
+    if direction == PREVIOUS:
+        # Hacia alertas más recientes: se recorre al revés (luego se da la vuelta).
+        return (
+            queryset.filter(Q(dateCreated__gt=created) | Q(dateCreated=created, id__gt=pk))
+            .order_by('dateCreated', 'id')[:per_page + 1]
+        )
+    return (
+        queryset.filter(Q(dateCreated__lt=created) | Q(dateCreated=created, id__lt=pk))
+        .order_by('-dateCreated', '-id')[:per_page + 1]
+    )
+
+
+def paginate_keyset(queryset, cursor, per_page):
+    """Página de `queryset` (ya filtrado) que sigue o precede a `cursor`."""
+    position = decode_cursor(cursor)
+    rows = list(page_queryset(queryset, position, per_page))
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if position is None:
+        return KeysetPage(rows, has_next=more, has_previous=False)
+    if position[2] == PREVIOUS:
+        return KeysetPage(rows[::-1], has_next=bool(rows), has_previous=more)
+    return KeysetPage(rows, has_next=more, has_previous=bool(rows))
+
+
+def capped_count(queryset, limit):
+    """Cuenta como mucho `limit` filas: (n, True si es el total exacto)."""
+    if limit <= 0:
+        return None, False
+    total = queryset.order_by()[:limit + 1].count()
+    return min(total, limit), total <= limit
@@ -1,7 +1,8 @@
 """
 Vistas para Web Push (VAPID):
   - public_key:  entrega la clave pública VAPID al navegador.
-  - subscribe:   guarda/actualiza la suscripción del usuario autenticado.
+  - subscribe:   guarda/actualiza la suscripción del usuario autenticado
+                 (como máximo PUSH_SUBSCRIPTIONS_PER_USER por usuario).
   - unsubscribe: elimina la suscripción por su endpoint.
   - service_worker: sirve /sw.js desde la raíz, con scope global.
 
@@ -13,6 +14,7 @@ import logging
 
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.db.models import F
 from django.http import HttpResponse, JsonResponse
 from django.template.loader import render_to_string
 from django.views.decorators.http import require_GET, require_POST
@@ -50,10 +52,31 @@ def subscribe(request):
             'user_agent': request.META.get('HTTP_USER_AGENT', '')[:300],
         },
     )
-    logger.info("🔔 Suscripción push registrada para %s", request.user.username)
+    evicted = evict_extra_subscriptions(request.user, keep=endpoint)
+    logger.info("🔔 Suscripción push registrada para %s (descartadas: %s)",
+                request.user.username, evicted)
     return JsonResponse({'ok': True})
 
 
+def evict_extra_subscriptions(user, keep=None):
+    """
+    Deja al usuario con como máximo `PUSH_SUBSCRIPTIONS_PER_USER` suscripciones:
+    conserva `keep` (la recién registrada, si se indica) y descarta las que hace más tiempo
+    que no reciben una push con éxito. Devuelve cuántas se borraron.
+    """
+    cap = settings.PUSH_SUBSCRIPTIONS_PER_USER
+    if keep is not None:
+        cap -= 1
+    others = PushSubscription.objects.filter(user=user).exclude(endpoint=keep).order_by(
+        F('last_success_at').desc(nulls_last=True), '-created'
+    )
+    extra = list(others.values_list('pk', flat=True)[max(cap, 0):])
+    if not extra:
+        return 0
+    deleted, _ = PushSubscription.objects.filter(pk__in=extra).delete()
+    return deleted
+
+
 @login_required(login_url='login')
 @require_POST
 def test_push(request):
@@ -66,12 +89,13 @@ def test_push(request):
     """
     from .webpush_sender import send_push_to_user
 
+    # La prueba también intenta las suscripciones marcadas como no saludables.
     result = send_push_to_user(request.user, {
         "title": "🔔 Notificación de prueba",
         "body": "Si ves esto, las notificaciones funcionan correctamente.",
         "url": "/",
         "tag": "weapon-test",
-    })
+    }, include_unhealthy=True)
     status = 200 if result.get("ok") else 502
     return JsonResponse(result, status=status)
 
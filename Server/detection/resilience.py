@@ -0,0 +1,213 @@
+"""
+Política de entrega para proveedores externos (Brevo, SMTP, ...).
+
+  - `RetryPolicy`: reintentos con backoff exponencial y jitter completo ante
+    errores transitorios (429, 5xx, timeouts). Respeta `Retry-After` cuando el
+    proveedor lo envía; si pide esperar más que `max_delay` no se bloquea el
+    hilo: se abandona y el outbox reintenta la notificación más tarde.
+  - `CircuitBreaker`: tras `failure_threshold` fallos seguidos se "abre" y las
+    llamadas fallan al instante (`CircuitOpen`) durante `reset_timeout`
+    segundos; después deja pasar UNA llamada de prueba (semiabierto) y se
+    cierra si tiene éxito. Un 429 se reintenta pero no cuenta como fallo: el
+    proveedor está disponible, solo pide ir más despacio.
+
+El estado es por proceso (cada worker de gunicorn decide por su cuenta) y se
+expone en `/api/metrics/` con `stats()`.
+"""
+import random
+import time
+from email.utils import parsedate_to_datetime
+from threading import Lock
+
+from django.utils import timezone
+
+# Códigos HTTP que merecen reintento (el resto de 4xx son errores del mensaje).
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# Reintentables que no indican un proveedor caído (no abren el circuito).
+THROTTLED_STATUS = {429}
+
+
+class CircuitOpen(Exception):
+    """El proveedor está marcado como no disponible: no se intenta la llamada."""
+
+
+def parse_retry_after(value):
+    """Segundos indicados por la cabecera `Retry-After` (número o fecha HTTP)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - timezone.now()).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Reintentos con backoff exponencial + jitter completo."""
+
+    def __init__(self, name, max_attempts=3, base_delay=0.5, max_delay=5.0):
+        self.name = name
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lock = Lock()
+        self.stats_data = {'calls': 0, 'retries': 0, 'gave_up': 0, 'retry_after_honored': 0}
+
+    def delay(self, attempt, retry_after=None):
+        """
+        Espera antes del intento `attempt + 1`, o None si no debe reintentarse
+        (el proveedor pide esperar más de `max_delay`).
+        """
+        if retry_after is not None:
+            if retry_after > self.max_delay:
+                return None
+            with self.lock:
+                self.stats_data['retry_after_honored'] += 1
+            return retry_after
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+    def record(self, key):
+        with self.lock:
+            self.stats_data[key] += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                **self.stats_data,
+                'max_attempts': self.max_attempts,
+                'base_delay': self.base_delay,
+                'max_delay': self.max_delay,
+            }
+
+
+class CircuitBreaker:
+    """Interruptor cerrado / abierto / semiabierto para un proveedor."""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.lock = Lock()
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.stats_data = {'successes': 0, 'failures': 0, 'throttled': 0, 'rejected': 0, 'opened': 0}
+
+    def _acquire(self):
+        """(permitida, es la llamada de prueba del estado semiabierto)."""
+        with self.lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    self.stats_data['rejected'] += 1
+                    return False, False
+                self.state = self.HALF_OPEN
+                self.probe_in_flight = False
+            if self.state == self.HALF_OPEN:
+                # Solo una llamada de prueba a la vez mientras está semiabierto.
+                if self.probe_in_flight:
+                    self.stats_data['rejected'] += 1
+                    return False, False
+                self.probe_in_flight = True
+                return True, True
+            return True, False
+
+    def allow(self):
+        """True si se puede intentar la llamada ahora."""
+        return self._acquire()[0]
+
+    def record_success(self):
+        with self.lock:
+            self.stats_data['successes'] += 1
+            self.consecutive_failures = 0
+            self.probe_in_flight = False
+            self.state = self.CLOSED
+
+    def record_throttled(self):
+        """El proveedor respondió 429: ni éxito ni fallo, solo libera la prueba."""
+        with self.lock:
+            self.stats_data['throttled'] += 1
+            self.probe_in_flight = False
+
+    def release_probe(self):
+        """
+        Libera la llamada de prueba si nadie registró su resultado (p. ej. una
+        excepción inesperada); sin esto el circuito quedaría semiabierto para siempre.
+        """
+        with self.lock:
+            self.probe_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.stats_data['failures'] += 1
+            self.consecutive_failures += 1
+            self.probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.stats_data['opened'] += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def is_open(self):
+        """True mientras el circuito esté abierto (sin efectos: no consume la prueba)."""
+        with self.lock:
+            return self.state == self.OPEN and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def check(self):
+        """
+        Lanza `CircuitOpen` si la llamada no está permitida. Devuelve True si
+        es la llamada de prueba: el llamador debe llamar a `release_probe()`
+        en un `finally`.
+        """
+        allowed, probe = self._acquire()
+        if not allowed:
+            raise CircuitOpen(f"Circuito '{self.name}' abierto")
+        return probe
+
+    def stats(self):
+        with self.lock:
+            retry_in = 0.0
+            if self.state == self.OPEN:
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+            return {
+                **self.stats_data,
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'failure_threshold': self.failure_threshold,
+                'retry_in': round(retry_in, 1),
+            }
+
+
+_policies = {}
+_breakers = {}
+_registry_lock = Lock()
+
+
+def get_retry_policy(name, **kwargs):
+    """Política de reintentos `name` del proceso (se crea la primera vez)."""
+    with _registry_lock:
+        if name not in _policies:
+            _policies[name] = RetryPolicy(name, **kwargs)
+        return _policies[name]
+
+
+def get_breaker(name, **kwargs):
+    """Circuit breaker `name` del proceso (se crea la primera vez)."""
+    with _registry_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, **kwargs)
+        return _breakers[name]
+
+
+def stats():
+    return {
+        'retries': {name: policy.stats() for name, policy in _policies.items()},
+        'breakers': {name: breaker.stats() for name, breaker in _breakers.items()},
+    }
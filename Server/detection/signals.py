@@ -0,0 +1,21 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from detection import live, stats
+from detection.models import UploadAlert
+
+
+# Alerta nueva guardada una a una -> sumarla a las estadísticas de su token y
+# avisar a los paneles en vivo del dueño (misma transacción). Los lotes usan
+# bulk_create, que llama por su cuenta a stats.record_alerts() y live.publish_alerts().
+@receiver(post_save, sender=UploadAlert)
+def count_alert(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.record_alerts([instance])
+        live.publish_alerts([instance])
+
+
+# Alerta borrada -> restarla de las estadísticas de su token
+@receiver(post_delete, sender=UploadAlert)
+def uncount_alert(sender, instance, **kwargs):
+    stats.forget_alert(instance)
@@ -0,0 +1,125 @@
+"""
+Estadísticas de alertas por token, mantenidas de forma incremental.
+
+`AlertStats` (total y última alerta), `AlertDailyStats` (alertas por día) y
+`AlertLocationStats` (alertas por ubicación) se actualizan en la misma
+transacción que guarda o borra las alertas:
+
+  - Alerta individual (`postAlert`, subida directa, vista async): señales
+    `post_save` / `post_delete` de `UploadAlert` (detection/signals.py).
+  - Lotes (`bulk_create`, que no emite señales): `record_alerts(alerts)` desde
+    `UploadAlertListSerializer.create`, un UPDATE por fila de estadística.
+
+Los contadores se incrementan con `F()` en la base de datos (sin leer y
+reescribir), así que varias ingestas simultáneas del mismo token no pierden
+incrementos. `python manage.py rebuild_alert_stats` las recalcula desde cero.
+
+Las estadísticas describen la tabla caliente (lo que muestra el panel): al
+archivar una alerta (detection/archive.py) se borra de UploadAlert y se resta.
+"""
+from collections import Counter
+
+from django.apps import apps as django_apps
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max
+from django.db.models.functions import Coalesce, Greatest, TruncDate
+from django.utils import timezone
+
+
+def _models(apps):
+    return (
+        apps.get_model('detection', 'UploadAlert'),
+        apps.get_model('detection', 'AlertStats'),
+        apps.get_model('detection', 'AlertDailyStats'),
+        apps.get_model('detection', 'AlertLocationStats'),
+    )
+
+
+def _bump(model, keys, field, delta, create=None, **updates):
+    """Suma `delta` a `field` de la fila `keys`; si aún no existe la crea con `create`."""
+    if model.objects.filter(**keys).update(**{field: F(field) + delta}, **updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**keys, **{field: delta}, **(create or {}))
+    except IntegrityError:
+        # Otra transacción creó la fila entre el UPDATE y el INSERT.
+        model.objects.filter(**keys).update(**{field: F(field) + delta}, **updates)
+
+
+def record_alerts(alerts, apps=django_apps):
+    """Suma `alerts` (recién creadas) a las estadísticas de sus tokens."""
+    _, AlertStats, AlertDailyStats, AlertLocationStats = _models(apps)
+
+    totals, latest, days, locations = Counter(), {}, Counter(), Counter()
+    for alert in alerts:
+        token_id = alert.userID_id
+        created = alert.dateCreated or timezone.now()
+        totals[token_id] += 1
+        latest[token_id] = max(latest.get(token_id, created), created)
+        days[(token_id, timezone.localdate(created))] += 1
+        locations[(token_id, alert.location)] += 1
+
+    for token_id, count in totals.items():
+        last = latest[token_id]
+        _bump(AlertStats, {'token_id': token_id}, 'total', count,
+              create={'last_alert_at': last},
+              last_alert_at=Greatest(Coalesce(F('last_alert_at'), last), last))
+    for (token_id, day), count in days.items():
+        _bump(AlertDailyStats, {'token_id': token_id, 'day': day}, 'count', count)
+    for (token_id, location), count in locations.items():
+        _bump(AlertLocationStats, {'token_id': token_id, 'location': location}, 'count', count)
+
+
+def forget_alert(alert, apps=django_apps):
+    """Resta una alerta borrada de las estadísticas de su token."""
+    UploadAlert, AlertStats, AlertDailyStats, AlertLocationStats = _models(apps)
+    token_id = alert.userID_id
+
+    AlertStats.objects.filter(token_id=token_id, total__gt=0).update(total=F('total') - 1)
+    if alert.dateCreated:
+        day = timezone.localdate(alert.dateCreated)
+        AlertDailyStats.objects.filter(token_id=token_id, day=day, count__gt=0).update(count=F('count') - 1)
+        AlertDailyStats.objects.filter(token_id=token_id, day=day, count=0).delete()
+    AlertLocationStats.objects.filter(token_id=token_id, location=alert.location, count__gt=0).update(count=F('count') - 1)
+    AlertLocationStats.objects.filter(token_id=token_id, location=alert.location, count=0).delete()
+
+    # Si era la última alerta, la nueva "última" sale del índice (userID, -dateCreated).
+    if alert.dateCreated:
+        stats = AlertStats.objects.filter(token_id=token_id, last_alert_at__lte=alert.dateCreated)
+        if stats.exists():
+            last = (UploadAlert.objects.filter(userID_id=token_id).exclude(pk=alert.pk)
+                    .aggregate(last=Max('dateCreated'))['last'])
+            stats.update(last_alert_at=last)
+
+
+def rebuild(apps=django_apps, token_ids=None):
+    """Recalcula desde cero las estadísticas (de todos los tokens o de `token_ids`)."""
+    UploadAlert, AlertStats, AlertDailyStats, AlertLocationStats = _models(apps)
+
+    alerts = UploadAlert.objects.order_by()
+    stats_rows = [AlertStats.objects, AlertDailyStats.objects, AlertLocationStats.objects]
+    if token_ids is not None:
+        alerts = alerts.filter(userID_id__in=token_ids)
+        stats_rows = [manager.filter(token_id__in=token_ids) for manager in stats_rows]
+
+    with transaction.atomic():
+        for rows in stats_rows:
+            rows.all().delete()
+
+        AlertStats.objects.bulk_create(
+            AlertStats(token_id=row['userID'], total=row['total'], last_alert_at=row['last'])
+            for row in alerts.values('userID').annotate(total=Count('pk'), last=Max('dateCreated'))
+        )
+        AlertDailyStats.objects.bulk_create(
+            (AlertDailyStats(token_id=row['userID'], day=row['day'], count=row['count'])
+             for row in alerts.annotate(day=TruncDate('dateCreated')).values('userID', 'day')
+             .annotate(count=Count('pk'))),
+            batch_size=1000,
+        )
+        AlertLocationStats.objects.bulk_create(
+            (AlertLocationStats(token_id=row['userID'], location=row['location'], count=row['count'])
+             for row in alerts.values('userID', 'location').annotate(count=Count('pk'))),
+            batch_size=1000,
+        )
+    return AlertStats.objects.count()
@@ -1,2 +1,635 @@
+import csv
+import io
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from detection import archive, outbox, stats, vapid, webpush_sender
+from detection.pagination import paginate_keyset
+from detection.resilience import CircuitBreaker
+from detection.email_batcher import BatcherFull, EmailBatcher, SendResult
+from detection.email_transports import EmailTransport, TransportRouter
+from detection.models import (
+    AlertDailyStats, AlertLocationStats, AlertStats, NotificationOutbox, PushSubscription, UploadAlert,
+)
+
+
+def make_alert(token, **fields):
+    """Alerta sin tocar el almacenamiento (solo el nombre de la imagen)."""
+    fields.setdefault('image', 'test.jpg')
+    fields.setdefault('alertReceiver', 'guardia@example.com')
+    fields.setdefault('location', 'Entrada')
+    return UploadAlert.objects.create(userID=token, **fields)
+
+
+@override_settings(NOTIFICATION_OUTBOX_INLINE=False, NOTIFICATION_OUTBOX_MAX_ATTEMPTS=3,
+                   NOTIFICATION_OUTBOX_RETRY_BASE=30, NOTIFICATION_OUTBOX_LEASE=300)
+class OutboxTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('camara', 'camara@example.com', 'clave')
+        self.alert = make_alert(self.user.auth_token)
+        self.entry = outbox.enqueue_alert_notifications(self.alert, [NotificationOutbox.CHANNEL_EMAIL])[0]
+
+    def handler(self, result):
+        return mock.patch('detection.outbox.import_string', return_value=mock.Mock(return_value=result))
+
+    def test_claim_takes_lease_and_is_not_reclaimed(self):
+        claimed = outbox.claim_batch()
+        self.assertEqual([entry.pk for entry in claimed], [self.entry.pk])
+
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.status, NotificationOutbox.STATUS_SENDING)
+        self.assertEqual(self.entry.attempts, 1)
+        self.assertGreater(self.entry.locked_until, timezone.now())
+        # Mientras dura el lease ningún otro worker la reclama
+        self.assertEqual(outbox.claim_batch(), [])
+
+    def test_expired_lease_is_reclaimed(self):
+        outbox.claim_batch()
+        NotificationOutbox.objects.filter(pk=self.entry.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1))
+
+        claimed = outbox.claim_batch()
+        self.assertEqual([entry.pk for entry in claimed], [self.entry.pk])
+        self.assertEqual(claimed[0].attempts, 2)
+
+    def test_sent_entry_is_delivered_once(self):
+        with self.handler(True) as import_string:
+            self.assertEqual(outbox.process_batch(), (1, 0, 0, 0))
+            self.assertEqual(outbox.process_batch(), (0, 0, 0, 0))
+        self.assertEqual(import_string.return_value.call_count, 1)
+
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.status, NotificationOutbox.STATUS_SENT)
+        self.assertIsNotNone(self.entry.sent_at)
+        self.assertIsNone(self.entry.locked_until)
+
+    def test_failure_retries_with_backoff_then_fails(self):
+        with self.handler(False):
+            self.assertEqual(outbox.process_batch(), (0, 1, 0, 0))
+            self.entry.refresh_from_db()
+            self.assertEqual(self.entry.status, NotificationOutbox.STATUS_PENDING)
+            delay = (self.entry.next_attempt_at - timezone.now()).total_seconds()
+            self.assertAlmostEqual(delay, 30, delta=5)
+            # No vence hasta pasado el backoff
+            self.assertEqual(outbox.process_batch(), (0, 0, 0, 0))
+
+            for attempt in (2, 3):
+                NotificationOutbox.objects.filter(pk=self.entry.pk).update(next_attempt_at=timezone.now())
+                outbox.process_batch()
+                self.entry.refresh_from_db()
+                self.assertEqual(self.entry.attempts, attempt)
+
+        self.assertEqual(self.entry.status, NotificationOutbox.STATUS_FAILED)
+        self.assertTrue(self.entry.last_error)
+
+    def test_handler_exception_is_recorded(self):
+        with mock.patch('detection.outbox.import_string', return_value=mock.Mock(side_effect=RuntimeError('caído'))):
+            self.assertEqual(outbox.process_batch(), (0, 1, 0, 0))
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.status, NotificationOutbox.STATUS_PENDING)
+        self.assertIn('caído', self.entry.last_error)
+
+    def test_deferred_result_is_recorded_when_future_resolves(self):
+        future = Future()
+        with self.handler(future):
+            # En vuelo: cuenta como trabajo para que el worker no se duerma
+            self.assertEqual(outbox.process_batch(), (0, 0, 1, 0))
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.status, NotificationOutbox.STATUS_SENDING)
+
+        future.set_result(SendResult(True, '<id@brevo>', ''))
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.status, NotificationOutbox.STATUS_SENT)
+        self.assertEqual(self.entry.provider_message_id, '<id@brevo>')
+
+    def test_full_batcher_releases_entry_without_spending_the_attempt(self):
+        with mock.patch('detection.outbox.import_string', return_value=mock.Mock(side_effect=BatcherFull(1))):
+            # Contrapresión, no un fallo de entrega
+            self.assertEqual(outbox.process_batch(), (0, 0, 0, 1))
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.status, NotificationOutbox.STATUS_PENDING)
+        self.assertEqual(self.entry.attempts, 0)
+        self.assertGreater(self.entry.next_attempt_at, timezone.now())
+
+    @override_settings(BREVO_BATCH_WINDOW=0.5)
+    def test_full_batcher_on_the_real_email_path_releases_without_fallback(self):
+        full = EmailBatcher(window=1, max_messages=10, send_batch=mock.Mock(), maxsize=1)
+        with mock.patch.object(full, '_ensure_started'), \
+                mock.patch('detection.email_batcher.get_batcher', return_value=full), \
+                mock.patch('alertuploadREST.views.send_simple_email_fallback') as fallback:
+            full.submit({'to_email': 'otro@example.com'})
+            self.assertEqual(outbox.process_batch(), (0, 0, 0, 1))
+        fallback.assert_not_called()
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.status, NotificationOutbox.STATUS_PENDING)
+        self.assertEqual(self.entry.attempts, 0)
+
+
+class EmailBatcherTests(TestCase):
+
+    def test_full_queue_fails_fast(self):
+        batcher = EmailBatcher(window=1, max_messages=10, send_batch=mock.Mock(), maxsize=1)
+        # Sin hilo de envío: la cola no se vacía
+        with mock.patch.object(batcher, '_ensure_started'):
+            batcher.submit({'to': 'a@example.com'})
+            with self.assertRaises(BatcherFull):
+                batcher.submit({'to': 'b@example.com'})
+        stats = batcher.stats()
+        self.assertEqual((stats['pending'], stats['queue_max'], stats['rejected']), (1, 1, 1))
+
+
+class CircuitBreakerTests(TestCase):
+
+    def open_breaker(self):
+        breaker = CircuitBreaker('prueba', failure_threshold=2, reset_timeout=0)
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        return breaker
+
+    def test_throttled_does_not_open_the_circuit(self):
+        breaker = CircuitBreaker('prueba', failure_threshold=2)
+        for _ in range(5):
+            breaker.check()
+            breaker.record_throttled()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(breaker.stats()['throttled'], 5)
+
+    def test_only_one_probe_while_half_open(self):
+        breaker = self.open_breaker()
+        self.assertTrue(breaker.check())
+        self.assertFalse(breaker.allow())
+
+    def test_released_probe_lets_the_next_call_probe(self):
+        breaker = self.open_breaker()
+        probe = breaker.check()
+        try:
+            raise ValueError('respuesta inesperada')
+        except ValueError:
+            pass
+        finally:
+            if probe:
+                breaker.release_probe()
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(breaker.check())
+
+    def test_brevo_429_is_retried_without_opening_the_circuit(self):
+        from detection import email_sender
+
+        breaker = CircuitBreaker('brevo', failure_threshold=1)
+        session = mock.Mock()
+        session.post.return_value = mock.Mock(status_code=429, headers={})
+        with mock.patch.object(email_sender, '_brevo_breaker', return_value=breaker), \
+                mock.patch.object(email_sender, '_brevo_session', return_value=session), \
+                mock.patch.object(email_sender.time, 'sleep'):
+            response = email_sender._post_brevo({}, 'xkeysib-prueba')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(session.post.call_count, 1)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+
+class FakeTransport(EmailTransport):
+    """Proveedor de prueba: `outcomes[to_email]` es un SendResult o una excepción."""
+
+    def __init__(self, name, outcomes=None):
+        self.name = name
+        self.outcomes = outcomes or {}
+        self.sent = []
+
+    def send(self, message):
+        outcome = self.outcomes.get(message['to_email'], SendResult(True, f"<{self.name}>", ''))
+        if isinstance(outcome, Exception):
+            raise outcome
+        self.sent.append(message['to_email'])
+        return outcome
+
+
+class TransportRouterTests(TestCase):
+
+    def messages(self, *recipients):
+        return [{'subject': 'Alerta', 'text_content': '...', 'to_email': to} for to in recipients]
+
+    def test_partial_failure_only_fails_over_the_failed_message(self):
+        primary = FakeTransport('primario', {'b@example.com': OSError('conexión cerrada')})
+        backup = FakeTransport('respaldo')
+        router = TransportRouter([primary, backup])
+
+        results = router.send_many(self.messages('a@example.com', 'b@example.com', 'c@example.com'))
+
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual(primary.sent, ['a@example.com', 'c@example.com'])
+        self.assertEqual(backup.sent, ['b@example.com'])
+        self.assertEqual(router.stats()['primario']['failovers_from'], 1)
+
+    def test_rejected_message_is_not_failed_over(self):
+        rejected = SendResult(False, '', 'Brevo devolvió status 400', False)
+        primary = FakeTransport('primario', {'a@example.com': rejected})
+        backup = FakeTransport('respaldo')
+        router = TransportRouter([primary, backup])
+
+        results = router.send_many(self.messages('a@example.com'))
+
+        self.assertEqual(results, [rejected])
+        self.assertEqual(backup.sent, [])
+        self.assertEqual(router.stats()['primario']['failovers_from'], 0)
+
+
+@override_settings(PUSH_SUBSCRIPTION_PRUNE_FAILURES=3, PUSH_SUBSCRIPTIONS_PER_USER=10)
+class PrunePushSubscriptionsTests(TestCase):
+
+    def subscribe(self, name, **fields):
+        return PushSubscription.objects.create(
+            user=self.user, endpoint=f'https://push.example.com/{name}', p256dh='clave', auth='secreto', **fields)
+
+    def setUp(self):
+        self.user = User.objects.create_user('guardia', 'guardia@example.com', 'clave')
+
+    def test_only_failing_subscriptions_are_pruned(self):
+        long_ago = timezone.now() - timedelta(days=365)
+        quiet = self.subscribe('silenciosa', last_success_at=long_ago)
+        never_sent = self.subscribe('sin-envios')
+        PushSubscription.objects.filter(pk=never_sent.pk).update(created=long_ago)
+        failing = self.subscribe('caida', consecutive_failures=3)
+
+        call_command('prune_push_subscriptions', stdout=io.StringIO())
+
+        remaining = set(PushSubscription.objects.values_list('pk', flat=True))
+        self.assertEqual(remaining, {quiet.pk, never_sent.pk})
+        self.assertNotIn(failing.pk, remaining)
+
+
+@override_settings(VAPID_PUBLIC_KEY='publica', VAPID_PRIVATE_KEY='privada',
+                   PUSH_SUBSCRIPTION_MAX_FAILURES=3, PUSH_SUBSCRIPTION_RETRY_AFTER=3600)
+class PushHealthTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('guardia', 'guardia@example.com', 'clave')
+        self.sub = PushSubscription.objects.create(
+            user=self.user, endpoint='https://push.example.com/uno', p256dh='clave', auth='secreto')
+
+    def test_failure_increments_the_stored_counter(self):
+        # Otro envío simultáneo ya sumó un fallo: la copia en memoria está desfasada
+        PushSubscription.objects.filter(pk=self.sub.pk).update(consecutive_failures=1)
+        outcome = webpush_sender.PushOutcome(self.sub, False, 500, 'HTTP 500', 0.25)
+        webpush_sender._apply_outcomes(self.user, 1, [outcome])
+
+        self.sub.refresh_from_db()
+        self.assertEqual(self.sub.consecutive_failures, 2)
+        self.assertEqual(self.sub.last_latency_ms, 250)
+        self.assertIsNotNone(self.sub.last_failure_at)
+
+    def test_all_subscriptions_skipped_is_not_delivered(self):
+        PushSubscription.objects.filter(pk=self.sub.pk).update(
+            consecutive_failures=3, last_failure_at=timezone.now())
+        alert = make_alert(self.user.auth_token)
+        with mock.patch('detection.webpush_sender._push_one') as push_one:
+            self.assertFalse(webpush_sender.deliver_alert_push(alert))
+        push_one.assert_not_called()
+
+    def test_user_without_subscriptions_is_delivered(self):
+        self.sub.delete()
+        self.assertTrue(webpush_sender.deliver_alert_push(make_alert(self.user.auth_token)))
+
+
+@override_settings(VAPID_PUBLIC_KEY='publica', VAPID_PRIVATE_KEY='privada', PUSH_DELIVERY_DEADLINE=0.2)
+class PushDeadlineTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('guardia', 'guardia@example.com', 'clave')
+        self.fast, self.slow = (
+            PushSubscription.objects.create(
+                user=self.user, endpoint=f'https://push.example.com/{name}', p256dh='clave', auth='secreto')
+            for name in ('rapida', 'lenta')
+        )
+
+    def test_slow_subscription_is_cut_at_the_deadline(self):
+        hang = threading.Event()
+        self.addCleanup(hang.set)
+
+        def push_one(sub, data, timeout):
+            if sub.pk == self.slow.pk:
+                hang.wait(5)
+            return webpush_sender.PushOutcome(sub, True, 201, '', 0.01)
+
+        started = time.monotonic()
+        with mock.patch('detection.webpush_sender._push_one', side_effect=push_one):
+            result = webpush_sender.send_push_to_user(self.user, {'title': 'Prueba'})
+        self.assertLess(time.monotonic() - started, 2)
+
+        self.assertEqual((result['subscriptions'], result['sent']), (2, 1))
+        self.assertTrue(result['ok'])
+        self.assertIn('Plazo de entrega agotado', ' '.join(result['errors']))
+        self.slow.refresh_from_db()
+        self.assertEqual(self.slow.consecutive_failures, 1)
+
+    def test_request_timeout_is_the_deadline(self):
+        with mock.patch('pywebpush.webpush') as webpush, \
+                mock.patch('detection.vapid.headers_for', return_value={}):
+            outcome = webpush_sender._push_one(self.fast, '{}', settings.PUSH_DELIVERY_DEADLINE)
+        self.assertTrue(outcome.ok)
+        self.assertEqual(webpush.call_args.kwargs['timeout'], 0.2)
+
+
+class VapidHeadersTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from py_vapid import Vapid, b64urlencode
+
+        key = Vapid()
+        key.generate_keys()
+        cls.private_key = b64urlencode(key.private_key.private_numbers().private_value.to_bytes(32, 'big'))
+
+    def setUp(self):
+        vapid._headers.clear()
+        override = self.settings(VAPID_PRIVATE_KEY=self.private_key, VAPID_ADMIN_EMAIL='mailto:admin@example.com')
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_same_audience_reuses_the_signed_header(self):
+        before = vapid.stats()
+        first = vapid.headers_for('https://fcm.googleapis.com/fcm/send/uno')
+        second = vapid.headers_for('https://fcm.googleapis.com/fcm/send/dos')
+        after = vapid.stats()
+
+        self.assertEqual(first, second)
+        self.assertEqual(after['signed'] - before['signed'], 1)
+        self.assertEqual(after['hits'] - before['hits'], 1)
+
+    def test_other_audience_is_signed_separately(self):
+        fcm = vapid.headers_for('https://fcm.googleapis.com/fcm/send/uno')
+        mozilla = vapid.headers_for('https://updates.push.services.mozilla.com/wpush/v2/uno')
+        self.assertNotEqual(fcm, mozilla)
+        self.assertEqual(vapid.stats()['origins'], 2)
+
+    def test_header_is_signed_again_near_expiry(self):
+        endpoint = 'https://fcm.googleapis.com/fcm/send/uno'
+        first = vapid.headers_for(endpoint)
+        later = time.time() + vapid.TOKEN_TTL - vapid.REFRESH_MARGIN + 1
+        with mock.patch('detection.vapid.time.time', return_value=later):
+            self.assertNotEqual(vapid.headers_for(endpoint), first)
+
+
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user('camara', 'camara@example.com', 'clave')
+        for _ in range(7):
+            make_alert(user.auth_token)
+        # Ráfaga: todas las alertas del mismo instante (solo el id desempata)
+        UploadAlert.objects.update(dateCreated=timezone.now().replace(microsecond=0))
+        self.expected = list(UploadAlert.objects.order_by('-id').values_list('pk', flat=True))
+
+    def test_cursors_walk_equal_timestamps_without_gaps_or_repeats(self):
+        queryset = UploadAlert.objects.all()
+        pages, cursor = [], None
+        while True:
+            page = paginate_keyset(queryset, cursor, per_page=3)
+            pages.append([alert.pk for alert in page])
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual([pk for ids in pages for pk in ids], self.expected)
+        self.assertEqual([len(ids) for ids in pages], [3, 3, 1])
+
+        # Y de vuelta hacia las más recientes con el cursor anterior
+        back = paginate_keyset(queryset, page.prev_cursor, per_page=3)
+        self.assertEqual([alert.pk for alert in back], pages[1])
+        back = paginate_keyset(queryset, back.prev_cursor, per_page=3)
+        self.assertEqual([alert.pk for alert in back], pages[0])
+        self.assertFalse(back.has_previous)
+
+    def test_tampered_cursor_falls_back_to_first_page(self):
+        page = paginate_keyset(UploadAlert.objects.all(), 'no-es-un-cursor', per_page=3)
+        self.assertEqual([alert.pk for alert in page], self.expected[:3])
+
+
+class AlertStatsTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('camara', 'camara@example.com', 'clave')
+        self.token = self.user.auth_token
+        now = timezone.now()
+        for days, location in ((0, 'Entrada'), (0, 'Entrada'), (1, 'Patio'), (3, 'Patio')):
+            alert = make_alert(self.token, location=location)
+            UploadAlert.objects.filter(pk=alert.pk).update(dateCreated=now - timedelta(days=days))
+        # Las fechas se movieron con update(): se parte de estadísticas recalculadas
+        stats.rebuild()
+        # Un lote entra por bulk_create + record_alerts
+        batch = UploadAlert.objects.bulk_create([
+            UploadAlert(userID=self.token, image='lote.jpg', alertReceiver='guardia@example.com', location='Patio')
+            for _ in range(2)
+        ])
+        stats.record_alerts(batch)
+
+    def snapshot(self):
+        return (
+            list(AlertStats.objects.values_list('token_id', 'total', 'last_alert_at')),
+            sorted(AlertDailyStats.objects.values_list('token_id', 'day', 'count')),
+            sorted(AlertLocationStats.objects.values_list('token_id', 'location', 'count')),
+        )
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        stats.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_batch_matches_rebuild(self):
+        self.assertEqual(AlertStats.objects.get(token=self.token).total, 6)
+        self.assertMatchesRebuild()
+
+    def test_delete_matches_rebuild(self):
+        UploadAlert.objects.order_by('-dateCreated').first().delete()
+        UploadAlert.objects.filter(location='Entrada').first().delete()
+        self.assertEqual(AlertStats.objects.get(token=self.token).total, 4)
+        self.assertMatchesRebuild()
+
+    def test_archive_matches_rebuild(self):
+        old = UploadAlert.objects.filter(dateCreated__lt=timezone.now() - timedelta(days=2))
+        with mock.patch.object(archive, '_copy_files', return_value={'image': 'test.jpg', 'thumbnail': '', 'preview': ''}):
+            archived = archive.archive_alerts(old)
+        self.assertEqual(len(archived), 1)
+        self.assertEqual(AlertStats.objects.get(token=self.token).total, 5)
+        self.assertFalse(AlertDailyStats.objects.filter(day__lt=timezone.localdate() - timedelta(days=2)).exists())
+        self.assertMatchesRebuild()
+
+
+class LiveAlertsTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('guardia', 'guardia@example.com', 'clave')
+        self.client.force_login(self.user)
+
+    @override_settings(LIVE_UPDATES_ENABLED=True)
+    def test_stream_is_refused_under_wsgi(self):
+        # Un worker WSGI no sirve SSE (ocuparía un hilo por panel): 204 y el panel sondea
+        response = self.client.get(reverse('live_alerts'))
+        self.assertEqual(response.status_code, 204)
+
+    def test_polling_returns_alerts_after_the_last_seen(self):
+        first = make_alert(self.user.auth_token, location='Entrada')
+        primed = self.client.get(reverse('recent_alerts')).json()
+        self.assertEqual(primed, {'alerts': [], 'last_id': first.pk})
+
+        second = make_alert(self.user.auth_token, location='Patio')
+        data = self.client.get(reverse('recent_alerts'), {'after': first.pk}).json()
+        self.assertEqual([alert['id'] for alert in data['alerts']], [second.pk])
+        self.assertEqual(data['alerts'][0]['location'], 'Patio')
+        self.assertEqual(data['last_id'], second.pk)
+
+    @override_settings(LIVE_UPDATES_ENABLED=False)
+    def test_nothing_is_published_when_disabled(self):
+        with mock.patch('detection.live.connection') as connection, \
+                mock.patch('detection.live.transaction.on_commit') as on_commit:
+            make_alert(self.user.auth_token)
+        connection.cursor.assert_not_called()
+        on_commit.assert_not_called()
+
+    @override_settings(LIVE_UPDATES_ENABLED=True)
+    def test_new_alert_is_published_after_commit_when_enabled(self):
+        with mock.patch('detection.live.transaction.on_commit') as on_commit:
+            make_alert(self.user.auth_token)
+        on_commit.assert_called_once()
+
+
+class AlertPageCacheTests(TestCase):
+
+    @override_settings(ALERT_PAGE_CACHE_SECONDS=86400, ALERT_PAGE_LOCAL_CACHE_SECONDS=60)
+    def test_process_local_cache_gets_the_short_ttl(self):
+        from detection.views import alert_page_cache_seconds
+
+        local = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache'}}
+        with self.settings(CACHES=local):
+            self.assertEqual(alert_page_cache_seconds(), 60)
+        with self.settings(CACHES=shared):
+            self.assertEqual(alert_page_cache_seconds(), 86400)
+
+
+class AlertPageConditionalTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('guardia', 'guardia@example.com', 'clave')
+        self.url = f'/alert/{make_alert(self.user.auth_token).public_id}/'
+
+    def test_matching_etag_returns_304(self):
+        # La primera visita fija la cookie CSRF; desde ahí el ETag es estable
+        self.client.get(self.url)
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_session_or_csrf_cookie_changes_the_etag(self):
+        self.client.get(self.url)
+        anonymous = self.client.get(self.url)['ETag']
+
+        self.client.force_login(self.user)
+        logged_in = self.client.get(self.url)['ETag']
+        self.assertNotEqual(logged_in, anonymous)
+
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = 'otro-token'
+        with_csrf = self.client.get(self.url)['ETag']
+        self.assertNotEqual(with_csrf, logged_in)
+        # El ETag anterior ya no vale: la página se vuelve a renderizar
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=logged_in).status_code, 200)
+
+
+class PublicIdTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('guardia', 'guardia@example.com', 'clave')
+        self.alert = make_alert(self.user.auth_token, location='Entrada Norte')
+
+    def test_alert_is_found_by_public_id(self):
+        self.assertEqual(archive.find_alert(self.alert.public_id), self.alert)
+        self.assertIsNone(archive.find_alert(uuid.uuid4()))
+
+    def test_detail_url_resolves_by_public_id(self):
+        response = self.client.get(f'/alert/{self.alert.public_id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Entrada Norte')
+
+    def test_integer_ids_no_longer_resolve(self):
+        self.assertEqual(self.client.get(f'/alert/{self.alert.pk}/').status_code, 404)
+
+
+class PublicIdBackfillTests(TransactionTestCase):
+    """Migración 0012: public_id a partir del nombre UUID de la imagen."""
+
+    before = [('detection', '0011_uploadalert_public_id')]
+    after = [('detection', '0012_backfill_uploadalert_public_id')]
+
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        self.executor.migrate(self.before)
+        self.addCleanup(self.migrate_to_latest)
+
+    def migrate_to_latest(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_backfill_reuses_the_image_uuid(self):
+        apps = self.executor.loader.project_state(self.before).apps
+        user = apps.get_model('auth', 'User').objects.create(username='camara')
+        token = apps.get_model('authtoken', 'Token').objects.create(key='a' * 40, user=user)
+        UploadAlert = apps.get_model('detection', 'UploadAlert')
+        image_id = uuid.uuid4()
+        named = UploadAlert.objects.create(image=f'{image_id}.jpg', userID=token)
+        repeated = UploadAlert.objects.create(image=f'{image_id}.png', userID=token)
+        legacy = UploadAlert.objects.create(image='foto.jpg', userID=token)
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        UploadAlert = executor.loader.project_state(self.after).apps.get_model('detection', 'UploadAlert')
+        public_ids = dict(UploadAlert.objects.values_list('pk', 'public_id'))
+
+        self.assertEqual(public_ids[named.pk], image_id)
+        self.assertNotIn(public_ids[repeated.pk], (None, image_id))
+        self.assertIsNotNone(public_ids[legacy.pk])
+
+
+class ExportTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('guardia', 'guardia@example.com', 'clave')
+        self.client.force_login(self.user)
+        self.locations = ['=HYPERLINK("http://x")', '+1', '-2', '@SUM(A1)', '\tTab', 'Entrada Norte']
+        for location in self.locations:
+            make_alert(self.user.auth_token, location=location)
+
+    def export(self, export_format):
+        response = self.client.get(reverse('export_alerts'), {'format': export_format})
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_csv_escapes_formula_cells(self):
+        rows = list(csv.DictReader(io.StringIO(self.export('csv').lstrip('\ufeff'))))
+        exported = {row['location'] for row in rows}
+        self.assertEqual(exported, {
+            "'=HYPERLINK(\"http://x\")", "'+1", "'-2", "'@SUM(A1)", "'\tTab", 'Entrada Norte',
+        })
+
+    def test_ndjson_keeps_values_verbatim(self):
+        rows = [json.loads(line) for line in self.export('ndjson').splitlines()]
+        self.assertEqual({row['location'] for row in rows}, set(self.locations))
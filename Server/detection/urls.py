@@ -8,6 +8,11 @@ urlpatterns = [
     path('register/', views.registerPage, name='register'),
     path('', views.home, name='home'),
     path('logout/', views.logoutUser, name='logout'),
+    # 📡 Alertas nuevas en vivo (Server-Sent Events)
+    path('live/alerts/', views.liveAlerts, name='live_alerts'),
+    path('live/alerts/recent/', views.recentAlerts, name='recent_alerts'),
+    # 📥 Exportación de alertas filtradas (CSV / NDJSON en streaming)
+    path('export/', views.exportAlerts, name='export_alerts'),
 
     # 🔔 Web Push (VAPID)
     path('sw.js', push_views.service_worker, name='service_worker'),
@@ -45,4 +50,5 @@ urlpatterns = [
          name='password_reset_complete'),
     
     path('alert/<uuid:pk>/', views.alert, name='alert'),         
+    path('archive-alert/', views.archiveAlert, name='archive_alert'),
 ]
\ No newline at end of file
@@ -0,0 +1,77 @@
+"""
+Cabeceras VAPID (Web Push) firmadas una vez por origen del servicio push.
+
+Antes cada `webpush()` volvía a parsear `VAPID_PRIVATE_KEY` y firmaba un JWT
+ES256 nuevo por suscripción. Casi todas las suscripciones apuntan a unos
+pocos orígenes (FCM, autopush de Mozilla, Apple), y el JWT solo depende de
+`aud` (el origen), `sub` y `exp`:
+
+  - La clave privada se parsea una sola vez por proceso.
+  - `headers_for(endpoint)` devuelve la cabecera `Authorization` firmada para
+    el origen del endpoint y la reutiliza hasta `REFRESH_MARGIN` segundos
+    antes de su `exp` (validez de `TOKEN_TTL`).
+
+Uso:
+    from detection.vapid import headers_for
+    webpush(subscription_info, data, headers=headers_for(endpoint), ...)
+"""
+import time
+from threading import Lock
+from urllib.parse import urlparse
+
+from django.conf import settings
+
+# Validez del JWT (el estándar permite hasta 24 h; pywebpush usa 12 h).
+TOKEN_TTL = 12 * 60 * 60
+# Se vuelve a firmar cuando quedan menos de estos segundos para `exp`.
+REFRESH_MARGIN = 10 * 60
+
+_lock = Lock()
+_key = None             # (VAPID_PRIVATE_KEY, objeto Vapid parseado)
+_headers = {}           # origen -> (exp, cabeceras)
+_stats = {'signed': 0, 'hits': 0}
+
+
+def _vapid():
+    """Clave VAPID parseada (se vuelve a parsear solo si cambia el setting)."""
+    global _key
+    from py_vapid import Vapid
+
+    private_key = settings.VAPID_PRIVATE_KEY
+    if _key is None or _key[0] != private_key:
+        with _lock:
+            if _key is None or _key[0] != private_key:
+                _key = (private_key, Vapid.from_string(private_key=private_key))
+                _headers.clear()
+    return _key[1]
+
+
+def audience(endpoint):
+    """Origen (`aud`) de un endpoint push: esquema + host."""
+    url = urlparse(endpoint)
+    return f"{url.scheme}://{url.netloc}"
+
+
+def headers_for(endpoint):
+    """Cabeceras VAPID (Authorization) para el origen de `endpoint`, en caché."""
+    vapid = _vapid()
+    aud = audience(endpoint)
+    now = time.time()
+
+    cached = _headers.get(aud)
+    if cached and cached[0] - now > REFRESH_MARGIN:
+        with _lock:
+            _stats['hits'] += 1
+        return dict(cached[1])
+
+    exp = int(now) + TOKEN_TTL
+    signed = vapid.sign({"sub": settings.VAPID_ADMIN_EMAIL, "aud": aud, "exp": exp})
+    with _lock:
+        _headers[aud] = (exp, signed)
+        _stats['signed'] += 1
+    return dict(signed)
+
+
+def stats():
+    with _lock:
+        return {**_stats, 'origins': len(_headers)}
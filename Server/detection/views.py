@@ -4,13 +4,18 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import ensure_csrf_cookie
+from django.views.decorators.http import require_POST
 
 from .forms import CreateUserForm
 from .filters import DetectionFilter
-from .models import UploadAlert
+from .models import UploadAlert, ArchivedAlert, AlertStats, AlertDailyStats
+
+from .pagination import capped_count, paginate_keyset
+from . import archive, export, live
 
 from rest_framework.authtoken.models import Token
-from django.core.paginator import Paginator
+from django.conf import settings
+from django.utils import timezone
 
 
 
@@ -19,10 +24,19 @@ from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from django.contrib.auth import get_user_model
-from django.http import HttpResponseRedirect
+from django.http import Http404, HttpResponse, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.utils.safestring import mark_safe
+from django.core.handlers.asgi import ASGIRequest
 from django.urls import reverse
 from .email_sender import send_password_reset_email
+import hashlib
+import json
 import logging
+import uuid
 
 
 logger = logging.getLogger(__name__)
@@ -91,31 +105,162 @@ def home(request):
     except (ValueError, TypeError):
         per_page = 10
     
-    # Crear el paginador
-    paginator = Paginator(uploadAlert, per_page)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Paginación por cursor: sin COUNT(*) ni OFFSET, cualquier página cuesta lo mismo
+    page_obj = paginate_keyset(uploadAlert, request.GET.get('cursor'), per_page)
+
+    # Sin filtros, el total y la cabecera salen de las estadísticas del token (una fila)
+    alert_stats = AlertStats.objects.filter(token=token).first()
+    today_count = AlertDailyStats.objects.filter(token=token, day=timezone.localdate()).values_list('count', flat=True).first() or 0
+    filters_active = any(request.GET.get(name) for name in myFilter.filters)
+    if filters_active:
+        total_results, total_exact = capped_count(uploadAlert, settings.DASHBOARD_COUNT_LIMIT)
+    else:
+        total_results, total_exact = (alert_stats.total if alert_stats else 0), True
+
+    # Parámetros de los filtros que conservan los enlaces de paginación
+    page_query = request.GET.copy()
+    for key in ('cursor', 'page'):
+        page_query.pop(key, None)
     
     # Contexto para el template
     context = {
         'myFilter': myFilter,
-        'uploadAlert': page_obj,  # Ahora es un objeto paginado
-        'total_results': paginator.count,  # Total de resultados
+        'uploadAlert': page_obj,  # Página de resultados con cursores anterior/siguiente
+        'total_results': total_results,  # Total (hasta DASHBOARD_COUNT_LIMIT) o None
+        'total_exact': total_exact,
+        'alert_stats': alert_stats,  # Total y última alerta del token
+        'today_count': today_count,
+        'live_updates': settings.LIVE_UPDATES_ENABLED,
+        'live_poll_seconds': settings.LIVE_UPDATES_POLL_SECONDS,
+        # Las alertas en vivo se insertan en la tabla solo en la primera página sin filtros
+        'live_prepend': not filters_active and not request.GET.get('cursor'),
+        'per_page': per_page,
+        'page_query': page_query.urlencode(),
     }
     
     return render(request, 'detection/dashboard.html', context)
 
 
-def alert(request, pk):
 
-	uploadAlert = UploadAlert.objects.filter(image = str(pk) + ".jpg")
+# Flujo SSE del panel: resúmenes de las alertas nuevas del usuario en cuanto se guardan.
+# Solo con workers ASGI: en un worker WSGI cada conexión ocuparía un hilo. El 204
+# detiene la reconexión de EventSource y el panel pasa a sondear `recentAlerts`.
+@login_required(login_url='login')
+def liveAlerts(request):
+    if not settings.LIVE_UPDATES_ENABLED or not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    events = live.astream(request.user.pk)  # event loop, sin hilo por conexión
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # que el proxy no acumule los eventos
+    return response
+
+
+# Sondeo del panel cuando no hay SSE: alertas con id mayor que `after`
+@login_required(login_url='login')
+def recentAlerts(request):
+    token = Token.objects.get(user=request.user)
+    try:
+        after = int(request.GET['after'])
+    except (KeyError, ValueError):
+        after = None
+    alerts, last_id = live.recent_alert_summaries(token, after)
+    return JsonResponse({'alerts': alerts, 'last_id': last_id})
+
+
+@login_required(login_url='login')
+def exportAlerts(request):
+    """Exporta (CSV o NDJSON, en streaming) las alertas del usuario con los filtros del panel."""
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in export.FORMATS:
+        raise Http404("Formato de exportación no soportado")
+
+    token = Token.objects.get(user=request.user)
+    alerts = DetectionFilter(request.GET, queryset=UploadAlert.objects.filter(userID=token)).qs
+    alert_base = request.build_absolute_uri('/alert/')
+
+    response = StreamingHttpResponse(
+        export.stream(export_format, alerts, lambda public_id: f'{alert_base}{public_id}/'),
+        content_type=export.FORMATS[export_format],
+    )
+    filename = f"alertas-{timezone.localtime():%Y%m%d-%H%M}.{export_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Cache-Control'] = 'no-store'
+    response['X-Accel-Buffering'] = 'no'  # que el proxy no acumule la descarga
+    return response
 
-	myFilter = DetectionFilter(request.GET, queryset=uploadAlert)
-	uploadAlert = myFilter.qs 
 
-	context = {'myFilter':myFilter, 'uploadAlert':uploadAlert}
+ALERT_FRAGMENT_KEY = 'alert-detail:{}'
 
-	return render(request, 'detection/alert.html', context)
+# Cachés propias de cada proceso: borrar una entrada no llega a los demás workers.
+LOCAL_CACHE_BACKENDS = (
+	'django.core.cache.backends.locmem.LocMemCache',
+	'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def alert_page_cache_seconds():
+	"""
+	Vida del fragmento ya definitivo: ALERT_PAGE_CACHE_SECONDS con una caché
+	compartida; con una caché por proceso, ALERT_PAGE_LOCAL_CACHE_SECONDS como
+	mucho (al archivar, `cache.delete_many` solo limpia el worker que archiva).
+	"""
+	if settings.CACHES['default']['BACKEND'] in LOCAL_CACHE_BACKENDS:
+		return min(settings.ALERT_PAGE_CACHE_SECONDS, settings.ALERT_PAGE_LOCAL_CACHE_SECONDS)
+	return settings.ALERT_PAGE_CACHE_SECONDS
+
+
+def _alert_fragment(public_id):
+	"""
+	Contenido de la alerta ya renderizado (alert_detail.html) y sus validadores,
+	desde la caché. Una alerta no cambia tras crearse, así que se renderiza una
+	vez por proceso; solo la vista previa WebP llega después (derivados), y
+	mientras falta el fragmento caduca antes. Si no está en la tabla caliente
+	se busca en el archivo.
+	"""
+	key = ALERT_FRAGMENT_KEY.format(public_id)
+	entry = cache.get(key)
+	if entry is None:
+		alert = archive.find_alert(public_id)
+		if alert is None:
+			return None
+		html = render_to_string('detection/alert_detail.html', {'alert': alert})
+		entry = {
+			'html': html,
+			'etag': hashlib.md5(html.encode()).hexdigest(),
+			# Sin vista previa el contenido aún puede cambiar: solo ETag
+			'last_modified': alert.dateCreated if alert.preview else None,
+			'archived': isinstance(alert, ArchivedAlert),
+		}
+		timeout = alert_page_cache_seconds() if alert.preview else settings.ALERT_PAGE_PENDING_CACHE_SECONDS
+		cache.set(key, entry, timeout)
+	return entry
+
+
+def alert(request, pk):
+
+	entry = _alert_fragment(pk)
+	if entry is None:
+		return render(request, 'detection/alert.html', {'alert_fragment': ''})
+
+	# La página incluye el saludo del usuario y el token CSRF: el ETag depende
+	# también de las cookies de sesión y CSRF (sin consultar la base de datos)
+	etag = '"{}"'.format(hashlib.md5('|'.join([
+		entry['etag'],
+		request.COOKIES.get(settings.SESSION_COOKIE_NAME, ''),
+		request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+	]).encode()).hexdigest())
+	last_modified = entry['last_modified'] and int(entry['last_modified'].timestamp())
+
+	response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+	if response is None:
+		context = {'alert_fragment': mark_safe(entry['html']), 'alert_id': pk, 'archived': entry['archived']}
+		response = render(request, 'detection/alert.html', context)
+	response['ETag'] = etag
+	if last_modified:
+		response['Last-Modified'] = http_date(last_modified)
+	response['Cache-Control'] = 'private, no-cache'
+	return response
 
 
 
@@ -183,3 +328,23 @@ class FastPasswordResetView(PasswordResetView):
         return HttpResponseRedirect(reverse('password_reset_done'))
 
 
+@login_required(login_url='login')
+@require_POST
+def archiveAlert(request):
+    """Archiva una alerta del usuario (botón "Archivar Alerta" de la página de detalle)."""
+    try:
+        public_id = uuid.UUID(str(json.loads(request.body or b'{}').get('alert_id', '')))
+    except (ValueError, AttributeError):
+        return JsonResponse({'success': False, 'error': 'Identificador de alerta inválido'}, status=400)
+
+    token = Token.objects.get(user=request.user)
+    alert = UploadAlert.objects.filter(public_id=public_id, userID=token).first()
+    if alert is None:
+        if ArchivedAlert.objects.filter(public_id=public_id, userID=token).exists():
+            return JsonResponse({'success': True, 'archived': True})
+        return JsonResponse({'success': False, 'error': 'Alerta no encontrada'}, status=404)
+
+    if not archive.archive_alerts([alert], reason=ArchivedAlert.REASON_MANUAL):
+        return JsonResponse({'success': False, 'error': 'La alerta tiene notificaciones pendientes; inténtalo más tarde'}, status=409)
+    logger.info("🗄️ Alerta %s archivada por %s", public_id, request.user.username)
+    return JsonResponse({'success': True, 'archived': True})
@@ -1,27 +1,121 @@
 """
 Envío de notificaciones Web Push (VAPID) con pywebpush.
 
-send_push_to_user(user, payload) recorre todas las suscripciones del usuario y
-les entrega el mensaje. Las suscripciones caducadas (404/410) se eliminan.
+send_push_to_user(user, payload) entrega el mensaje a todas las suscripciones
+del usuario EN PARALELO (pool acotado de `PUSH_FANOUT_WORKERS` hilos por
+proceso) y con un plazo total de `PUSH_DELIVERY_DEADLINE` segundos: un
+dispositivo lento ya no retrasa a los demás. Las suscripciones caducadas
+(404/410) se eliminan en bloque; las que acumulan fallos seguidos se omiten
+hasta su próximo reintento (ver `PushSubscription.is_healthy`). Las cabeceras VAPID se firman una vez por origen del
+servicio push (`detection.vapid`) y las conexiones TLS se mantienen abiertas
+en un pool por origen (`detection.http_pool`, `push:<origen>`).
 """
+import asyncio
 import json
 import logging
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+from threading import Lock
+from urllib.parse import urlparse
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
 
+from . import http_pool, vapid
 from .models import PushSubscription
 
 logger = logging.getLogger(__name__)
 
+# Campos de salud que se guardan tras cada envío.
 
-def send_push_to_user(user, payload: dict) -> dict:
+# Resultado por suscripción: fila, si se entregó, status HTTP, error y latencia (s).
+PushOutcome = namedtuple('PushOutcome', ['subscription', 'ok', 'status', 'error', 'latency'])
+
+_executor = None
+_executor_pid = None
+_executor_lock = Lock()
+
+
+def _get_executor():
+    """Pool de hilos del envío push del proceso actual (se recrea tras un fork)."""
+    global _executor, _executor_pid
+
+    pid = os.getpid()
+    if _executor is None or _executor_pid != pid:
+        with _executor_lock:
+            if _executor is None or _executor_pid != pid:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.PUSH_FANOUT_WORKERS, thread_name_prefix='push-fanout'
+                )
+                _executor_pid = pid
+    return _executor
+
+
+def _push_session(endpoint):
+    """Sesión keep-alive del origen del servicio push (FCM, Mozilla, Apple...)."""
+    return http_pool.get_session(
+        f"push:{vapid.audience(endpoint)}", pool_maxsize=settings.PUSH_FANOUT_WORKERS
+    )
+
+
+def _push_one(sub, data, timeout):
+    """Cifra y envía a una suscripción. No toca la base de datos (corre en el pool)."""
+    from pywebpush import webpush, WebPushException
+
+    started = time.monotonic()
+    try:
+        response = webpush(
+            subscription_info={
+                "endpoint": sub.endpoint,
+                "keys": {"p256dh": sub.p256dh, "auth": sub.auth},
+            },
+            data=data,
+            headers=vapid.headers_for(sub.endpoint),
+            timeout=timeout,
+            requests_session=_push_session(sub.endpoint),
+        )
+        return PushOutcome(sub, True, getattr(response, "status_code", None), "",
+                           time.monotonic() - started)
+    except WebPushException as exc:
+        status = getattr(exc.response, "status_code", None)
+        return PushOutcome(sub, False, status, f"HTTP {status}: {exc}", time.monotonic() - started)
+    except Exception as exc:  # noqa: BLE001 - no debe interrumpir la alerta
+        return PushOutcome(sub, False, None, str(exc), time.monotonic() - started)
+
+
+def _deadline_outcome(sub):
+    deadline = settings.PUSH_DELIVERY_DEADLINE
+    return PushOutcome(sub, False, None, f"Plazo de entrega agotado ({deadline}s).", deadline)
+
+
+def _split_by_health(subscriptions, include_unhealthy=False):
+    """
+    (suscripciones a las que enviar, nº de omitidas). Las que acumulan fallos
+    seguidos se omiten hasta su próximo reintento (`PushSubscription.is_healthy`)
+    y el resto se ordena de la más fiable a la menos.
     """
-    Envía una notificación push a todas las suscripciones de `user`.
+    subscriptions = list(subscriptions)
+    now = timezone.now()
+    deliverable = [sub for sub in subscriptions if include_unhealthy or sub.is_healthy(now)]
+    deliverable.sort(key=lambda sub: (sub.consecutive_failures, sub.last_latency_ms or 0))
+    return deliverable, len(subscriptions) - len(deliverable)
+
+
+def send_push_to_user(user, payload: dict, include_unhealthy=False) -> dict:
+    """
+    Envía una notificación push a las suscripciones de `user`.
 
     Devuelve un diccionario de diagnóstico:
       {"ok": bool, "subscriptions": int, "sent": int, "errors": [str, ...],
-       "reason": str}
-    `reason` explica por qué no se envió nada cuando `sent` es 0.
+       "reason": str, "skipped": int,
+       "results": [{"id", "origin", "ok", "status", "latency_ms", "error"}, ...]}
+    `reason` explica por qué no se envió nada cuando `sent` es 0. `skipped`
+    cuenta las suscripciones omitidas por fallos seguidos (salvo con
+    `include_unhealthy=True`, como en la push de prueba).
     """
     if not settings.VAPID_PRIVATE_KEY or not settings.VAPID_PUBLIC_KEY:
         logger.warning("⚠️ VAPID no configurado: se omite el envío de push.")
@@ -30,53 +124,103 @@ def send_push_to_user(user, payload: dict) -> dict:
 
     # Import diferido para no romper el arranque si la librería no está instalada.
     try:
-        from pywebpush import webpush, WebPushException
+        import pywebpush  # noqa: F401
     except ImportError:
         logger.error("❌ pywebpush no está instalado; no se envían notificaciones push.")
         return {"ok": False, "subscriptions": 0, "sent": 0, "errors": [],
                 "reason": "La librería pywebpush no está instalada en el servidor."}
 
-    subscriptions = list(PushSubscription.objects.filter(user=user))
-    total = len(subscriptions)
-    sent = 0
+    subscriptions, skipped = _split_by_health(
+        PushSubscription.objects.filter(user=user), include_unhealthy
+    )
+    data = json.dumps(payload)
+    deadline = settings.PUSH_DELIVERY_DEADLINE
+
+    if len(subscriptions) <= 1:
+        # Con una sola suscripción no hace falta pasar por el pool.
+        outcomes = [_push_one(sub, data, deadline) for sub in subscriptions]
+    else:
+        futures = {
+            _get_executor().submit(_push_one, sub, data, deadline): sub
+            for sub in subscriptions
+        }
+        done, not_done = wait(futures, timeout=deadline)
+        outcomes = [future.result() for future in done]
+        for future in not_done:
+            future.cancel()
+            outcomes.append(_deadline_outcome(futures[future]))
+
+    return _apply_outcomes(user, len(subscriptions), outcomes, skipped)
+
+
+def _apply_outcomes(user, total, outcomes, skipped=0):
+    """
+    Guarda la salud de las suscripciones (un UPDATE por grupo: éxitos y
+    fallos), borra de una vez las caducadas (404/410) y arma el diagnóstico.
+    """
+    results = [
+        {
+            "id": outcome.subscription.pk,
+            "origin": urlparse(outcome.subscription.endpoint).netloc,
+            "ok": outcome.ok,
+            "status": outcome.status,
+            "latency_ms": round(outcome.latency * 1000, 1),
+            "error": outcome.error,
+        }
+        for outcome in outcomes
+    ]
+    now = timezone.now()
     errors = []
+    dead = []
+    succeeded = []
+    failed = []
+    for outcome in outcomes:
+        sub = outcome.subscription
+        if outcome.ok:
+            succeeded.append(sub.pk)
+        elif outcome.status in (404, 410):
+            # Suscripción muerta: eliminar.
+            dead.append(sub.pk)
+            errors.append(f"Suscripción caducada eliminada ({outcome.status}).")
+        else:
+            logger.error("❌ Error enviando push: %s", outcome.error)
+            failed.append(sub.pk)
+            errors.append(outcome.error)
 
-    for sub in subscriptions:
-        try:
-            webpush(
-                subscription_info={
-                    "endpoint": sub.endpoint,
-                    "keys": {"p256dh": sub.p256dh, "auth": sub.auth},
-                },
-                data=json.dumps(payload),
-                vapid_private_key=settings.VAPID_PRIVATE_KEY,
-                vapid_claims={"sub": settings.VAPID_ADMIN_EMAIL},
-            )
-            sent += 1
-        except WebPushException as exc:
-            status = getattr(exc.response, "status_code", None)
-            if status in (404, 410):
-                # Suscripción muerta: eliminar.
-                logger.info("🧹 Suscripción push caducada eliminada (%s).", status)
-                sub.delete()
-                errors.append(f"Suscripción caducada eliminada ({status}).")
-            else:
-                logger.error("❌ Error enviando push: %s", exc)
-                errors.append(f"HTTP {status}: {exc}")
-        except Exception as exc:  # noqa: BLE001 - no debe interrumpir la alerta
-            logger.error("❌ Error inesperado enviando push: %s", exc)
-            errors.append(str(exc))
+    if dead:
+        PushSubscription.objects.filter(pk__in=dead).delete()
+        logger.info("🧹 %s suscripción(es) push caducada(s) eliminada(s).", len(dead))
+    # Contadores con F(): dos envíos simultáneos al mismo usuario no se pisan
+    latency = Case(
+        *(When(pk=outcome.subscription.pk, then=Value(round(outcome.latency * 1000))) for outcome in outcomes),
+        output_field=IntegerField(),
+    )
+    if succeeded:
+        PushSubscription.objects.filter(pk__in=succeeded).update(
+            last_success_at=now, consecutive_failures=0, last_latency_ms=latency)
+    if failed:
+        PushSubscription.objects.filter(pk__in=failed).update(
+            last_failure_at=now, consecutive_failures=F('consecutive_failures') + 1, last_latency_ms=latency)
+
+    summary = _summary(user, total, sum(1 for outcome in outcomes if outcome.ok), errors, skipped)
+    summary["results"] = results
+    return summary
 
-    logger.info("🔔 Push enviadas a %s: %s/%s", user.username, sent, total)
+
+def _summary(user, total, sent, errors, skipped=0):
+    """Diccionario de diagnóstico común a los envíos síncrono y asíncrono."""
+    logger.info("🔔 Push enviadas a %s: %s/%s (omitidas: %s)", user.username, sent, total, skipped)
 
     reason = ""
-    if total == 0:
+    if total == 0 and skipped:
+        reason = "Todas las suscripciones del usuario acumulan fallos seguidos; se omiten hasta su próximo reintento."
+    elif total == 0:
         reason = "El usuario no tiene ninguna suscripción push registrada (¿pulsaste 'Activar notificaciones' en este navegador?)."
     elif sent == 0:
         reason = "Había suscripciones pero ningún envío tuvo éxito. Revisa 'errors'."
 
     return {"ok": sent > 0, "subscriptions": total, "sent": sent,
-            "errors": errors, "reason": reason}
+            "errors": errors, "reason": reason, "skipped": skipped}
 
 
 def notify_alert_owner(alert_instance):
@@ -91,15 +235,138 @@ def notify_alert_owner(alert_instance):
         logger.error("❌ No se pudo resolver el dueño de la alerta para push: %s", exc)
         return 0
 
-    # Construir la URL de la alerta a partir del nombre de imagen (uuid.jpg).
-    image_name = getattr(alert_instance.image, "name", "") or ""
-    alert_id = image_name.split("/")[-1].rsplit(".", 1)[0] if image_name else ""
+    return send_push_to_user(user, _alert_payload(alert_instance))
+
+
+def _alert_payload(alert_instance):
+    """Contenido de la push de una alerta individual."""
+    # URL de detalle por el identificador público (indexado) de la alerta.
+    alert_id = alert_instance.public_id or ""
     url = f"/alert/{alert_id}/" if alert_id else "/"
 
-    payload = {
+    return {
         "title": "🚨 Arma detectada",
         "body": f"Ubicación: {alert_instance.location}",
         "url": url,
         "tag": f"weapon-alert-{alert_id or 'na'}",
     }
-    return send_push_to_user(user, payload)
+
+
+def _delivered(result):
+    """
+    True si la push llegó a algún dispositivo o si el usuario no tiene
+    suscripciones (no hay nada que reintentar). Si todas se omitieron por
+    fallos seguidos no se entregó: el outbox reintenta más tarde.
+    """
+    return result["ok"] or (result["subscriptions"] == 0 and not result.get("skipped"))
+
+
+def deliver_alert_push(alert_instance):
+    """Entrega del canal 'push' del outbox (ver `_delivered`)."""
+    result = notify_alert_owner(alert_instance)
+    if not result:
+        return False
+    return _delivered(result)
+
+
+def deliver_batch_push(alerts):
+    """
+    Entrega agrupada del canal 'push' (ingesta por lotes): una sola
+    notificación al dueño resumiendo todas las detecciones del lote.
+    """
+    latest = alerts[-1]
+    try:
+        user = latest.userID.user
+    except Exception as exc:  # noqa: BLE001
+        logger.error("❌ No se pudo resolver el dueño del lote para push: %s", exc)
+        return False
+
+    locations = sorted({a.location for a in alerts if a.location})
+    payload = {
+        "title": f"🚨 {len(alerts)} detecciones de armas",
+        "body": f"Ubicaciones: {', '.join(locations)}" if locations else "Revisa el panel de alertas.",
+        "url": "/",
+        "tag": f"weapon-batch-{latest.pk}",
+    }
+    result = send_push_to_user(user, payload)
+    return _delivered(result)
+
+
+
+# ============================================
+# Envío asíncrono (modo ASGI / uvicorn)
+# ============================================
+
+async def asend_push_to_user(user, payload: dict) -> dict:
+    """
+    Versión asíncrona de `send_push_to_user`: cifra y envía a todas las
+    suscripciones en paralelo con la sesión aiohttp compartida y el mismo
+    plazo total (`PUSH_DELIVERY_DEADLINE`).
+    Devuelve el mismo diccionario de diagnóstico.
+    """
+    if not settings.VAPID_PRIVATE_KEY or not settings.VAPID_PUBLIC_KEY:
+        logger.warning("⚠️ VAPID no configurado: se omite el envío de push.")
+        return {"ok": False, "subscriptions": 0, "sent": 0, "errors": [],
+                "reason": "VAPID no configurado en el servidor (faltan VAPID_PUBLIC_KEY/VAPID_PRIVATE_KEY)."}
+
+    try:
+        import aiohttp
+        from pywebpush import WebPusher
+    except ImportError:
+        logger.error("❌ pywebpush no está instalado; no se envían notificaciones push.")
+        return {"ok": False, "subscriptions": 0, "sent": 0, "errors": [],
+                "reason": "La librería pywebpush no está instalada en el servidor."}
+
+    from .async_http import get_session
+
+    subscriptions, skipped = await sync_to_async(_split_by_health)(
+        PushSubscription.objects.filter(user=user)
+    )
+    data = json.dumps(payload)
+    session = get_session()
+
+    deadline = settings.PUSH_DELIVERY_DEADLINE
+
+    async def send_one(sub):
+        started = time.monotonic()
+        try:
+            response = await WebPusher(
+                {"endpoint": sub.endpoint, "keys": {"p256dh": sub.p256dh, "auth": sub.auth}},
+                aiohttp_session=session,
+            ).send_async(
+                data,
+                vapid.headers_for(sub.endpoint),
+                timeout=aiohttp.ClientTimeout(total=deadline),
+            )
+        except Exception as exc:  # noqa: BLE001 - no debe interrumpir la alerta
+            return PushOutcome(sub, False, None, str(exc), time.monotonic() - started)
+
+        elapsed = time.monotonic() - started
+        if response.status <= 202:
+            return PushOutcome(sub, True, response.status, "", elapsed)
+        return PushOutcome(sub, False, response.status,
+                           f"HTTP {response.status}: {response.reason}", elapsed)
+
+    tasks = {asyncio.ensure_future(send_one(sub)): sub for sub in subscriptions}
+    outcomes = []
+    if tasks:
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        outcomes = [task.result() for task in done]
+        for task in pending:
+            task.cancel()
+            outcomes.append(_deadline_outcome(tasks[task]))
+    return await sync_to_async(_apply_outcomes)(
+        user, len(subscriptions), outcomes, skipped
+    )
+
+
+async def adeliver_alert_push(alert_instance):
+    """Entrega asíncrona del canal 'push' del outbox (misma semántica que `deliver_alert_push`)."""
+    try:
+        user = await sync_to_async(lambda: alert_instance.userID.user)()
+    except Exception as exc:  # noqa: BLE001
+        logger.error("❌ No se pudo resolver el dueño de la alerta para push: %s", exc)
+        return False
+
+    result = await asend_push_to_user(user, _alert_payload(alert_instance))
+    return _delivered(result)
@@ -26,12 +26,23 @@ workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2
 workers = min(workers, 4)  # Máximo 4 workers en free tier
 
 # Tipo de worker
-worker_class = 'sync'  # Sync es mejor para Django con threads internos
+# - 'sync' (por defecto): app WSGI (webdev.wsgi), un hilo del SO por petición.
+# - Modo ASGI con uvicorn: una sola event loop por worker mantiene cientos de
+#   subidas y entregas de notificaciones en curso (POST /api/images/async/).
+#   Arrancar con:
+#     GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker \
+#       gunicorn webdev.asgi:application -c gunicorn_config.py
+#   En este modo `threads` no aplica y `worker_connections` limita las
+#   conexiones simultáneas por worker. El panel en vivo por SSE
+#   (LIVE_UPDATES_ENABLED=True) solo se sirve en este modo; con 'sync' el
+#   panel consulta las alertas nuevas cada LIVE_UPDATES_POLL_SECONDS.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')  # Sync es mejor para Django con threads internos
+ASGI_MODE = 'uvicorn' in worker_class.lower()
 
 # Conexiones por worker
 worker_connections = 1000
 
-# Threads por worker (importante para emails asíncronos)
+# Threads por worker (importante para emails asíncronos; ignorado en modo ASGI)
 threads = 2  # Permite 2 threads por worker
 
 # ============================================
@@ -117,6 +128,7 @@ def on_starting(server):
     print("="*60)
     print(f"   Environment: {os.environ.get('ENVIRONMENT', 'development')}")
     print(f"   Workers: {workers}")
+    print(f"   Worker class: {worker_class}{' (ASGI)' if ASGI_MODE else ''}")
     print(f"   Threads per worker: {threads}")
     print(f"   Timeout: {timeout}s")
     print(f"   Bind: {bind}")
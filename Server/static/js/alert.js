@@ -162,38 +162,28 @@ function archiveAlert() {
     archiveBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Archiving...';
     archiveBtn.disabled = true;
 
-    // Simular llamada al servidor (reemplazar con tu lógica real)
-    setTimeout(() => {
-        // Aquí harías la llamada AJAX real a tu backend
-        /*
-        fetch('/archive-alert/', {
-            method: 'POST',
-            headers: {
-                'X-CSRFToken': document.querySelector('[name=csrfmiddlewaretoken]')?.value,
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({
-                alert_id: 'ALERT_ID_FROM_TEMPLATE'
-            })
-        })
-        .then(response => response.json())
-        .then(data => {
-            if (data.success) {
-                updateUIAfterArchive();
-                showStatusMessage('Alert archived successfully!', 'success');
-            } else {
-                handleArchiveError(originalText);
-            }
+    fetch(archiveBtn.dataset.archiveUrl, {
+        method: 'POST',
+        headers: {
+            'X-CSRFToken': document.querySelector('[name=csrfmiddlewaretoken]')?.value,
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            alert_id: archiveBtn.dataset.alertId
         })
-        .catch(error => {
-            handleArchiveError(originalText);
-        });
-        */
-
-        // Por ahora, simular éxito
-        updateUIAfterArchive();
-        showStatusMessage('Alert archived successfully!', 'success');
-    }, 2000); // Simular delay de red
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            updateUIAfterArchive();
+            showStatusMessage('Alert archived successfully!', 'success');
+        } else {
+            handleArchiveError(originalText, data.error);
+        }
+    })
+    .catch(error => {
+        handleArchiveError(originalText);
+    });
 }
 
 // Función para actualizar UI después de archivar
@@ -220,9 +210,9 @@ function updateUIAfterArchive() {
 }
 
 // Función para manejar errores de archivado
-function handleArchiveError(originalText) {
+function handleArchiveError(originalText, message) {
     const archiveBtn = document.getElementById('archiveBtn');
-    showStatusMessage('Error archiving alert. Please try again.', 'error');
+    showStatusMessage(message || 'Error archiving alert. Please try again.', 'error');
     
     if (archiveBtn) {
         archiveBtn.innerHTML = originalText;
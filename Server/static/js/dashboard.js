@@ -17,7 +17,8 @@ jQuery(document).ready(function($){
 function changePageSize(newSize) {
   const url = new URL(window.location.href);
   url.searchParams.set('per_page', newSize);
-  url.searchParams.set('page', '1'); // Reset to first page
+  url.searchParams.delete('cursor'); // Volver a la primera página
+  url.searchParams.delete('page');
   
   // Marcar como navegación interna
   window.isInternalNavigation = true;
@@ -34,8 +35,121 @@ document.addEventListener('DOMContentLoaded', function() {
   
   // Configurar auto-logout
   setupAutoLogout();
+
+  // Alertas nuevas en vivo (Server-Sent Events o sondeo)
+  setupLiveAlerts();
 });
 
+// Función para recibir las alertas nuevas en vivo sin recargar la página.
+// Usa Server-Sent Events si el servidor los ofrece (workers ASGI); si no, o si
+// el servidor rechaza el flujo (204), consulta las alertas nuevas periódicamente.
+function setupLiveAlerts() {
+  const card = document.querySelector('.results-card[data-poll-url]');
+  if (!card) return;
+
+  const tbody = card.querySelector('.results-table tbody');
+  const pageSize = parseInt(card.dataset.pageSize, 10) || 0;
+  let lastId = 0;
+
+  function showAlert(alert) {
+    lastId = Math.max(lastId, alert.id);
+    showToast(`🚨 Nueva detección en ${alert.location}`, 'error', 5000);
+
+    // En otras páginas o con filtros solo se avisa (la tabla no se toca)
+    if (!card.dataset.livePrepend || !tbody) return;
+
+    const empty = tbody.querySelector('.no-results');
+    if (empty) empty.closest('tr').remove();
+
+    tbody.insertBefore(buildAlertRow(alert), tbody.firstChild);
+    const rows = tbody.querySelectorAll('tr');
+    if (pageSize && rows.length > pageSize) {
+      rows[rows.length - 1].remove();
+    }
+  }
+
+  let polling = false;
+  let pollTimer = null;
+  function poll(primeOnly) {
+    const url = new URL(card.dataset.pollUrl, window.location.origin);
+    if (!primeOnly) url.searchParams.set('after', lastId);
+    fetch(url, { credentials: 'same-origin', headers: { 'Accept': 'application/json' } })
+      .then(response => response.ok ? response.json() : null)
+      .then(data => {
+        if (!data) return;
+        if (!primeOnly) data.alerts.forEach(showAlert);
+        lastId = Math.max(lastId, data.last_id);
+      })
+      .catch(() => {})  // se reintenta en el siguiente ciclo
+      .finally(() => {
+        pollTimer = setTimeout(() => poll(false), (parseInt(card.dataset.pollSeconds, 10) || 15) * 1000);
+      });
+  }
+
+  function startPolling() {
+    if (polling) return;
+    polling = true;
+    poll(true);
+  }
+
+  if (!card.dataset.liveUrl || !window.EventSource) {
+    startPolling();
+    return;
+  }
+
+  const source = new EventSource(card.dataset.liveUrl);
+  source.addEventListener('alert', function(e) {
+    showAlert(JSON.parse(e.data));
+  });
+  // Un 204 (workers sin ASGI) o un error definitivo cierra EventSource: se sondea
+  source.addEventListener('error', function() {
+    if (source.readyState === EventSource.CLOSED) startPolling();
+  });
+
+  // Al salir de la página se cierra la conexión (EventSource se reconecta solo si se corta)
+  window.addEventListener('pagehide', function() {
+    source.close();
+    clearTimeout(pollTimer);
+  });
+}
+
+// Función para construir la fila de la tabla de una alerta recibida en vivo
+function buildAlertRow(alert) {
+  const row = document.createElement('tr');
+  row.className = 'live-alert-row';
+
+  const imageCell = document.createElement('td');
+  const image = document.createElement('img');
+  image.className = 'detection-image';
+  image.src = alert.image_url;
+  image.loading = 'lazy';
+  image.decoding = 'async';
+  image.alt = 'Imagen de Detección';
+  imageCell.appendChild(image);
+  row.appendChild(imageCell);
+
+  [['location-cell', alert.location], ['receiver-cell', alert.alertReceiver], ['time-cell', alert.dateCreated]]
+    .forEach(([className, text]) => {
+      const cell = document.createElement('td');
+      cell.className = className;
+      cell.textContent = text;
+      row.appendChild(cell);
+    });
+
+  const actionCell = document.createElement('td');
+  const link = document.createElement('a');
+  link.className = 'view-btn';
+  link.href = alert.url;
+  link.innerHTML = '<i class="fas fa-eye"></i> Ver Detalles';
+  link.addEventListener('click', function() {
+    window.isInternalNavigation = true;
+  });
+  actionCell.appendChild(link);
+  row.appendChild(actionCell);
+
+  return row;
+}
+
 // Función para configurar animaciones de paginación
 function setupPaginationAnimations() {
   const paginationLinks = document.querySelectorAll('.pagination-btn:not(.pagination-btn-disabled)');
@@ -251,8 +365,16 @@ document.addEventListener('keydown', function(e) {
   }
 });
 
-// Función para exportar datos (opcional - para futuras funcionalidades)
+// Exportar las alertas filtradas: el servidor genera el archivo en streaming
+// con los mismos filtros del panel (todas las páginas, no solo la visible)
 function exportData(format = 'csv') {
-  // Esta función se puede implementar más tarde para exportar los datos de la tabla
-  showToast(`Export feature coming soon (${format.toUpperCase()})`, 'info');
+  const card = document.querySelector('.results-card[data-export-url]');
+  if (!card) return;
+
+  const params = new URLSearchParams(window.location.search);
+  ['cursor', 'page', 'per_page'].forEach(key => params.delete(key));
+  params.set('format', format);
+
+  showToast(`Preparando exportación ${format.toUpperCase()}...`, 'info');
+  window.location.href = `${card.dataset.exportUrl}?${params.toString()}`;
 }
\ No newline at end of file
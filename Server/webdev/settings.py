@@ -5,6 +5,7 @@ Generated by 'django-admin startproject' using Django 3.1.5.
 """
 from pathlib import Path
 import os
+import json
 from dotenv import load_dotenv 
 load_dotenv()
 
@@ -172,6 +173,12 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        # API de ingesta de alertas (vistas, lotes, subida directa).
+        'alertuploadREST': {
+            'handlers': ['file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 
@@ -197,7 +204,7 @@ MEDIA_ROOT = 'static/images'
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = os.environ.get('EMAIL_HOST', 'smtp.gmail.com')
 EMAIL_PORT = int(os.environ.get('EMAIL_PORT', '587'))
-EMAIL_USE_TLS = True
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'True').lower() == 'true'
 EMAIL_USE_SSL = False
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
 # Se limpian espacios: Google muestra la app password en bloques de 4 (xxxx xxxx ...).
@@ -213,6 +220,7 @@ EMAIL_TIMEOUT = 30
 # envían por la API HTTP de Brevo (puerto 443). La API key empieza con 'xkeysib-'.
 # El remitente (DEFAULT_FROM_EMAIL) DEBE estar verificado en Brevo (Senders).
 BREVO_API_KEY = os.environ.get('BREVO_API_KEY', '')
+BREVO_API_URL = os.environ.get('BREVO_API_URL', 'https://api.brevo.com/v3/smtp/email')
 # Estado de la configuracion de correo: Brevo (API HTTP) es la via principal en
 # produccion (Render bloquea SMTP saliente); Gmail SMTP es el respaldo local.
 if BREVO_API_KEY:
@@ -264,4 +272,161 @@ DEFAULT_FILE_STORAGE = 'webdev.storage_backends.PublicMediaStorage'
 VAPID_PUBLIC_KEY = os.environ.get('VAPID_PUBLIC_KEY', '')
 VAPID_PRIVATE_KEY = os.environ.get('VAPID_PRIVATE_KEY', '')
 # El claim "sub" del JWT VAPID: un mailto o una URL de contacto del responsable.
-VAPID_ADMIN_EMAIL = os.environ.get('VAPID_ADMIN_EMAIL', 'mailto:admin@weapondetection.com')
\ No newline at end of file
+VAPID_ADMIN_EMAIL = os.environ.get('VAPID_ADMIN_EMAIL', 'mailto:admin@weapondetection.com')
+
+# ==========================================
+# 📬 DESPACHADOR DE NOTIFICACIONES
+# ==========================================
+# Pool fijo de hilos por worker de gunicorn (ver detection/dispatcher.py).
+# Cada canal tiene su propio carril con cola acotada; si la cola está llena,
+# el llamador espera NOTIFICATION_SUBMIT_TIMEOUT segundos y luego se rechaza.
+NOTIFICATION_EMAIL_WORKERS = int(os.environ.get('NOTIFICATION_EMAIL_WORKERS', '2'))
+NOTIFICATION_EMAIL_QUEUE_SIZE = int(os.environ.get('NOTIFICATION_EMAIL_QUEUE_SIZE', '200'))
+NOTIFICATION_PUSH_WORKERS = int(os.environ.get('NOTIFICATION_PUSH_WORKERS', '2'))
+NOTIFICATION_PUSH_QUEUE_SIZE = int(os.environ.get('NOTIFICATION_PUSH_QUEUE_SIZE', '200'))
+NOTIFICATION_SUBMIT_TIMEOUT = float(os.environ.get('NOTIFICATION_SUBMIT_TIMEOUT', '2'))
+
+# Outbox transaccional (detection/outbox.py + `manage.py process_notifications`).
+# INLINE: el worker web intenta la entrega inmediata tras el commit; lo que
+# falle o no quepa en el despachador lo reintenta el comando con backoff.
+NOTIFICATION_OUTBOX_INLINE = os.environ.get('NOTIFICATION_OUTBOX_INLINE', 'True').lower() == 'true'
+NOTIFICATION_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('NOTIFICATION_OUTBOX_MAX_ATTEMPTS', '5'))
+NOTIFICATION_OUTBOX_RETRY_BASE = int(os.environ.get('NOTIFICATION_OUTBOX_RETRY_BASE', '30'))   # segundos
+NOTIFICATION_OUTBOX_LEASE = int(os.environ.get('NOTIFICATION_OUTBOX_LEASE', '300'))            # segundos
+
+# Ingesta por lotes (POST /api/images/batch/): máximo de imágenes por petición
+# y subidas simultáneas al bucket S3.
+ALERT_BATCH_MAX_ITEMS = int(os.environ.get('ALERT_BATCH_MAX_ITEMS', '50'))
+ALERT_BATCH_UPLOAD_WORKERS = int(os.environ.get('ALERT_BATCH_UPLOAD_WORKERS', '8'))
+
+# Subida directa a S3 (POST /api/images/presign/ + /api/images/finalize/):
+# el cliente sube la imagen con un POST prefirmado y el worker solo registra la alerta.
+ALERT_PRESIGNED_UPLOAD_EXPIRES = int(os.environ.get('ALERT_PRESIGNED_UPLOAD_EXPIRES', '300'))          # segundos
+ALERT_PRESIGNED_UPLOAD_MAX_BYTES = int(os.environ.get('ALERT_PRESIGNED_UPLOAD_MAX_BYTES', str(10 * 1024 * 1024)))
+
+# Derivados de imagen (detection/derivatives.py): miniatura para el dashboard
+# y vista previa WebP para la página de la alerta. Tamaño = lado mayor en px.
+ALERT_THUMBNAIL_MAX_SIZE = int(os.environ.get('ALERT_THUMBNAIL_MAX_SIZE', '320'))
+ALERT_PREVIEW_MAX_SIZE = int(os.environ.get('ALERT_PREVIEW_MAX_SIZE', '1280'))
+ALERT_DERIVATIVE_QUALITY = int(os.environ.get('ALERT_DERIVATIVE_QUALITY', '75'))
+NOTIFICATION_MEDIA_WORKERS = int(os.environ.get('NOTIFICATION_MEDIA_WORKERS', '1'))
+NOTIFICATION_MEDIA_QUEUE_SIZE = int(os.environ.get('NOTIFICATION_MEDIA_QUEUE_SIZE', '200'))
+
+# Caché en memoria token -> usuario de la API de subida (alertuploadREST/identity.py).
+# Se invalida por señales al guardar/borrar tokens o usuarios; el TTL acota
+# cuánto puede durar una identidad obsoleta en otro worker.
+ALERT_TOKEN_CACHE_SIZE = int(os.environ.get('ALERT_TOKEN_CACHE_SIZE', '1024'))
+ALERT_TOKEN_CACHE_TTL = int(os.environ.get('ALERT_TOKEN_CACHE_TTL', '300'))   # segundos
+
+# Límite de ingesta por token (alertuploadREST/throttling.py): token bucket en
+# memoria de cada worker. Tasa en alertas/segundo; ráfaga = tamaño del bucket.
+# Un lote cuesta un token por imagen: la ráfaga no puede ser menor que
+# ALERT_BATCH_MAX_ITEMS (un lote completo nunca se admitiría).
+# ALERT_RATE_LIMIT_OVERRIDES: JSON {"<token key>": [tasa, ráfaga]}.
+ALERT_RATE_LIMIT_RATE = float(os.environ.get('ALERT_RATE_LIMIT_RATE', '2'))
+ALERT_RATE_LIMIT_BURST = float(os.environ.get('ALERT_RATE_LIMIT_BURST', str(ALERT_BATCH_MAX_ITEMS)))
+if ALERT_RATE_LIMIT_BURST < ALERT_BATCH_MAX_ITEMS:
+    from django.core.exceptions import ImproperlyConfigured
+    raise ImproperlyConfigured(
+        f"ALERT_RATE_LIMIT_BURST ({ALERT_RATE_LIMIT_BURST:g}) debe ser >= ALERT_BATCH_MAX_ITEMS ({ALERT_BATCH_MAX_ITEMS})."
+    )
+ALERT_RATE_LIMIT_OVERRIDES = json.loads(os.environ.get('ALERT_RATE_LIMIT_OVERRIDES', '{}'))
+# Admisión: 503 si un carril de notificación supera esta fracción de su cola.
+ALERT_ADMISSION_MAX_QUEUE_RATIO = float(os.environ.get('ALERT_ADMISSION_MAX_QUEUE_RATIO', '0.8'))
+ALERT_ADMISSION_RETRY_AFTER = int(os.environ.get('ALERT_ADMISSION_RETRY_AFTER', '5'))   # segundos
+
+# Envío agrupado de correos (detection/email_batcher.py): los correos de alerta
+# que llegan dentro de la ventana se envían en UNA llamada a Brevo
+# (`messageVersions`). BREVO_BATCH_WINDOW = 0 envía cada correo al momento.
+BREVO_BATCH_WINDOW = float(os.environ.get('BREVO_BATCH_WINDOW', '0.5'))         # segundos
+BREVO_BATCH_MAX_MESSAGES = int(os.environ.get('BREVO_BATCH_MAX_MESSAGES', '100'))
+# Correos en espera como máximo; con la cola llena la fila vuelve al outbox.
+BREVO_BATCH_QUEUE_SIZE = int(os.environ.get('BREVO_BATCH_QUEUE_SIZE', '500'))
+
+# Correos de alerta (alertuploadREST/emails.py): True usa la variante con los
+# estilos ya en línea, para clientes de correo que descartan el bloque <style>.
+ALERT_EMAIL_INLINE_CSS = os.environ.get('ALERT_EMAIL_INLINE_CSS', 'False').lower() == 'true'
+
+# Política de entrega de Brevo (detection/resilience.py): reintentos con
+# backoff + jitter ante 429/5xx/errores de red (respetando Retry-After) y
+# circuit breaker que falla al instante mientras Brevo no responde.
+BREVO_TIMEOUT = float(os.environ.get('BREVO_TIMEOUT', '10'))                        # segundos (lectura)
+BREVO_RETRY_MAX_ATTEMPTS = int(os.environ.get('BREVO_RETRY_MAX_ATTEMPTS', '3'))
+BREVO_RETRY_BASE_DELAY = float(os.environ.get('BREVO_RETRY_BASE_DELAY', '0.5'))     # segundos
+BREVO_RETRY_MAX_DELAY = float(os.environ.get('BREVO_RETRY_MAX_DELAY', '5'))         # segundos
+BREVO_BREAKER_FAILURES = int(os.environ.get('BREVO_BREAKER_FAILURES', '5'))         # fallos seguidos para abrir
+BREVO_BREAKER_RESET = float(os.environ.get('BREVO_BREAKER_RESET', '30'))            # segundos abierto
+
+# Proveedores de correo (detection/email_transports.py), en orden de preferencia:
+# 'brevo' (API HTTP) y 'smtp' (EMAIL_HOST). Por defecto, los que estén configurados.
+# Cada correo va al proveedor con mejor p95 / tasa de éxito recientes, con failover.
+EMAIL_TRANSPORTS = os.environ.get(
+    'EMAIL_TRANSPORTS',
+    ','.join(name for name, enabled in (
+        ('brevo', bool(BREVO_API_KEY)),
+        ('smtp', bool(EMAIL_HOST_USER and EMAIL_HOST_PASSWORD)),
+    ) if enabled) or 'brevo',
+).split(',')
+EMAIL_ROUTER_WINDOW = float(os.environ.get('EMAIL_ROUTER_WINDOW', '300'))                 # segundos de historial
+EMAIL_ROUTER_MIN_SAMPLES = int(os.environ.get('EMAIL_ROUTER_MIN_SAMPLES', '5'))
+EMAIL_ROUTER_DEFAULT_LATENCY = float(os.environ.get('EMAIL_ROUTER_DEFAULT_LATENCY', '1.0'))  # segundos (sin muestras)
+
+# Envío web push en paralelo (detection/webpush_sender.py): hilos del pool por
+# proceso y plazo total para entregar a todos los dispositivos de un usuario.
+PUSH_FANOUT_WORKERS = int(os.environ.get('PUSH_FANOUT_WORKERS', '16'))
+PUSH_DELIVERY_DEADLINE = float(os.environ.get('PUSH_DELIVERY_DEADLINE', '10'))   # segundos
+
+# Salud de las suscripciones push: con PUSH_SUBSCRIPTION_MAX_FAILURES fallos
+# seguidos (timeouts, 5xx...) el endpoint se omite en los envíos y se vuelve a
+# probar cada PUSH_SUBSCRIPTION_RETRY_AFTER segundos. `prune_push_subscriptions`
+# borra las que superan PUSH_SUBSCRIPTION_PRUNE_FAILURES fallos seguidos (las
+# que responden 404/410 se borran al enviar). Cada usuario guarda como máximo
+# PUSH_SUBSCRIPTIONS_PER_USER (se descartan las que hace más tiempo que no
+# reciben una push).
+PUSH_SUBSCRIPTION_MAX_FAILURES = int(os.environ.get('PUSH_SUBSCRIPTION_MAX_FAILURES', '3'))
+PUSH_SUBSCRIPTION_RETRY_AFTER = int(os.environ.get('PUSH_SUBSCRIPTION_RETRY_AFTER', '3600'))   # segundos
+PUSH_SUBSCRIPTION_PRUNE_FAILURES = int(os.environ.get('PUSH_SUBSCRIPTION_PRUNE_FAILURES', '10'))
+PUSH_SUBSCRIPTIONS_PER_USER = int(os.environ.get('PUSH_SUBSCRIPTIONS_PER_USER', '10'))
+
+# Panel de alertas: la paginación es por cursor y el total se cuenta como mucho
+# hasta DASHBOARD_COUNT_LIMIT filas ("más de N"); 0 desactiva el conteo.
+DASHBOARD_COUNT_LIMIT = int(os.environ.get('DASHBOARD_COUNT_LIMIT', '1000'))
+
+# Panel en vivo (Server-Sent Events, detection/live.py): con PostgreSQL las
+# alertas nuevas se reparten entre workers con LISTEN/NOTIFY. Cada conexión se
+# cierra tras LIVE_UPDATES_STREAM_SECONDS y el navegador se reconecta solo
+# (LIVE_UPDATES_RETRY_MS). Activar solo con workers ASGI (uvicorn): con workers
+# 'sync' / 'gthread' cada panel ocuparía un hilo y el flujo se rechaza (204).
+# Sin SSE el panel consulta las alertas nuevas cada LIVE_UPDATES_POLL_SECONDS.
+LIVE_UPDATES_ENABLED = os.environ.get('LIVE_UPDATES_ENABLED', 'False').lower() == 'true'
+LIVE_UPDATES_POLL_SECONDS = int(os.environ.get('LIVE_UPDATES_POLL_SECONDS', '15'))
+LIVE_UPDATES_HEARTBEAT = int(os.environ.get('LIVE_UPDATES_HEARTBEAT', '15'))   # segundos
+LIVE_UPDATES_STREAM_SECONDS = int(os.environ.get('LIVE_UPDATES_STREAM_SECONDS', '300'))
+LIVE_UPDATES_RETRY_MS = int(os.environ.get('LIVE_UPDATES_RETRY_MS', '3000'))
+
+# Página de detalle de una alerta (/alert/<uuid>/, el enlace de correos y
+# push): el contenido renderizado se guarda en la caché de Django y la vista
+# responde 304 a las peticiones condicionales (ETag / Last-Modified) sin volver
+# a renderizar. Mientras la vista previa WebP no existe el fragmento caduca antes.
+# ALERT_PAGE_CACHE_SECONDS solo se usa con una caché compartida (Redis,
+# Memcached, base de datos): al archivar, el borrado de la entrada llega a todos
+# los workers. Con la caché por proceso (LocMem, mientras no se configure CACHES)
+# el fragmento dura como mucho ALERT_PAGE_LOCAL_CACHE_SECONDS.
+ALERT_PAGE_CACHE_SECONDS = int(os.environ.get('ALERT_PAGE_CACHE_SECONDS', '86400'))
+ALERT_PAGE_LOCAL_CACHE_SECONDS = int(os.environ.get('ALERT_PAGE_LOCAL_CACHE_SECONDS', '60'))
+ALERT_PAGE_PENDING_CACHE_SECONDS = int(os.environ.get('ALERT_PAGE_PENDING_CACHE_SECONDS', '30'))
+
+# Exportación de alertas (/export/?format=csv|ndjson): filas leídas y escritas
+# por bloques de este tamaño (cursor del lado del servidor en PostgreSQL), así
+# la memoria no crece con el número de alertas exportadas.
+ALERT_EXPORT_CHUNK_SIZE = int(os.environ.get('ALERT_EXPORT_CHUNK_SIZE', '2000'))
+
+# Archivo de alertas (detection/archive.py, comando `archive_alerts`): las
+# alertas archivadas a mano o con más de ALERT_ARCHIVE_AFTER_DAYS días pasan a
+# la tabla ArchivedAlert y sus imágenes al prefijo 'archive/' del bucket con la
+# clase ALERT_ARCHIVE_STORAGE_CLASS (STANDARD_IA se sirve al instante; GLACIER
+# no se podría mostrar en la página de la alerta). El prefijo 'archive/' debe
+# tener la misma política de lectura pública que 'media/'.
+ALERT_ARCHIVE_AFTER_DAYS = int(os.environ.get('ALERT_ARCHIVE_AFTER_DAYS', '90'))
+ALERT_ARCHIVE_STORAGE_CLASS = os.environ.get('ALERT_ARCHIVE_STORAGE_CLASS', 'STANDARD_IA')
+ALERT_ARCHIVE_COPY_WORKERS = int(os.environ.get('ALERT_ARCHIVE_COPY_WORKERS', '8'))
@@ -1,7 +1,62 @@
+from django.conf import settings
 from storages.backends.s3boto3 import S3Boto3Storage
+from storages.utils import clean_name
 
 
 class PublicMediaStorage(S3Boto3Storage):
     location = 'media'
     file_overwrite = False
     default_acl=None
+
+    def presigned_post(self, name, content_type, max_bytes, expires_in):
+        """
+        Presigned POST so clients upload `name` straight to the bucket,
+        without the bytes going through a gunicorn worker.
+        Returns {'url': ..., 'fields': {...}} (multipart form for the client).
+        """
+        key = self._normalize_name(clean_name(name))
+        return self.bucket.meta.client.generate_presigned_post(
+            Bucket=self.bucket_name,
+            Key=key,
+            Fields={'Content-Type': content_type},
+            Conditions=[
+                {'Content-Type': content_type},
+                ['content-length-range', 1, max_bytes],
+            ],
+            ExpiresIn=expires_in,
+        )
+
+    def head(self, name):
+        """
+        Size and Content-Type of `name` from a single HEAD request
+        (the object body is not downloaded).
+        """
+        obj = self.bucket.Object(self._normalize_name(clean_name(name)))
+        return obj.content_length, obj.content_type
+
+
+class ArchiveMediaStorage(PublicMediaStorage):
+    """
+    Archived alert images: same bucket, 'archive/' prefix and a cheaper
+    storage class (ALERT_ARCHIVE_STORAGE_CLASS).
+    """
+    location = 'archive'
+
+    def get_object_parameters(self, name):
+        params = super().get_object_parameters(name)
+        params['StorageClass'] = settings.ALERT_ARCHIVE_STORAGE_CLASS
+        return params
+
+    def copy_from(self, source, name):
+        """
+        Server-side copy of `name` from `source` (a PublicMediaStorage on the
+        same account) into this storage: the bytes never leave S3.
+        """
+        self.bucket.meta.client.copy_object(
+            CopySource={'Bucket': source.bucket_name, 'Key': source._normalize_name(clean_name(name))},
+            Bucket=self.bucket_name,
+            Key=self._normalize_name(clean_name(name)),
+            StorageClass=settings.ALERT_ARCHIVE_STORAGE_CLASS,
+            MetadataDirective='COPY',
+        )
+        return name